@@ -5,17 +5,102 @@ Complete menu analysis and optimization tool for restaurants
 Run with: python restaurant_menu_optimizer.py
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, request, jsonify, abort, g
+from flask.json.provider import DefaultJSONProvider
+import cProfile
+import csv
+import gzip
+import hashlib
+import io
 import json
+import marshal
+import mimetypes
+import mmap
+import os
+import pstats
+import queue
 import random
+import re
+import sqlite3
+import struct
+import sys
+import tarfile
+import threading
 import time
-from datetime import datetime, timedelta
+import urllib.request
+from datetime import date, datetime, timedelta
 import webbrowser
+import zlib
 from threading import Timer
 import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import cached_property, wraps
+from itertools import accumulate, compress, islice, repeat
+from operator import add, itemgetter, mul, sub, truediv
+
+try:
+    import brotli
+except ImportError:  # optional: without it assets are precompressed with gzip only
+    brotli = None
+try:
+    import orjson
+except ImportError:  # optional: without it item fragments are encoded with the stdlib json module
+    orjson = None
+try:
+    import fcntl
+except ImportError:  # not on Windows: the write-ahead log is then not locked against other processes
+    fcntl = None
 
 app = Flask(__name__)
 
+# Storage configuration: 'sqlite' shares one menu across all gunicorn workers,
+# 'memory' keeps it inside the current process only
+MENU_STORAGE = os.environ.get('MENU_STORAGE', 'sqlite')
+MENU_DB_PATH = os.environ.get('MENU_DB_PATH', 'menu.db')
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '64'))
+# 'fixed' flags items against absolute cutoffs, 'relative' against this menu's percentiles
+ANALYSIS_THRESHOLDS = os.environ.get('ANALYSIS_THRESHOLDS', 'fixed')
+# Binary snapshots of each restaurant's menu store, memory-mapped on startup.
+# Unset SNAPSHOT_DIR disables them; SNAPSHOT_INTERVAL=0 dumps on demand only.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '')
+SNAPSHOT_INTERVAL = float(os.environ.get('SNAPSHOT_INTERVAL', '0'))
+# Write-ahead log for the 'memory' backend. Unset WAL_DIR disables it; writers
+# arriving within WAL_COMMIT_WINDOW seconds of each other share one fsync.
+WAL_DIR = os.environ.get('WAL_DIR', '')
+WAL_COMMIT_WINDOW = float(os.environ.get('WAL_COMMIT_WINDOW', '0'))
+# 'auto' encodes menu items with orjson when it is installed, 'json' always uses the stdlib
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto')
+
+# Each restaurant (tenant) gets its own menu partition; the plain /api/... routes
+# serve DEFAULT_RESTAURANT. MENU_RESTAURANTS optionally restricts which ids exist.
+DEFAULT_RESTAURANT = 'default'
+MENU_RESTAURANTS = {r.strip() for r in os.environ.get('MENU_RESTAURANTS', '').split(',') if r.strip()}
+TENANT_MAX_RESIDENT = int(os.environ.get('TENANT_MAX_RESIDENT', '32'))
+TENANT_IDLE_SECONDS = int(os.environ.get('TENANT_IDLE_SECONDS', '900'))
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', '8'))
+
+# Opt-in profiling of analysis and chart requests: a fraction of them are
+# sampled, and requests carrying X-Profile-Token: <PROFILE_TOKEN> always are.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '20'))
+
+# Third-party dashboard assets are self-hosted from static/vendor/, which
+# `flask --app app vendor-assets` fills in. If they are missing the dashboard
+# answers 503, unless DASHBOARD_CDN_FALLBACK=1 lets the page load them from these CDNs.
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'vendor')
+DASHBOARD_CDN_FALLBACK = os.environ.get('DASHBOARD_CDN_FALLBACK', '') == '1'
+CHART_JS_VERSION = '4.4.1'
+FONT_AWESOME_VERSION = '6.0.0'
+CHART_JS_CDN = f'https://cdn.jsdelivr.net/npm/chart.js@{CHART_JS_VERSION}'
+FONT_AWESOME_CDN = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}/css/all.min.css'
+CHART_JS_PACKAGE = f'https://registry.npmjs.org/chart.js/-/chart.js-{CHART_JS_VERSION}.tgz'
+FONT_AWESOME_PACKAGE = (f'https://registry.npmjs.org/@fortawesome/fontawesome-free/-/'
+                        f'fontawesome-free-{FONT_AWESOME_VERSION}.tgz')
+
 # HTML Template (embedded)
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -24,53 +109,11 @@ HTML_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Restaurant Menu Optimizer</title>
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: linear-gradient(135deg, #ff6b6b 0%, #feca57 100%); min-height: 100vh; color: #333; }
-        .container { max-width: 1400px; margin: 0 auto; padding: 20px; }
-        .header { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 30px; text-align: center; margin-bottom: 30px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); backdrop-filter: blur(10px); }
-        .header h1 { color: #d63031; font-size: 2.5rem; margin-bottom: 10px; }
-        .header p { color: #666; font-size: 1.2rem; }
-        .stats-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 20px; margin-bottom: 30px; }
-        .stat-card { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 25px; display: flex; align-items: center; cursor: pointer; transition: transform 0.3s ease, box-shadow 0.3s ease; box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1); }
-        .stat-card:hover { transform: translateY(-5px); box-shadow: 0 8px 30px rgba(0, 0, 0, 0.15); }
-        .stat-icon { background: #ff6b6b; color: white; width: 60px; height: 60px; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 1.5rem; margin-right: 20px; }
-        .stat-content h3 { font-size: 2rem; color: #d63031; margin-bottom: 5px; }
-        .stat-content p { color: #666; font-size: 1rem; }
-        .main-content { display: grid; grid-template-columns: 1fr 1fr; gap: 30px; margin-bottom: 30px; }
-        .section { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 30px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); }
-        .section h2 { color: #d63031; margin-bottom: 25px; font-size: 1.8rem; }
-        .form-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }
-        .form-group { display: flex; flex-direction: column; }
-        .form-group label { color: #555; margin-bottom: 8px; font-weight: 600; }
-        .form-group input, .form-group select, .form-group textarea { padding: 12px; border: 2px solid #e0e0e0; border-radius: 8px; font-size: 1rem; transition: border-color 0.3s ease; }
-        .form-group input:focus, .form-group select:focus, .form-group textarea:focus { outline: none; border-color: #ff6b6b; }
-        .form-group textarea { min-height: 100px; resize: vertical; }
-        .btn { background: linear-gradient(135deg, #ff6b6b, #ee5a52); color: white; border: none; padding: 15px 30px; font-size: 1.1rem; border-radius: 10px; cursor: pointer; transition: transform 0.3s ease; width: 100%; margin-bottom: 15px; }
-        .btn:hover { transform: translateY(-2px); }
-        .btn-secondary { background: linear-gradient(135deg, #74b9ff, #0984e3); }
-        .menu-item { background: #f8f9fa; border-radius: 10px; padding: 20px; margin-bottom: 15px; border-left: 4px solid #ff6b6b; }
-        .menu-item h4 { color: #d63031; margin-bottom: 10px; font-size: 1.2rem; }
-        .menu-item-details { display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 10px; font-size: 0.9rem; color: #666; }
-        .recommendation { background: #e8f5e8; border-left: 4px solid #00b894; padding: 20px; margin-bottom: 15px; border-radius: 0 10px 10px 0; }
-        .recommendation.warning { background: #fff3cd; border-left-color: #ffc107; }
-        .recommendation.danger { background: #f8d7da; border-left-color: #dc3545; }
-        .recommendation h3 { margin-bottom: 10px; }
-        .recommendation p { line-height: 1.6; }
-        .charts-section { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 30px; margin-bottom: 30px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); }
-        .chart-container { height: 350px; background: #f8f9fa; border-radius: 10px; padding: 20px; margin-bottom: 20px; }
-        .loading-overlay { position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0, 0, 0, 0.8); display: flex; flex-direction: column; align-items: center; justify-content: center; z-index: 1000; color: white; }
-        .spinner { width: 50px; height: 50px; border: 5px solid #333; border-top: 5px solid #ff6b6b; border-radius: 50%; animation: spin 1s linear infinite; margin-bottom: 20px; }
-        @keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
-        .no-data { text-align: center; color: #999; font-style: italic; padding: 40px; }
-        @media (max-width: 768px) { .main-content { grid-template-columns: 1fr; } .form-grid { grid-template-columns: 1fr; } .stats-grid { grid-template-columns: repeat(2, 1fr); } .header h1 { font-size: 2rem; } .container { padding: 15px; } }
-        @media (max-width: 480px) { .stats-grid { grid-template-columns: 1fr; } }
-        .profit-badge { background: #00b894; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8rem; font-weight: bold; }
-        .loss-badge { background: #e17055; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8rem; font-weight: bold; }
-        .neutral-badge { background: #74b9ff; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8rem; font-weight: bold; }
-    </style>
+    <link rel="preload" href="{{ fontawesome_css }}" as="style" onload="this.onload=null; this.rel='stylesheet'">
+    <noscript><link href="{{ fontawesome_css }}" rel="stylesheet"></noscript>
+    <link href="{{ dashboard_css }}" rel="stylesheet">
+    <script src="{{ chart_js }}" defer></script>
+    <script src="{{ dashboard_js }}" defer></script>
 </head>
 <body>
     <div class="container">
@@ -174,6 +217,9 @@ HTML_TEMPLATE = """
                 <button onclick="costAnalysis()" class="btn btn-secondary">
                     <i class="fas fa-calculator"></i> Cost Analysis
                 </button>
+                <button onclick="fullReport()" class="btn">
+                    <i class="fas fa-clipboard-list"></i> Full Report
+                </button>
             </section>
         </div>
 
@@ -217,848 +263,5301 @@ HTML_TEMPLATE = """
         <p>Analyzing menu data...</p>
     </div>
 
-    <script>
-        let menuItems = [];
-        let currentAnalysis = null;
+</body>
+</html>
+"""
 
-        document.addEventListener('DOMContentLoaded', function() {
-            setupFormSubmission();
-            updateDisplay();
-        });
+# Dashboard stylesheet and script, served as fingerprinted assets
+DASHBOARD_CSS = """
+* { margin: 0; padding: 0; box-sizing: border-box; }
+body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: linear-gradient(135deg, #ff6b6b 0%, #feca57 100%); min-height: 100vh; color: #333; }
+.container { max-width: 1400px; margin: 0 auto; padding: 20px; }
+.header { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 30px; text-align: center; margin-bottom: 30px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); backdrop-filter: blur(10px); }
+.header h1 { color: #d63031; font-size: 2.5rem; margin-bottom: 10px; }
+.header p { color: #666; font-size: 1.2rem; }
+.stats-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 20px; margin-bottom: 30px; }
+.stat-card { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 25px; display: flex; align-items: center; cursor: pointer; transition: transform 0.3s ease, box-shadow 0.3s ease; box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1); }
+.stat-card:hover { transform: translateY(-5px); box-shadow: 0 8px 30px rgba(0, 0, 0, 0.15); }
+.stat-icon { background: #ff6b6b; color: white; width: 60px; height: 60px; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 1.5rem; margin-right: 20px; }
+.stat-content h3 { font-size: 2rem; color: #d63031; margin-bottom: 5px; }
+.stat-content p { color: #666; font-size: 1rem; }
+.main-content { display: grid; grid-template-columns: 1fr 1fr; gap: 30px; margin-bottom: 30px; }
+.section { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 30px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); }
+.section h2 { color: #d63031; margin-bottom: 25px; font-size: 1.8rem; }
+.form-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }
+.form-group { display: flex; flex-direction: column; }
+.form-group label { color: #555; margin-bottom: 8px; font-weight: 600; }
+.form-group input, .form-group select, .form-group textarea { padding: 12px; border: 2px solid #e0e0e0; border-radius: 8px; font-size: 1rem; transition: border-color 0.3s ease; }
+.form-group input:focus, .form-group select:focus, .form-group textarea:focus { outline: none; border-color: #ff6b6b; }
+.form-group textarea { min-height: 100px; resize: vertical; }
+.btn { background: linear-gradient(135deg, #ff6b6b, #ee5a52); color: white; border: none; padding: 15px 30px; font-size: 1.1rem; border-radius: 10px; cursor: pointer; transition: transform 0.3s ease; width: 100%; margin-bottom: 15px; }
+.btn:hover { transform: translateY(-2px); }
+.btn-secondary { background: linear-gradient(135deg, #74b9ff, #0984e3); }
+.menu-item { background: #f8f9fa; border-radius: 10px; padding: 20px; margin-bottom: 15px; border-left: 4px solid #ff6b6b; }
+.menu-item h4 { color: #d63031; margin-bottom: 10px; font-size: 1.2rem; }
+.menu-item-details { display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 10px; font-size: 0.9rem; color: #666; }
+.recommendation { background: #e8f5e8; border-left: 4px solid #00b894; padding: 20px; margin-bottom: 15px; border-radius: 0 10px 10px 0; }
+.recommendation.warning { background: #fff3cd; border-left-color: #ffc107; }
+.recommendation.danger { background: #f8d7da; border-left-color: #dc3545; }
+.recommendation h3 { margin-bottom: 10px; }
+.recommendation p { line-height: 1.6; }
+.charts-section { background: rgba(255, 255, 255, 0.95); border-radius: 15px; padding: 30px; margin-bottom: 30px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); }
+.chart-container { height: 350px; background: #f8f9fa; border-radius: 10px; padding: 20px; margin-bottom: 20px; }
+.loading-overlay { position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0, 0, 0, 0.8); display: flex; flex-direction: column; align-items: center; justify-content: center; z-index: 1000; color: white; }
+.spinner { width: 50px; height: 50px; border: 5px solid #333; border-top: 5px solid #ff6b6b; border-radius: 50%; animation: spin 1s linear infinite; margin-bottom: 20px; }
+@keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
+.no-data { text-align: center; color: #999; font-style: italic; padding: 40px; }
+@media (max-width: 768px) { .main-content { grid-template-columns: 1fr; } .form-grid { grid-template-columns: 1fr; } .stats-grid { grid-template-columns: repeat(2, 1fr); } .header h1 { font-size: 2rem; } .container { padding: 15px; } }
+@media (max-width: 480px) { .stats-grid { grid-template-columns: 1fr; } }
+.profit-badge { background: #00b894; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8rem; font-weight: bold; }
+.loss-badge { background: #e17055; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8rem; font-weight: bold; }
+.neutral-badge { background: #74b9ff; color: white; padding: 4px 8px; border-radius: 12px; font-size: 0.8rem; font-weight: bold; }
+"""
 
-        function setupFormSubmission() {
-            const form = document.getElementById('menu-form');
-            form.addEventListener('submit', function(e) {
-                e.preventDefault();
-                addMenuItem();
-            });
-        }
+DASHBOARD_JS = """
+// /<restaurant>/ serves that restaurant's dashboard; / is the default one
+const restaurantMatch = location.pathname.match(/^\\/([^\\/]+)\\/?$/);
+const API_BASE = restaurantMatch ? '/api/' + restaurantMatch[1] : '/api';
+// Only the pages scrolled into view are loaded; the stat cards come from the server
+let menuItems = [];
+let menuVersion = 0;
+let menuStats = null;
+let menuComplete = false;
+let menuRequest = null;
+let menuGeneration = 0;
+const MENU_PAGE_SIZE = 50;
+const MENU_PAGE_MAX = 1000;
+const RECOMMENDATION_PAGE_SIZE = 50;
+const menuPager = window.IntersectionObserver ? new IntersectionObserver(function(entries) {
+    if (entries.some(entry => entry.isIntersecting)) {
+        loadMenuPage();
+    }
+}, { rootMargin: '400px' }) : null;
+let currentAnalysis = null;
 
-        function addMenuItem() {
-            const formData = {
-                name: document.getElementById('item-name').value,
-                category: document.getElementById('category').value,
-                sellingPrice: parseFloat(document.getElementById('selling-price').value),
-                foodCost: parseFloat(document.getElementById('food-cost').value),
-                prepTime: parseInt(document.getElementById('prep-time').value),
-                monthlySales: parseInt(document.getElementById('monthly-sales').value),
-                ingredients: document.getElementById('ingredients').value.split('\\n').filter(i => i.trim())
-            };
-
-            document.getElementById('loading-overlay').style.display = 'flex';
-
-            fetch('/api/menu-item', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(formData)
-            })
-            .then(response => response.json())
-            .then(result => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                if (result.success) {
-                    menuItems = result.menuItems;
-                    updateDisplay();
-                    document.getElementById('menu-form').reset();
-                    showNotification('Menu item added successfully!', 'success');
-                } else {
-                    showNotification('Error: ' + result.error, 'error');
-                }
-            })
-            .catch(error => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                showNotification('Failed to add menu item. Please try again.', 'error');
-            });
-        }
+document.addEventListener('DOMContentLoaded', function() {
+    setupFormSubmission();
+    updateDisplay();
+    loadMenuPage();
+    subscribeToUpdates();
+});
 
-        function updateDisplay() {
+function subscribeToUpdates() {
+    if (!window.EventSource) {
+        return;
+    }
+    // The browser reconnects on its own; every connection starts with a stats event
+    const events = new EventSource(API_BASE + '/stream');
+    events.addEventListener('stats', function(event) {
+        const update = JSON.parse(event.data);
+        menuStats = update.stats;
+        if (update.version !== menuVersion) {
+            reloadMenuItems();
+        } else {
             updateStats();
-            displayMenuItems();
         }
-
-        function updateStats() {
-            if (menuItems.length === 0) {
-                document.getElementById('total-revenue').textContent = '$0';
-                document.getElementById('menu-items').textContent = '0';
-                document.getElementById('avg-margin').textContent = '0%';
-                document.getElementById('bestseller').textContent = '-';
-                return;
+    });
+    events.addEventListener('menu', function(event) {
+        const update = JSON.parse(event.data);
+        menuStats = update.stats;
+        if (update.version <= menuVersion) {
+            updateStats();
+        } else if (update.previousVersion === menuVersion && !update.truncated) {
+            replaceMenuItems(update.updated);
+            removeMenuItems(update.deleted);
+            // New items sort after every page, so they only show once the last page is loaded
+            if (menuComplete) {
+                appendMenuItems(update.items);
             }
+            menuVersion = update.version;
+            updateDisplay();
+        } else {
+            // Missed events may have rewritten items we hold, not just added new ones
+            reloadMenuItems();
+        }
+    });
+}
 
-            const totalRevenue = menuItems.reduce((sum, item) => sum + (item.sellingPrice * item.monthlySales), 0);
-            const avgMargin = menuItems.reduce((sum, item) => {
-                const margin = ((item.sellingPrice - item.foodCost) / item.sellingPrice) * 100;
-                return sum + margin;
-            }, 0) / menuItems.length;
-            
-            const bestseller = menuItems.reduce((max, item) => 
-                item.monthlySales > max.monthlySales ? item : max, menuItems[0]);
+function appendMenuItems(items) {
+    // Syncs, stream events and our own writes can overlap; ids only grow, so skip any we hold
+    const lastId = menuItems.length ? menuItems[menuItems.length - 1].id : 0;
+    menuItems = menuItems.concat(items.filter(item => item.id > lastId));
+}
 
-            document.getElementById('total-revenue').textContent = '$' + totalRevenue.toLocaleString();
-            document.getElementById('menu-items').textContent = menuItems.length;
-            document.getElementById('avg-margin').textContent = Math.round(avgMargin) + '%';
-            document.getElementById('bestseller').textContent = bestseller.name;
-        }
+function replaceMenuItems(items) {
+    const byId = new Map(items.map(item => [item.id, item]));
+    menuItems = menuItems.map(item => byId.get(item.id) || item);
+}
 
-        function displayMenuItems() {
-            const container = document.getElementById('menu-items-container');
-            
-            if (menuItems.length === 0) {
-                container.innerHTML = '<p class="no-data">No menu items added yet. Add your first item above!</p>';
-                return;
-            }
+function removeMenuItems(itemIds) {
+    const deleted = new Set(itemIds);
+    menuItems = menuItems.filter(item => !deleted.has(item.id));
+}
 
-            container.innerHTML = menuItems.map(item => {
-                const profit = item.sellingPrice - item.foodCost;
-                const margin = ((profit / item.sellingPrice) * 100).toFixed(1);
-                const monthlyProfit = profit * item.monthlySales;
-                
-                let badgeClass = 'neutral-badge';
-                let badgeText = 'Normal';
-                if (margin > 70) { badgeClass = 'profit-badge'; badgeText = 'High Margin'; }
-                else if (margin < 30) { badgeClass = 'loss-badge'; badgeText = 'Low Margin'; }
-                
-                return `
-                    <div class="menu-item">
-                        <h4>${item.name} <span class="${badgeClass}">${badgeText}</span></h4>
-                        <div class="menu-item-details">
-                            <div><strong>Category:</strong> ${item.category}</div>
-                            <div><strong>Price:</strong> $${item.sellingPrice.toFixed(2)}</div>
-                            <div><strong>Food Cost:</strong> $${item.foodCost.toFixed(2)}</div>
-                            <div><strong>Profit:</strong> $${profit.toFixed(2)} (${margin}%)</div>
-                            <div><strong>Monthly Sales:</strong> ${item.monthlySales} units</div>
-                            <div><strong>Monthly Profit:</strong> $${monthlyProfit.toFixed(2)}</div>
-                            <div><strong>Prep Time:</strong> ${item.prepTime} min</div>
-                        </div>
-                    </div>
-                `;
-            }).join('');
+function reloadMenuItems() {
+    // Reload as many items as were on screen, so the list keeps its place
+    const limit = Math.min(Math.max(menuItems.length, MENU_PAGE_SIZE), MENU_PAGE_MAX);
+    menuGeneration++;
+    menuRequest = null;
+    menuItems = [];
+    menuVersion = 0;
+    menuComplete = false;
+    return loadMenuPage(limit);
+}
+
+function loadMenuPage(limit) {
+    // Pages are keyed by id: the next one starts after the last item we hold
+    if (menuRequest) {
+        return menuRequest;
+    }
+    const generation = menuGeneration;
+    const lastId = menuItems.length ? menuItems[menuItems.length - 1].id : 0;
+    const request = fetch(API_BASE + '/menu-items?limit=' + (limit || MENU_PAGE_SIZE) + '&cursor=' + lastId)
+    .then(response => response.json())
+    .then(result => {
+        if (generation !== menuGeneration) {
+            return;  // a reload started over while this page was on its way
+        }
+        appendMenuItems(result.items);
+        if (result.version >= menuVersion) {
+            menuStats = result.stats;
+        }
+        menuComplete = result.nextCursor === null;
+        menuVersion = Math.max(menuVersion, result.version);
+        updateDisplay();
+    })
+    .catch(error => showNotification('Failed to load menu items.', 'error'))
+    .finally(() => {
+        if (menuRequest === request) {
+            menuRequest = null;
         }
+    });
+    menuRequest = request;
+    return request;
+}
 
-        function generateReport() {
-            if (menuItems.length === 0) {
-                showNotification('Add menu items first to generate a report.', 'warning');
-                return;
-            }
+function menuItemCount() {
+    return menuStats ? menuStats.itemCount : menuItems.length;
+}
 
-            document.getElementById('loading-overlay').style.display = 'flex';
-
-            fetch('/api/analysis/profit')
-            .then(response => response.json())
-            .then(result => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                displayRecommendations(result.recommendations);
-                showChartsSection();
-                showNotification('Profit analysis completed!', 'success');
-            })
-            .catch(error => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                showNotification('Analysis failed. Please try again.', 'error');
-            });
-        }
+function setupFormSubmission() {
+    const form = document.getElementById('menu-form');
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        addMenuItem();
+    });
+}
 
-        function optimizePricing() {
-            if (menuItems.length === 0) {
-                showNotification('Add menu items first to optimize pricing.', 'warning');
-                return;
-            }
+function addMenuItem() {
+    const formData = {
+        name: document.getElementById('item-name').value,
+        category: document.getElementById('category').value,
+        sellingPrice: parseFloat(document.getElementById('selling-price').value),
+        foodCost: parseFloat(document.getElementById('food-cost').value),
+        prepTime: parseInt(document.getElementById('prep-time').value),
+        monthlySales: parseInt(document.getElementById('monthly-sales').value),
+        ingredients: document.getElementById('ingredients').value.split('\\n').filter(i => i.trim())
+    };
 
-            document.getElementById('loading-overlay').style.display = 'flex';
-
-            fetch('/api/analysis/pricing')
-            .then(response => response.json())
-            .then(result => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                displayRecommendations(result.recommendations);
-                showNotification('Pricing optimization completed!', 'success');
-            })
-            .catch(error => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                showNotification('Pricing optimization failed. Please try again.', 'error');
-            });
-        }
+    document.getElementById('loading-overlay').style.display = 'flex';
 
-        function identifyTrends() {
-            if (menuItems.length === 0) {
-                showNotification('Add menu items first to identify trends.', 'warning');
-                return;
+    fetch(API_BASE + '/menu-item', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(formData)
+    })
+    .then(response => response.json())
+    .then(result => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        if (result.success) {
+            if (result.version === menuVersion + 1) {
+                if (menuComplete) {
+                    appendMenuItems([result.menuItem]);
+                }
+                menuVersion = result.version;
+                updateDisplay();
+            } else {
+                // Someone else changed the menu in between; reload what we hold
+                reloadMenuItems();
             }
-
-            document.getElementById('loading-overlay').style.display = 'flex';
-
-            fetch('/api/analysis/trends')
-            .then(response => response.json())
-            .then(result => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                displayRecommendations(result.recommendations);
-                showNotification('Trend analysis completed!', 'success');
-            })
-            .catch(error => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                showNotification('Trend analysis failed. Please try again.', 'error');
-            });
+            document.getElementById('menu-form').reset();
+            showNotification('Menu item added successfully!', 'success');
+        } else {
+            showNotification('Error: ' + result.error, 'error');
         }
+    })
+    .catch(error => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        showNotification('Failed to add menu item. Please try again.', 'error');
+    });
+}
 
-        function costAnalysis() {
-            if (menuItems.length === 0) {
-                showNotification('Add menu items first for cost analysis.', 'warning');
-                return;
-            }
+function updateDisplay() {
+    updateStats();
+    displayMenuItems();
+}
 
-            document.getElementById('loading-overlay').style.display = 'flex';
-
-            fetch('/api/analysis/costs')
-            .then(response => response.json())
-            .then(result => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                displayRecommendations(result.recommendations);
-                showNotification('Cost analysis completed!', 'success');
-            })
-            .catch(error => {
-                document.getElementById('loading-overlay').style.display = 'none';
-                showNotification('Cost analysis failed. Please try again.', 'error');
-            });
-        }
+function updateStats() {
+    // Server-side totals, from menu pages and the live stream, cover items not paged in yet
+    if (!menuStats || menuStats.itemCount === 0) {
+        document.getElementById('total-revenue').textContent = '$0';
+        document.getElementById('menu-items').textContent = '0';
+        document.getElementById('avg-margin').textContent = '0%';
+        document.getElementById('bestseller').textContent = '-';
+        return;
+    }
+    document.getElementById('total-revenue').textContent = '$' + menuStats.totalRevenue.toLocaleString();
+    document.getElementById('menu-items').textContent = menuStats.itemCount;
+    document.getElementById('avg-margin').textContent = Math.round(menuStats.avgMargin) + '%';
+    document.getElementById('bestseller').textContent = menuStats.bestseller || '-';
+}
 
-        function displayRecommendations(recommendations) {
-            const container = document.getElementById('recommendations-container');
-            const section = document.getElementById('recommendations-section');
-            
-            container.innerHTML = recommendations.map(rec => `
-                <div class="recommendation ${rec.type || ''}">
-                    <h3>${rec.title}</h3>
-                    <p>${rec.description}</p>
+function displayMenuItems() {
+    const container = document.getElementById('menu-items-container');
+    if (menuPager) {
+        menuPager.disconnect();
+    }
+
+    if (menuItems.length === 0 && menuComplete) {
+        container.innerHTML = '<p class="no-data">No menu items added yet. Add your first item above!</p>';
+        return;
+    }
+
+    container.innerHTML = menuItems.map(item => {
+        const profit = item.sellingPrice - item.foodCost;
+        const margin = ((profit / item.sellingPrice) * 100).toFixed(1);
+        const monthlyProfit = profit * item.monthlySales;
+
+        let badgeClass = 'neutral-badge';
+        let badgeText = 'Normal';
+        if (margin > 70) { badgeClass = 'profit-badge'; badgeText = 'High Margin'; }
+        else if (margin < 30) { badgeClass = 'loss-badge'; badgeText = 'Low Margin'; }
+
+        return `
+            <div class="menu-item">
+                <h4>${item.name} <span class="${badgeClass}">${badgeText}</span></h4>
+                <div class="menu-item-details">
+                    <div><strong>Category:</strong> ${item.category}</div>
+                    <div><strong>Price:</strong> $${item.sellingPrice.toFixed(2)}</div>
+                    <div><strong>Food Cost:</strong> $${item.foodCost.toFixed(2)}</div>
+                    <div><strong>Profit:</strong> $${profit.toFixed(2)} (${margin}%)</div>
+                    <div><strong>Monthly Sales:</strong> ${item.monthlySales} units</div>
+                    <div><strong>Monthly Profit:</strong> $${monthlyProfit.toFixed(2)}</div>
+                    <div><strong>Prep Time:</strong> ${item.prepTime} min</div>
                 </div>
-            `).join('');
-            
-            section.style.display = 'block';
-            section.scrollIntoView({ behavior: 'smooth' });
-        }
+            </div>
+        `;
+    }).join('');
 
-        function showChartsSection() {
-            document.getElementById('charts-section').style.display = 'block';
-            generateCharts();
+    if (!menuComplete && menuStats) {
+        // Scrolling the button into view loads the next page; clicking it works without an observer
+        const remaining = Math.max(menuItemCount() - menuItems.length, 0);
+        container.insertAdjacentHTML('beforeend',
+            `<button class="btn btn-secondary" onclick="loadMenuPage()">Show more (${remaining} remaining)</button>`);
+        if (menuPager) {
+            menuPager.observe(container.lastElementChild);
         }
+    }
+}
 
-        function generateCharts() {
-            if (menuItems.length === 0) return;
+function generateReport() {
+    if (menuItemCount() === 0) {
+        showNotification('Add menu items first to generate a report.', 'warning');
+        return;
+    }
 
-            // Destroy existing charts
-            Chart.helpers.each(Chart.instances, function(instance) {
-                instance.destroy();
-            });
+    document.getElementById('loading-overlay').style.display = 'flex';
 
-            generateProfitChart();
-            generateSalesChart();
-            generateMarginChart();
-            generateCostChart();
-        }
+    fetch(API_BASE + '/analysis/profit')
+    .then(response => response.json())
+    .then(result => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        displayRecommendations(result.recommendations);
+        showChartsSection();
+        showNotification('Profit analysis completed!', 'success');
+    })
+    .catch(error => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        showNotification('Analysis failed. Please try again.', 'error');
+    });
+}
 
-        function generateProfitChart() {
-            const ctx = document.getElementById('profitChart').getContext('2d');
-            
-            // Group by category
-            const categoryData = {};
-            menuItems.forEach(item => {
-                if (!categoryData[item.category]) {
-                    categoryData[item.category] = 0;
-                }
-                categoryData[item.category] += item.monthlyProfit;
-            });
-
-            new Chart(ctx, {
-                type: 'doughnut',
-                data: {
-                    labels: Object.keys(categoryData),
-                    datasets: [{
-                        data: Object.values(categoryData),
-                        backgroundColor: [
-                            '#ff6b6b', '#74b9ff', '#00b894', '#feca57', 
-                            '#e17055', '#a29bfe', '#fd79a8', '#fdcb6e'
-                        ],
-                        borderWidth: 2,
-                        borderColor: '#fff'
-                    }]
+function optimizePricing() {
+    if (menuItemCount() === 0) {
+        showNotification('Add menu items first to optimize pricing.', 'warning');
+        return;
+    }
+
+    document.getElementById('loading-overlay').style.display = 'flex';
+
+    // Pricing yields a recommendation per item, so fetch it a page at a time, highest impact first
+    fetch(API_BASE + '/analysis/pricing?limit=' + RECOMMENDATION_PAGE_SIZE)
+    .then(response => response.json())
+    .then(result => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        displayRecommendations(result.recommendations);
+        showMoreRecommendations('pricing', result);
+        showNotification('Pricing optimization completed!', 'success');
+    })
+    .catch(error => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        showNotification('Pricing optimization failed. Please try again.', 'error');
+    });
+}
+
+function identifyTrends() {
+    if (menuItemCount() === 0) {
+        showNotification('Add menu items first to identify trends.', 'warning');
+        return;
+    }
+
+    document.getElementById('loading-overlay').style.display = 'flex';
+
+    fetch(API_BASE + '/analysis/trends')
+    .then(response => response.json())
+    .then(result => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        displayRecommendations(result.recommendations);
+        showNotification('Trend analysis completed!', 'success');
+    })
+    .catch(error => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        showNotification('Trend analysis failed. Please try again.', 'error');
+    });
+}
+
+function costAnalysis() {
+    if (menuItemCount() === 0) {
+        showNotification('Add menu items first for cost analysis.', 'warning');
+        return;
+    }
+
+    document.getElementById('loading-overlay').style.display = 'flex';
+
+    fetch(API_BASE + '/analysis/costs')
+    .then(response => response.json())
+    .then(result => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        displayRecommendations(result.recommendations);
+        showNotification('Cost analysis completed!', 'success');
+    })
+    .catch(error => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        showNotification('Cost analysis failed. Please try again.', 'error');
+    });
+}
+
+function fullReport() {
+    if (menuItemCount() === 0) {
+        showNotification('Add menu items first to generate a full report.', 'warning');
+        return;
+    }
+
+    document.getElementById('loading-overlay').style.display = 'flex';
+
+    fetch(API_BASE + '/analysis/all')
+    .then(response => response.json())
+    .then(result => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        const sections = result.sections;
+        displayRecommendations(['profit', 'pricing', 'trends', 'costs'].flatMap(name => sections[name] || []));
+        showChartsSection();
+        showNotification('Full report completed!', 'success');
+    })
+    .catch(error => {
+        document.getElementById('loading-overlay').style.display = 'none';
+        showNotification('Full report failed. Please try again.', 'error');
+    });
+}
+
+function recommendationHtml(rec) {
+    return `
+        <div class="recommendation ${rec.type || ''}">
+            <h3>${rec.title}</h3>
+            <p>${rec.description}</p>
+        </div>
+    `;
+}
+
+function displayRecommendations(recommendations) {
+    const container = document.getElementById('recommendations-container');
+    const section = document.getElementById('recommendations-section');
+
+    container.innerHTML = recommendations.map(recommendationHtml).join('');
+
+    section.style.display = 'block';
+    section.scrollIntoView({ behavior: 'smooth' });
+}
+
+function showMoreRecommendations(analysis, page) {
+    if (page.nextOffset === null) return;
+
+    const container = document.getElementById('recommendations-container');
+    const button = document.createElement('button');
+    button.className = 'btn btn-secondary';
+    button.textContent = 'Show more (' + (page.total - page.nextOffset) + ' remaining)';
+    button.onclick = () => {
+        button.remove();
+        fetch(API_BASE + '/analysis/' + analysis + '?limit=' + RECOMMENDATION_PAGE_SIZE + '&offset=' + page.nextOffset)
+        .then(response => response.json())
+        .then(nextPage => {
+            container.insertAdjacentHTML('beforeend', nextPage.recommendations.map(recommendationHtml).join(''));
+            showMoreRecommendations(analysis, nextPage);
+        })
+        .catch(error => showNotification('Failed to load more recommendations.', 'error'));
+    };
+    container.appendChild(button);
+}
+
+function showChartsSection() {
+    document.getElementById('charts-section').style.display = 'block';
+    generateCharts();
+}
+
+function generateCharts() {
+    if (menuItemCount() === 0) return;
+
+    // Chart data is aggregated on the server, so only a few KB come back per chart
+    const charts = ['category-profit', 'top-sellers', 'margin-histogram', 'cost-scatter'];
+    Promise.all(charts.map(name => fetch(API_BASE + '/charts/' + name).then(response => response.json())))
+    .then(([profitData, salesData, marginData, costData]) => {
+        // Destroy existing charts
+        Chart.helpers.each(Chart.instances, function(instance) {
+            instance.destroy();
+        });
+
+        generateProfitChart(profitData);
+        generateSalesChart(salesData);
+        generateMarginChart(marginData);
+        generateCostChart(costData);
+    })
+    .catch(error => showNotification('Failed to load chart data.', 'error'));
+}
+
+function generateProfitChart(chartData) {
+    const ctx = document.getElementById('profitChart').getContext('2d');
+
+    new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: chartData.labels,
+            datasets: [{
+                data: chartData.values,
+                backgroundColor: [
+                    '#ff6b6b', '#74b9ff', '#00b894', '#feca57', 
+                    '#e17055', '#a29bfe', '#fd79a8', '#fdcb6e'
+                ],
+                borderWidth: 2,
+                borderColor: '#fff'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        padding: 20,
+                        usePointStyle: true
+                    }
                 },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            position: 'bottom',
-                            labels: {
-                                padding: 20,
-                                usePointStyle: true
-                            }
-                        },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    return context.label + ': $' + context.parsed.toLocaleString();
-                                }
-                            }
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return context.label + ': $' + context.parsed.toLocaleString();
                         }
                     }
                 }
-            });
+            }
         }
+    });
+}
 
-        function generateSalesChart() {
-            const ctx = document.getElementById('salesChart').getContext('2d');
-            
-            // Sort items by sales volume
-            const sortedItems = [...menuItems].sort((a, b) => b.monthlySales - a.monthlySales);
-            const topItems = sortedItems.slice(0, 8); // Show top 8 items
-
-            new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: topItems.map(item => item.name.length > 15 ? item.name.substring(0, 15) + '...' : item.name),
-                    datasets: [{
-                        label: 'Monthly Sales (Units)',
-                        data: topItems.map(item => item.monthlySales),
-                        backgroundColor: '#74b9ff',
-                        borderColor: '#0984e3',
-                        borderWidth: 1
-                    }]
+function generateSalesChart(chartData) {
+    const ctx = document.getElementById('salesChart').getContext('2d');
+
+    new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: chartData.labels.map(name => name.length > 15 ? name.substring(0, 15) + '...' : name),
+            datasets: [{
+                label: 'Monthly Sales (Units)',
+                data: chartData.values,
+                backgroundColor: '#74b9ff',
+                borderColor: '#0984e3',
+                borderWidth: 1
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: false
                 },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            display: false
-                        },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    return 'Sales: ' + context.parsed.y + ' units';
-                                }
-                            }
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return 'Sales: ' + context.parsed.y + ' units';
                         }
-                    },
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                callback: function(value) {
-                                    return value + ' units';
-                                }
-                            }
-                        },
-                        x: {
-                            ticks: {
-                                maxRotation: 45
-                            }
+                    }
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        callback: function(value) {
+                            return value + ' units';
                         }
                     }
+                },
+                x: {
+                    ticks: {
+                        maxRotation: 45
+                    }
                 }
-            });
+            }
         }
+    });
+}
 
-        function generateMarginChart() {
-            const ctx = document.getElementById('marginChart').getContext('2d');
-            
-            // Create margin ranges
-            const ranges = {
-                'Excellent (70%+)': 0,
-                'Good (50-70%)': 0,
-                'Fair (30-50%)': 0,
-                'Poor (<30%)': 0
-            };
-
-            menuItems.forEach(item => {
-                const margin = item.profitMargin;
-                if (margin >= 70) ranges['Excellent (70%+)']++;
-                else if (margin >= 50) ranges['Good (50-70%)']++;
-                else if (margin >= 30) ranges['Fair (30-50%)']++;
-                else ranges['Poor (<30%)']++;
-            });
-
-            new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: Object.keys(ranges),
-                    datasets: [{
-                        label: 'Number of Items',
-                        data: Object.values(ranges),
-                        backgroundColor: ['#00b894', '#74b9ff', '#feca57', '#e17055'],
-                        borderColor: ['#00a085', '#0984e3', '#e1b12c', '#d63031'],
-                        borderWidth: 1
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            display: false
-                        }
-                    },
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                stepSize: 1,
-                                callback: function(value) {
-                                    return value + ' items';
-                                }
-                            }
+function generateMarginChart(chartData) {
+    const ctx = document.getElementById('marginChart').getContext('2d');
+
+    // Bands arrive lowest first; show the best margins first
+    const bandNames = ['Poor', 'Fair', 'Good', 'Excellent'];
+    const labels = chartData.labels.map((label, i) => bandNames[i] + ' (' + label + ')').reverse();
+    const counts = [...chartData.counts].reverse();
+
+    new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Number of Items',
+                data: counts,
+                backgroundColor: ['#00b894', '#74b9ff', '#feca57', '#e17055'],
+                borderColor: ['#00a085', '#0984e3', '#e1b12c', '#d63031'],
+                borderWidth: 1
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: false
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 1,
+                        callback: function(value) {
+                            return value + ' items';
                         }
                     }
                 }
-            });
+            }
         }
+    });
+}
 
-        function generateCostChart() {
-            const ctx = document.getElementById('costChart').getContext('2d');
-            
-            // Create scatter plot of cost vs price
-            const data = menuItems.map(item => ({
-                x: item.foodCost,
-                y: item.sellingPrice,
-                label: item.name,
-                profit: item.sellingPrice - item.foodCost
-            }));
-
-            new Chart(ctx, {
-                type: 'scatter',
-                data: {
-                    datasets: [{
-                        label: 'Menu Items',
-                        data: data,
-                        backgroundColor: function(context) {
-                            const profit = context.parsed.y - context.parsed.x;
-                            const margin = (profit / context.parsed.y) * 100;
-                            if (margin >= 60) return '#00b894';
-                            if (margin >= 40) return '#74b9ff';
-                            return '#e17055';
-                        },
-                        borderColor: '#fff',
-                        borderWidth: 2,
-                        pointRadius: 8,
-                        pointHoverRadius: 10
-                    }]
+function generateCostChart(chartData) {
+    const ctx = document.getElementById('costChart').getContext('2d');
+
+    // Scatter plot of cost vs price; large menus arrive thinned, one point per area
+    const data = chartData.points;
+
+    new Chart(ctx, {
+        type: 'scatter',
+        data: {
+            datasets: [{
+                label: 'Menu Items',
+                data: data,
+                backgroundColor: function(context) {
+                    const profit = context.parsed.y - context.parsed.x;
+                    const margin = (profit / context.parsed.y) * 100;
+                    if (margin >= 60) return '#00b894';
+                    if (margin >= 40) return '#74b9ff';
+                    return '#e17055';
+                },
+                borderColor: '#fff',
+                borderWidth: 2,
+                pointRadius: 8,
+                pointHoverRadius: 10
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: false
                 },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            display: false
+                tooltip: {
+                    callbacks: {
+                        title: function(context) {
+                            return context[0].raw.name;
                         },
-                        tooltip: {
-                            callbacks: {
-                                title: function(context) {
-                                    return menuItems[context[0].dataIndex].name;
-                                },
-                                label: function(context) {
-                                    const item = menuItems[context.dataIndex];
-                                    const margin = ((item.sellingPrice - item.foodCost) / item.sellingPrice * 100).toFixed(1);
-                                    return [
-                                        'Food Cost: $' + context.parsed.x.toFixed(2),
-                                        'Selling Price: $' + context.parsed.y.toFixed(2),
-                                        'Profit Margin: ' + margin + '%'
-                                    ];
-                                }
+                        label: function(context) {
+                            const point = context.raw;
+                            const margin = ((point.y - point.x) / point.y * 100).toFixed(1);
+                            const lines = [
+                                'Food Cost: $' + context.parsed.x.toFixed(2),
+                                'Selling Price: $' + context.parsed.y.toFixed(2),
+                                'Profit Margin: ' + margin + '%'
+                            ];
+                            if (point.count > 1) {
+                                lines.push('Similar items nearby: ' + (point.count - 1));
                             }
-                        }
-                    },
-                    scales: {
-                        x: {
-                            title: {
-                                display: true,
-                                text: 'Food Cost ($)'
-                            },
-                            beginAtZero: true
-                        },
-                        y: {
-                            title: {
-                                display: true,
-                                text: 'Selling Price ($)'
-                            },
-                            beginAtZero: true
+                            return lines;
                         }
                     }
                 }
-            });
+            },
+            scales: {
+                x: {
+                    title: {
+                        display: true,
+                        text: 'Food Cost ($)'
+                    },
+                    beginAtZero: true
+                },
+                y: {
+                    title: {
+                        display: true,
+                        text: 'Selling Price ($)'
+                    },
+                    beginAtZero: true
+                }
+            }
         }
+    });
+}
 
-        function showStatInfo(type) {
-            const messages = {
-                revenue: 'Total monthly revenue from all menu items based on current sales data and pricing.',
-                items: 'Number of items currently on your menu. Consider optimal menu size for kitchen efficiency.',
-                margin: 'Average profit margin across all menu items. Industry standard is 60-70% for food.',
-                bestseller: 'Your highest selling item by volume. Consider promoting similar items or increasing capacity.'
-            };
-            alert(messages[type] || 'Statistical information about your menu performance.');
-        }
+function showStatInfo(type) {
+    const messages = {
+        revenue: 'Total monthly revenue from all menu items based on current sales data and pricing.',
+        items: 'Number of items currently on your menu. Consider optimal menu size for kitchen efficiency.',
+        margin: 'Average profit margin across all menu items. Industry standard is 60-70% for food.',
+        bestseller: 'Your highest selling item by volume. Consider promoting similar items or increasing capacity.'
+    };
+    alert(messages[type] || 'Statistical information about your menu performance.');
+}
 
-        function showNotification(message, type) {
-            const notification = document.createElement('div');
-            notification.textContent = message;
-            notification.style.cssText = `
-                position: fixed; top: 20px; right: 20px;
-                background: ${type === 'success' ? '#00b894' : type === 'warning' ? '#ffc107' : '#e17055'};
-                color: white; padding: 15px 20px; border-radius: 10px;
-                box-shadow: 0 4px 20px rgba(0,0,0,0.3); z-index: 1001;
-                font-weight: 600; max-width: 300px;
-            `;
-            document.body.appendChild(notification);
-            setTimeout(() => notification.remove(), 4000);
-        }
-    </script>
-</body>
-</html>
+function showNotification(message, type) {
+    const notification = document.createElement('div');
+    notification.textContent = message;
+    notification.style.cssText = `
+        position: fixed; top: 20px; right: 20px;
+        background: ${type === 'success' ? '#00b894' : type === 'warning' ? '#ffc107' : '#e17055'};
+        color: white; padding: 15px 20px; border-radius: 10px;
+        box-shadow: 0 4px 20px rgba(0,0,0,0.3); z-index: 1001;
+        font-weight: 600; max-width: 300px;
+    `;
+    document.body.appendChild(notification);
+    setTimeout(() => notification.remove(), 4000);
+}
 """
 
 # Sample data and business logic
-menu_items = []
 analysis_history = []
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
-
-@app.route('/api/menu-item', methods=['POST'])
-def add_menu_item():
-    """Add a new menu item"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['name', 'category', 'sellingPrice', 'foodCost', 'prepTime', 'monthlySales']
-        for field in required_fields:
-            if field not in data or data[field] == '':
-                return jsonify({"error": f"Missing field: {field}"}), 400
-        
-        # Create menu item
-        menu_item = {
-            "id": len(menu_items) + 1,
-            "name": data['name'],
-            "category": data['category'],
-            "sellingPrice": float(data['sellingPrice']),
-            "foodCost": float(data['foodCost']),
-            "prepTime": int(data['prepTime']),
-            "monthlySales": int(data['monthlySales']),
-            "ingredients": data.get('ingredients', []),
-            "profitMargin": calculate_profit_margin(float(data['sellingPrice']), float(data['foodCost'])),
-            "monthlyProfit": calculate_monthly_profit(float(data['sellingPrice']), float(data['foodCost']), int(data['monthlySales'])),
-            "createdAt": datetime.now().isoformat()
-        }
-        
-        menu_items.append(menu_item)
-        
-        return jsonify({
-            "success": True,
-            "menuItem": menu_item,
-            "menuItems": menu_items
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/analysis/profit')
-def profit_analysis():
-    """Generate profit analysis recommendations"""
-    if not menu_items:
-        return jsonify({"recommendations": []})
+class MenuAggregates:
+    """Running menu totals, kept current as items are written"""
     
-    recommendations = []
+    QUICK_PREP_MAX = 10
+    SLOW_PREP_MIN = 20
     
-    # Calculate overall metrics
-    total_revenue = sum(item['sellingPrice'] * item['monthlySales'] for item in menu_items)
-    total_profit = sum(item['monthlyProfit'] for item in menu_items)
-    avg_margin = sum(item['profitMargin'] for item in menu_items) / len(menu_items)
+    def __init__(self):
+        self.reset()
     
-    # High performers
-    high_profit_items = sorted(menu_items, key=lambda x: x['monthlyProfit'], reverse=True)[:3]
-    if high_profit_items:
-        top_item = high_profit_items[0]
-        recommendations.append({
-            "title": f"Star Performer: {top_item['name']}",
-            "description": f"This item generates ${top_item['monthlyProfit']:.2f} monthly profit with {top_item['profitMargin']:.1f}% margin. Consider featuring it prominently, training staff to upsell it, or creating similar items.",
-            "type": ""
-        })
+    def reset(self):
+        """Clear all totals"""
+        self.count = 0
+        self.total_revenue = 0
+        self.total_profit = 0
+        self.total_margin = 0
+        self.total_food_cost = 0
+        self.categories = {}
+        self.quick_count = 0
+        self.quick_sales = 0
+        self.slow_count = 0
+        self.slow_sales = 0
     
-    # Low performers
-    low_profit_items = [item for item in menu_items if item['profitMargin'] < 30]
-    if low_profit_items:
-        worst_item = min(low_profit_items, key=lambda x: x['profitMargin'])
-        recommendations.append({
-            "title": f"Underperformer Alert: {worst_item['name']}",
-            "description": f"Only {worst_item['profitMargin']:.1f}% margin (${worst_item['monthlyProfit']:.2f}/month). Consider increasing price by 15-20%, reducing portion size, or finding cheaper ingredients.",
-            "type": "warning"
-        })
+    def add(self, item):
+        """Fold a newly inserted item into the totals"""
+        self._apply(1, *self._item_values(item))
     
-    # Category analysis
-    category_profits = {}
-    for item in menu_items:
-        cat = item['category']
-        if cat not in category_profits:
-            category_profits[cat] = {'profit': 0, 'count': 0}
-        category_profits[cat]['profit'] += item['monthlyProfit']
-        category_profits[cat]['count'] += 1
-    
-    best_category = max(category_profits.items(), key=lambda x: x[1]['profit'])
-    recommendations.append({
-        "title": f"Category Winner: {best_category[0]}",
-        "description": f"Your {best_category[0].lower()} generate ${best_category[1]['profit']:.2f} monthly profit. Consider expanding this category with 2-3 similar items to capitalize on success.",
-        "type": ""
-    })
+    def add_row(self, row):
+        """Fold a newly inserted backend row into the totals"""
+        self._apply(1, row[2], row[3], row[4], row[5], row[6], row[8], row[9])
     
-    # Overall health check
-    if avg_margin > 65:
-        recommendations.append({
-            "title": "Excellent Profit Health",
-            "description": f"Average margin of {avg_margin:.1f}% is above industry standard (60-70%). Focus on maintaining quality and consider strategic price increases on popular items.",
-            "type": ""
-        })
-    elif avg_margin < 50:
-        recommendations.append({
-            "title": "Profit Margin Warning",
-            "description": f"Average margin of {avg_margin:.1f}% is below recommended 60%. Review food costs, negotiate with suppliers, or adjust pricing across the menu.",
-            "type": "danger"
-        })
+    def remove_row(self, row):
+        """Take a backend row's old values back out of the totals"""
+        self._apply(-1, row[2], row[3], row[4], row[5], row[6], row[8], row[9])
     
-    return jsonify({"recommendations": recommendations})
-
-@app.route('/api/analysis/pricing')
-def pricing_optimization():
-    """Generate pricing optimization recommendations"""
-    if not menu_items:
-        return jsonify({"recommendations": []})
+    def remove(self, item):
+        """Take a deleted item back out of the totals"""
+        self._apply(-1, *self._item_values(item))
     
-    recommendations = []
+    def update(self, old_item, new_item):
+        """Replace an item's contribution after an edit"""
+        self._apply(-1, *self._item_values(old_item))
+        self._apply(1, *self._item_values(new_item))
     
-    for item in menu_items:
-        margin = item['profitMargin']
-        current_price = item['sellingPrice']
-        food_cost = item['foodCost']
-        sales = item['monthlySales']
-        
-        # Price optimization suggestions
-        if margin < 40:  # Very low margin
-            target_price = food_cost / 0.6  # Target 60% margin
-            price_increase = target_price - current_price
-            recommendations.append({
-                "title": f"Price Increase Needed: {item['name']}",
-                "description": f"Current margin is only {margin:.1f}%. Increase price from ${current_price:.2f} to ${target_price:.2f} (+${price_increase:.2f}) to achieve 60% margin. Monitor sales impact.",
-                "type": "warning"
-            })
-        
-        elif margin > 80 and sales > 100:  # Very high margin with good sales
-            suggested_decrease = current_price * 0.05  # 5% decrease
-            new_price = current_price - suggested_decrease
-            recommendations.append({
-                "title": f"Price Optimization Opportunity: {item['name']}",
-                "description": f"High margin ({margin:.1f}%) with strong sales ({sales} units). Consider reducing price by ${suggested_decrease:.2f} to ${new_price:.2f} to increase volume and competitiveness.",
-                "type": ""
-            })
-        
-        elif sales < 50:  # Low sales items
-            if margin > 60:
-                price_reduction = current_price * 0.1  # 10% reduction
-                new_price = current_price - price_reduction
-                recommendations.append({
-                    "title": f"Volume Booster: {item['name']}",
-                    "description": f"Low sales ({sales} units) despite good margin. Reduce price from ${current_price:.2f} to ${new_price:.2f} (-${price_reduction:.2f}) to stimulate demand.",
-                    "type": ""
-                })
-            else:
-                recommendations.append({
-                    "title": f"Menu Review Required: {item['name']}",
-                    "description": f"Low sales ({sales} units) and poor margin ({margin:.1f}%). Consider removing from menu or complete recipe/pricing overhaul.",
-                    "type": "danger"
-                })
+    def copy(self):
+        """An independent copy, for copy-on-write snapshots"""
+        clone = MenuAggregates.__new__(MenuAggregates)
+        clone.__dict__.update(self.__dict__)
+        clone.categories = {cat: dict(totals) for cat, totals in self.categories.items()}
+        return clone
     
-    # Competitive pricing analysis
-    category_prices = {}
-    for item in menu_items:
-        cat = item['category']
-        if cat not in category_prices:
-            category_prices[cat] = []
-        category_prices[cat].append(item['sellingPrice'])
-    
-    for category, prices in category_prices.items():
-        if len(prices) > 1:
-            avg_price = sum(prices) / len(prices)
-            max_price = max(prices)
-            min_price = min(prices)
-            
-            if max_price > avg_price * 1.5:
-                recommendations.append({
-                    "title": f"Price Consistency Check: {category}",
-                    "description": f"Large price variation in {category.lower()} (${min_price:.2f} - ${max_price:.2f}). Ensure pricing reflects value differences or consider adjustment.",
-                    "type": "warning"
-                })
+    def state(self):
+        """The totals as plain data, for snapshot files"""
+        return dict(self.__dict__)
     
-    return jsonify({"recommendations": recommendations})
-
-@app.route('/api/analysis/trends')
-def trend_analysis():
-    """Generate trend analysis recommendations"""
-    if not menu_items:
-        return jsonify({"recommendations": []})
+    @classmethod
+    def from_state(cls, state):
+        aggregates = cls()
+        aggregates.__dict__.update(state)
+        return aggregates
     
-    recommendations = []
+    @property
+    def avg_margin(self):
+        if not self.count:
+            return 0
+        return self.total_margin / self.count
     
-    # Sales volume trends
-    high_volume = [item for item in menu_items if item['monthlySales'] > 150]
-    low_volume = [item for item in menu_items if item['monthlySales'] < 30]
-    
-    if high_volume:
-        top_seller = max(high_volume, key=lambda x: x['monthlySales'])
-        recommendations.append({
-            "title": f"Trending Item: {top_seller['name']}",
-            "description": f"Selling {top_seller['monthlySales']} units monthly. This high demand indicates strong customer preference. Consider creating variations or limited-time specials based on this item.",
-            "type": ""
-        })
+    def category_sales(self):
+        """Units sold per category, in first-seen order"""
+        return {cat: totals['sales'] for cat, totals in self.categories.items()}
     
-    if low_volume:
-        recommendations.append({
-            "title": "Low Demand Items",
-            "description": f"{len(low_volume)} items selling less than 30 units monthly. Review these for menu simplification, better promotion, or removal to focus kitchen resources on popular items.",
-            "type": "warning"
-        })
+    def load_category_totals(self, rows):
+        """Rebuild the totals from per-category sums computed by the backend"""
+        self.reset()
+        for (cat, count, revenue, profit, margin, food_cost, sales,
+             quick_count, quick_sales, slow_count, slow_sales) in rows:
+            self.count += count
+            self.total_revenue += revenue
+            self.total_profit += profit
+            self.total_margin += margin
+            self.total_food_cost += food_cost
+            self.categories[cat] = {'profit': profit, 'sales': sales, 'count': count}
+            self.quick_count += quick_count
+            self.quick_sales += quick_sales
+            self.slow_count += slow_count
+            self.slow_sales += slow_sales
     
-    # Category performance trends
-    category_sales = {}
-    for item in menu_items:
-        cat = item['category']
-        if cat not in category_sales:
-            category_sales[cat] = 0
-        category_sales[cat] += item['monthlySales']
+    @staticmethod
+    def _item_values(item):
+        return (item['category'], item['sellingPrice'], item['foodCost'], item['prepTime'],
+                item['monthlySales'], item['profitMargin'], item['monthlyProfit'])
     
-    if category_sales:
-        trending_category = max(category_sales.items(), key=lambda x: x[1])
-        slow_category = min(category_sales.items(), key=lambda x: x[1])
+    def _apply(self, sign, cat, selling_price, food_cost, prep_time, sales, profit_margin, monthly_profit):
+        self.count += sign
+        if self.count == 0:
+            # Avoid carrying float residue once the menu is empty
+            self.reset()
+            return
         
-        recommendations.append({
-            "title": f"Category Trend: {trending_category[0]} Leading",
-            "description": f"{trending_category[0]} selling {trending_category[1]} total units. Customer preference is clear - consider expanding this category with seasonal specials or premium options.",
-            "type": ""
-        })
+        self.total_revenue += sign * selling_price * sales
+        self.total_profit += sign * monthly_profit
+        self.total_margin += sign * profit_margin
+        self.total_food_cost += sign * food_cost * sales
         
-        if slow_category[1] < trending_category[1] * 0.3:
-            recommendations.append({
-                "title": f"Category Decline: {slow_category[0]}",
-                "description": f"{slow_category[0]} underperforming with only {slow_category[1]} units. Consider refreshing recipes, adjusting presentation, or seasonal repositioning.",
-                "type": "warning"
-            })
+        totals = self.categories.get(cat)
+        if totals is None:
+            totals = self.categories[cat] = {'profit': 0, 'sales': 0, 'count': 0}
+        totals['profit'] += sign * monthly_profit
+        totals['sales'] += sign * sales
+        totals['count'] += sign
+        if totals['count'] == 0:
+            del self.categories[cat]
+        
+        if prep_time <= self.QUICK_PREP_MAX:
+            self.quick_count += sign
+            self.quick_sales += sign * sales
+        elif prep_time > self.SLOW_PREP_MIN:
+            self.slow_count += sign
+            self.slow_sales += sign * sales
+
+class MemoryMenuBackend:
+    """Process-local backend: the MenuStore columns are the only copy"""
     
-    # Prep time efficiency trends
-    quick_items = [item for item in menu_items if item['prepTime'] <= 10]
-    slow_items = [item for item in menu_items if item['prepTime'] > 20]
+    persistent = False
     
-    if quick_items and slow_items:
-        avg_quick_sales = sum(item['monthlySales'] for item in quick_items) / len(quick_items)
-        avg_slow_sales = sum(item['monthlySales'] for item in slow_items) / len(slow_items)
+    def __init__(self):
+        self.version = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+    
+    def insert_many(self, rows):
+        """Allocate ids for new rows and return (ids, version)"""
+        with self._lock:
+            first_id = self._next_id
+            self._next_id += len(rows)
+            self.version += 1
+            self._record(['insert', first_id, rows])
+            return list(range(first_id, self._next_id)), self.version
+    
+    def insert_sales(self, events):
+        """Record (item id, day, quantity) sales events and return their version"""
+        with self._lock:
+            self.version += 1
+            self._record(['sales', events])
+            return self.version
+    
+    def update_items(self, rows, catalog, recipes, based_on):
+        """Rewrite existing rows, ingredient prices and recipes together and return their version
         
-        if avg_quick_sales > avg_slow_sales * 1.2:
-            recommendations.append({
-                "title": "Kitchen Efficiency Trend",
-                "description": f"Quick-prep items (≤10 min) outselling complex items by {((avg_quick_sales/avg_slow_sales-1)*100):.0f}%. Focus on streamlined recipes and consider simplifying high-prep items.",
-                "type": ""
-            })
+        Returns None without writing if the backend has moved past `based_on`,
+        the version the rows were derived from.
+        """
+        with self._lock:
+            if self.version != based_on:
+                return None
+            self.version += 1
+            self._record(['update', rows, catalog, list(recipes.items())])
+            return self.version
     
-    # Profit per minute analysis
-    for item in menu_items:
-        profit_per_minute = (item['sellingPrice'] - item['foodCost']) / item['prepTime']
-        item['efficiency_score'] = profit_per_minute
-    
-    most_efficient = max(menu_items, key=lambda x: x['efficiency_score'])
-    recommendations.append({
-        "title": f"Efficiency Champion: {most_efficient['name']}",
-        "description": f"Generates ${most_efficient['efficiency_score']:.2f} profit per minute of prep time. This efficiency model should guide future menu development and staff training priorities.",
-        "type": ""
-    })
+    def delete_items(self, item_ids):
+        """Delete items and return the version; their ids are never handed out again"""
+        with self._lock:
+            self.version += 1
+            self._record(['delete', item_ids])
+            return self.version
     
-    return jsonify({"recommendations": recommendations})
-
-@app.route('/api/analysis/costs')
-def cost_analysis():
-    """Generate cost analysis recommendations"""
-    if not menu_items:
-        return jsonify({"recommendations": []})
+    def _record(self, record):
+        """Called under the lock with each write, once its version is assigned"""
     
-    recommendations = []
+    def snapshot_meta(self):
+        """What a snapshot file needs to resume this backend"""
+        with self._lock:
+            return {"backend": "memory", "nextId": self._next_id}
     
-    # Food cost percentage analysis
-    total_revenue = sum(item['sellingPrice'] * item['monthlySales'] for item in menu_items)
-    total_food_cost = sum(item['foodCost'] * item['monthlySales'] for item in menu_items)
-    overall_food_cost_percentage = (total_food_cost / total_revenue) * 100
+    def resume_from(self, meta, version):
+        """Pick up from a snapshot file's version; only a backend nothing was written to yet can"""
+        with self._lock:
+            if meta.get("backend") != "memory" or self.version:
+                return False
+            self.version = version
+            self._next_id = meta["nextId"]
+            return True
     
-    recommendations.append({
-        "title": f"Overall Food Cost: {overall_food_cost_percentage:.1f}%",
-        "description": f"Industry target is 28-35%. {'Excellent cost control!' if overall_food_cost_percentage < 30 else 'Good range' if overall_food_cost_percentage < 35 else 'Above target - review supplier costs and portion sizes'}",
-        "type": "" if overall_food_cost_percentage < 35 else "warning"
-    })
+    def commit(self, version):
+        """Wait until a version is durable; nothing here outlives the process anyway"""
     
-    # High food cost items
-    high_cost_items = [item for item in menu_items if (item['foodCost'] / item['sellingPrice']) > 0.4]
-    if high_cost_items:
-        worst_cost_item = max(high_cost_items, key=lambda x: x['foodCost'] / x['sellingPrice'])
-        cost_percentage = (worst_cost_item['foodCost'] / worst_cost_item['sellingPrice']) * 100
-        recommendations.append({
-            "title": f"High Food Cost Alert: {worst_cost_item['name']}",
-            "description": f"Food cost is {cost_percentage:.1f}% of selling price. Consider negotiating with suppliers, reducing portion size by 10-15%, or finding substitute ingredients.",
-            "type": "danger"
-        })
+    def checkpoint(self, version):
+        """Everything up to a version is now in a snapshot file"""
     
-    # Ingredient cost optimization
-    all_ingredients = []
-    for item in menu_items:
-        all_ingredients.extend(item.get('ingredients', []))
-    
-    # Count ingredient frequency
-    ingredient_frequency = {}
-    for ingredient in all_ingredients:
-        ingredient = ingredient.strip().lower()
-        if ingredient:
-            ingredient_frequency[ingredient] = ingredient_frequency.get(ingredient, 0) + 1
-    
-    if ingredient_frequency:
-        most_used = max(ingredient_frequency.items(), key=lambda x: x[1])
-        recommendations.append({
-            "title": f"Bulk Purchase Opportunity: {most_used[0].title()}",
-            "description": f"Used in {most_used[1]} different menu items. Negotiate volume discounts with suppliers or consider buying in larger quantities to reduce per-unit cost.",
-            "type": ""
-        })
+    def current_version(self):
+        return self.version
     
-    # Labor cost implications (prep time analysis)
-    labor_intensive_items = sorted(menu_items, key=lambda x: x['prepTime'], reverse=True)[:3]
-    if labor_intensive_items:
-        most_intensive = labor_intensive_items[0]
-        if most_intensive['prepTime'] > 30:
-            recommendations.append({
-                "title": f"Labor Cost Concern: {most_intensive['name']}",
-                "description": f"{most_intensive['prepTime']} minutes prep time significantly impacts labor costs. Consider pre-prep strategies, simplifying recipe, or pricing adjustment to account for labor investment.",
-                "type": "warning"
-            })
+    def rows_since(self, version):
+        """Rows written after a version, oldest first"""
+        return []
     
-    # Seasonal cost considerations
-    recommendations.append({
-        "title": "Seasonal Cost Planning",
-        "description": "Review your menu quarterly for seasonal ingredient price fluctuations. Consider featuring seasonal specials when ingredients are at peak freshness and lowest cost.",
-        "type": ""
-    })
+    def sales_since(self, version, until):
+        """Sales events written in versions (version, until], oldest first"""
+        return []
     
-    # Waste reduction opportunities
-    single_use_ingredients = []
-    for item in menu_items:
-        for ingredient in item.get('ingredients', []):
-            ingredient = ingredient.strip().lower()
-            if ingredient and ingredient_frequency.get(ingredient, 0) == 1:
-                single_use_ingredients.append(ingredient)
-    
-    if len(single_use_ingredients) > 3:
-        recommendations.append({
-            "title": "Ingredient Utilization",
-            "description": f"{len(single_use_ingredients)} ingredients used in only one dish. Cross-utilize ingredients across multiple menu items to reduce waste and inventory costs.",
-            "type": "warning"
-        })
+    def catalog_since(self, version, until):
+        """(name, unit, unit cost) catalog entries written in versions (version, until]"""
+        return []
+    
+    def recipes_since(self, version, until):
+        """(item id, recipe) pairs written in versions (version, until]; an empty recipe was removed"""
+        return []
+    
+    def deleted_since(self, version, until):
+        """Ids of the items deleted in versions (version, until]"""
+        return []
+    
+    def category_totals(self):
+        """Per-category aggregate rows, or None if they must be computed in Python"""
+        return None
+
+class WriteAheadLog:
+    """Append-only log of menu writes with group commit
+    
+    Each record is framed by its payload length, CRC-32 and version, then a
+    JSON payload. append() only buffers a record and commit() makes it
+    durable. One committer at a time syncs everything appended so far while
+    the others wait; those it covered return as soon as it is done, and the
+    first one left over syncs the next batch, so concurrent writers share an
+    fsync. A commit window holds each sync back a little longer to gather
+    more of them. A torn record at the end, left by a crash in the middle
+    of a write, is cut off when the log is opened.
+    """
     
-    return jsonify({"recommendations": recommendations})
+    FRAME = struct.Struct('<IIQ')
+    
+    def __init__(self, path, commit_window=0.0):
+        self.path = path
+        self.commit_window = commit_window
+        self.syncs = 0
+        self._lock = threading.Lock()
+        self._synced_changed = threading.Condition()
+        self._syncing = False
+        created = not os.path.exists(path)
+        self._file = self._open(path)
+        if created:
+            fsync_directory(path)
+        self._versions = array('q')
+        self._starts = array('q')
+        self._records = []
+        size = 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        while size + self.FRAME.size <= len(data):
+            length, checksum, version = self.FRAME.unpack_from(data, size)
+            payload = data[size + self.FRAME.size:size + self.FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            self._versions.append(version)
+            self._starts.append(size)
+            self._records.append((version, json.loads(payload)))
+            size += self.FRAME.size + length
+        if size < len(data):
+            app.logger.warning("Discarding %d bytes of torn records at the end of %s", len(data) - size, path)
+            self._file.truncate(size)
+        self._size = size
+        self._appended = self._synced = self._versions[-1] if self._versions else 0
+    
+    @staticmethod
+    def _open(path):
+        f = open(path, 'ab')
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                raise RuntimeError(f"{path} is already open in another process")
+        return f
+    
+    def _frame(self, version, record):
+        payload = json.dumps(record, separators=(',', ':')).encode()
+        return self.FRAME.pack(len(payload), zlib.crc32(payload), version) + payload
+    
+    def records(self):
+        """(version, record) pairs read when the log was opened, oldest first; handed out once"""
+        records, self._records = self._records, []
+        return records
+    
+    def append(self, version, record):
+        """Buffer a record; versions must increase"""
+        data = self._frame(version, record)
+        with self._lock:
+            self._file.write(data)
+            self._versions.append(version)
+            self._starts.append(self._size)
+            self._size += len(data)
+            self._appended = version
+    
+    def commit(self, version):
+        """Return once every record up to a version is on disk"""
+        with self._synced_changed:
+            while self._syncing and self._synced < version:
+                self._synced_changed.wait()
+            if self._synced >= version:
+                return
+            self._syncing = True
+        synced = self._synced
+        try:
+            if self.commit_window:
+                time.sleep(self.commit_window)
+            with self._lock:
+                self._file.flush()
+                appended = self._appended
+            os.fsync(self._file.fileno())
+            synced = appended
+            self.syncs += 1
+        finally:
+            self._finish_sync(synced)
+    
+    def _start_sync(self):
+        """Wait out any sync in progress and claim the file"""
+        with self._synced_changed:
+            while self._syncing:
+                self._synced_changed.wait()
+            self._syncing = True
+    
+    def _finish_sync(self, synced):
+        with self._synced_changed:
+            self._syncing = False
+            self._synced = synced
+            self._synced_changed.notify_all()
+    
+    def truncate(self, version, first):
+        """Drop the records up to a version, which a snapshot now covers, and start the log with `first`
+        
+        The records after it are copied into a new file that replaces the
+        old one, so a crash leaves one or the other whole.
+        """
+        self._start_sync()
+        synced = self._synced
+        try:
+            with self._lock:
+                synced = self._truncate(version, first)
+        finally:
+            self._finish_sync(synced)
+    
+    def _truncate(self, version, first):
+        """Rewrite the file without the records up to a version; returns the version now synced"""
+        index = bisect_right(self._versions, version)
+        if not index:
+            return self._synced
+        self._file.flush()
+        start = self._starts[index] if index < len(self._starts) else self._size
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            tail = f.read()
+        head = self._frame(version, first)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(head + tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        fsync_directory(self.path)
+        self._file.close()
+        self._file = self._open(self.path)
+        shift = len(head) - start
+        self._versions = array('q', [version]) + self._versions[index:]
+        self._starts = array('q', [0]) + array('q', [offset + shift for offset in self._starts[index:]])
+        self._size += shift
+        return self._appended
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class LoggedMenuBackend(MemoryMenuBackend):
+    """Process-local backend that records every write in a write-ahead log
+    
+    The columns are still the only live copy. After a restart they are
+    rebuilt from the latest snapshot file plus the log records written
+    since, served through the usual *_since methods. Records are appended
+    under the backend lock, so the log is in version order; MenuStore waits
+    on commit() only after releasing its own lock, which is what lets
+    concurrent writers share a sync.
+    
+    Truncating the log against a snapshot leaves a 'base' record in front:
+    versions up to it can only be recovered from that snapshot.
+    """
+    
+    def __init__(self, path, commit_window):
+        super().__init__()
+        self.log = WriteAheadLog(path, commit_window)
+        self._replay = self.log.records()
+        self.base = 0
+        if self._replay:
+            version, record = self._replay[0]
+            self.base = version if record[0] == 'base' else version - 1
+            self.version = self._replay[-1][0]
+        for version, record in self._replay:
+            if record[0] == 'base':
+                self._next_id = max(self._next_id, record[1])
+            elif record[0] == 'insert':
+                self._next_id = max(self._next_id, record[1] + len(record[2]))
+    
+    def _record(self, record):
+        self._replay = None
+        self.log.append(self.version, record)
+    
+    def resume_from(self, meta, version):
+        """Pick up from a snapshot file, if the log carries on from where it ends"""
+        with self._lock:
+            if meta.get("backend") != "memory" or version < self.base:
+                return False
+            self.version = max(self.version, version)
+            self._next_id = max(self._next_id, meta["nextId"])
+            return True
+    
+    def commit(self, version):
+        self.log.commit(version)
+    
+    def checkpoint(self, version):
+        with self._lock:
+            next_id = self._next_id
+        self.log.truncate(version, ['base', next_id])
+    
+    def _replayed(self, kind, version, until=None):
+        """Logged records of a kind in versions (version, until], oldest first"""
+        if version < self.base:
+            raise RuntimeError(f"{self.log.path} starts after version {self.base}; the snapshot it needs is missing")
+        for record_version, record in self._replay or ():
+            if record_version > version and (until is None or record_version <= until) and record[0] in kind:
+                yield record
+    
+    def rows_since(self, version):
+        rows = {}
+        for record in self._replayed(('insert', 'update', 'delete'), version):
+            if record[0] == 'insert':
+                for item_id, row in enumerate(record[2], record[1]):
+                    rows[item_id] = (item_id,) + tuple(row)
+            elif record[0] == 'update':
+                rows.update((row[0], tuple(row)) for row in record[1])
+            else:
+                for item_id in record[1]:
+                    rows.pop(item_id, None)
+        return [rows[item_id] for item_id in sorted(rows)]
+    
+    def sales_since(self, version, until):
+        return [tuple(event) for record in self._replayed(('sales',), version, until) for event in record[1]]
+    
+    def catalog_since(self, version, until):
+        return [(name, unit, unit_cost) for record in self._replayed(('update',), version, until)
+                for name, (unit, unit_cost) in record[2].items()]
+    
+    def recipes_since(self, version, until):
+        # Deleting an item drops its recipe, as the SQLite backend does
+        return [pair for record in self._replayed(('update', 'delete'), version, until)
+                for pair in (record[3] if record[0] == 'update' else ((item_id, {}) for item_id in record[1]))]
+    
+    def deleted_since(self, version, until):
+        return [item_id for record in self._replayed(('delete',), version, until) for item_id in record[1]]
+
+def fsync_directory(path):
+    """Make a file's creation or rename into its directory durable"""
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class SQLiteMenuBackend:
+    """Shared SQLite backend so every gunicorn worker sees one menu
+    
+    Each write bumps a version counter stored in the database and stamps the
+    row with it; workers compare that counter against their own to find the
+    rows they have not seen yet. Deleted rows stay behind as tombstones so
+    other workers learn of the deletion the same way.
+    """
+    
+    persistent = True
+    ROW_COLUMNS = ("id, name, category, selling_price, food_cost, prep_time, monthly_sales, "
+                   "ingredients, profit_margin, monthly_profit, created_at")
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._create_schema()
+    
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+    
+    def _create_schema(self):
+        conn = self.connection
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS menu_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                category TEXT NOT NULL,
+                selling_price REAL NOT NULL,
+                food_cost REAL NOT NULL,
+                prep_time INTEGER NOT NULL,
+                monthly_sales INTEGER NOT NULL,
+                ingredients TEXT NOT NULL,
+                profit_margin REAL NOT NULL,
+                monthly_profit REAL NOT NULL,
+                created_at REAL NOT NULL,
+                version INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_menu_items_category ON menu_items (category);
+            CREATE INDEX IF NOT EXISTS idx_menu_items_margin ON menu_items (profit_margin);
+            CREATE INDEX IF NOT EXISTS idx_menu_items_sales ON menu_items (monthly_sales);
+            CREATE INDEX IF NOT EXISTS idx_menu_items_version ON menu_items (version);
+            CREATE TABLE IF NOT EXISTS sales (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sales_version ON sales (version);
+            CREATE TABLE IF NOT EXISTS ingredient_catalog (
+                name TEXT PRIMARY KEY,
+                unit TEXT NOT NULL,
+                unit_cost REAL NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS recipes (
+                item_id INTEGER PRIMARY KEY,
+                recipe TEXT NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS menu_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO menu_meta (key, value) VALUES ('version', 0);
+            INSERT OR IGNORE INTO menu_meta (key, value) VALUES ('instance', abs(random()));
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(menu_items)")}
+        if 'deleted' not in columns:
+            conn.execute("ALTER TABLE menu_items ADD COLUMN deleted INTEGER NOT NULL DEFAULT 0")
+    
+    def insert_many(self, rows):
+        """Insert rows in a single transaction and return (ids, version)
+        
+        The whole batch shares one version, so other workers pick it up
+        all at once or not at all.
+        """
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE menu_meta SET value = value + 1 WHERE key = 'version'")
+            version = conn.execute("SELECT value FROM menu_meta WHERE key = 'version'").fetchone()[0]
+            dumps = json.dumps
+            conn.executemany(
+                "INSERT INTO menu_items (name, category, selling_price, food_cost, prep_time, monthly_sales, "
+                "ingredients, profit_margin, monthly_profit, created_at, version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row[:6] + (dumps(row[6]),) + row[7:] + (version,) for row in rows)
+            )
+            ids = [item_id for (item_id,) in conn.execute(
+                "SELECT id FROM menu_items WHERE version = ? ORDER BY id", (version,)
+            )]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return ids, version
+    
+    def insert_sales(self, events):
+        """Append (item id, day, quantity) sales events in one transaction and return their version"""
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE menu_meta SET value = value + 1 WHERE key = 'version'")
+            version = conn.execute("SELECT value FROM menu_meta WHERE key = 'version'").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO sales (item_id, day, quantity, version) VALUES (?, ?, ?, ?)",
+                (event + (version,) for event in events)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+    
+    def update_items(self, rows, catalog, recipes, based_on):
+        """Rewrite existing rows, ingredient prices and recipes in one transaction and return their version
+        
+        Rows are written whole, so they are only written if no other worker
+        wrote after `based_on`, the version they were derived from; otherwise
+        nothing is written and None is returned. Rewritten rows take the new
+        version stamp, so other workers read them back through rows_since()
+        like new ones.
+        """
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT value FROM menu_meta WHERE key = 'version'").fetchone()[0] != based_on:
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute("UPDATE menu_meta SET value = value + 1 WHERE key = 'version'")
+            version = conn.execute("SELECT value FROM menu_meta WHERE key = 'version'").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO ingredient_catalog (name, unit, unit_cost, version) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET unit = excluded.unit, unit_cost = excluded.unit_cost, "
+                "version = excluded.version",
+                ((name, unit, unit_cost, version) for name, (unit, unit_cost) in catalog.items())
+            )
+            conn.executemany(
+                "INSERT INTO recipes (item_id, recipe, version) VALUES (?, ?, ?) "
+                "ON CONFLICT (item_id) DO UPDATE SET recipe = excluded.recipe, version = excluded.version",
+                ((item_id, json.dumps(recipe), version) for item_id, recipe in recipes.items())
+            )
+            dumps = json.dumps
+            conn.executemany(
+                "UPDATE menu_items SET name = ?, category = ?, selling_price = ?, food_cost = ?, prep_time = ?, "
+                "monthly_sales = ?, ingredients = ?, profit_margin = ?, monthly_profit = ?, version = ? "
+                "WHERE id = ? AND deleted = 0",
+                (row[1:7] + (dumps(row[7]),) + row[8:10] + (version, row[0]) for row in rows)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+    
+    def delete_items(self, item_ids):
+        """Mark items deleted in one transaction and return the version
+        
+        The rows stay as tombstones, and AUTOINCREMENT keeps their ids from
+        being handed out again.
+        """
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE menu_meta SET value = value + 1 WHERE key = 'version'")
+            version = conn.execute("SELECT value FROM menu_meta WHERE key = 'version'").fetchone()[0]
+            conn.executemany("UPDATE menu_items SET deleted = 1, version = ? WHERE id = ? AND deleted = 0",
+                             ((version, item_id) for item_id in item_ids))
+            conn.executemany("UPDATE recipes SET recipe = '{}', version = ? WHERE item_id = ?",
+                             ((version, item_id) for item_id in item_ids))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+    
+    def current_version(self):
+        return self.connection.execute("SELECT value FROM menu_meta WHERE key = 'version'").fetchone()[0]
+    
+    def snapshot_meta(self):
+        """What a snapshot file needs to resume this backend: which database it was taken from"""
+        instance = self.connection.execute("SELECT value FROM menu_meta WHERE key = 'instance'").fetchone()[0]
+        return {"backend": "sqlite", "instance": instance}
+    
+    def resume_from(self, meta, version):
+        """Whether a snapshot file at `version` was taken from this database and is not ahead of it"""
+        return meta == self.snapshot_meta() and version <= self.current_version()
+    
+    def commit(self, version):
+        """Each write already committed its own transaction"""
+    
+    def checkpoint(self, version):
+        """The database keeps its own history; a snapshot frees nothing here"""
+    
+    def rows_since(self, version):
+        """Rows written or rewritten after a version, oldest first
+        
+        Ordered by id rather than version: a rewritten row keeps its place,
+        so a fresh load lays out the columns in insertion order too.
+        """
+        cursor = self.connection.execute(
+            f"SELECT {self.ROW_COLUMNS} FROM menu_items WHERE version > ? AND deleted = 0 ORDER BY id", (version,)
+        )
+        for row in cursor:
+            yield row[:7] + (json.loads(row[7]),) + row[8:]
+    
+    def sales_since(self, version, until):
+        """Sales events written in versions (version, until], oldest first
+        
+        The upper bound keeps a sync from reading events it will not record
+        as seen, which would count them twice on the next one.
+        """
+        return self.connection.execute(
+            "SELECT item_id, day, quantity FROM sales WHERE version > ? AND version <= ? ORDER BY id",
+            (version, until)
+        )
+    
+    def catalog_since(self, version, until):
+        """(name, unit, unit cost) catalog entries written in versions (version, until]"""
+        return self.connection.execute(
+            "SELECT name, unit, unit_cost FROM ingredient_catalog WHERE version > ? AND version <= ?",
+            (version, until)
+        )
+    
+    def recipes_since(self, version, until):
+        """(item id, recipe) pairs written in versions (version, until]; an empty recipe was removed"""
+        cursor = self.connection.execute(
+            "SELECT item_id, recipe FROM recipes WHERE version > ? AND version <= ?", (version, until)
+        )
+        for item_id, recipe in cursor:
+            yield item_id, json.loads(recipe)
+    
+    def deleted_since(self, version, until):
+        """Ids of the items deleted in versions (version, until]"""
+        return [item_id for (item_id,) in self.connection.execute(
+            "SELECT id FROM menu_items WHERE deleted = 1 AND version > ? AND version <= ?", (version, until)
+        )]
+    
+    def category_totals(self):
+        """Per-category aggregate rows, computed inside SQLite"""
+        return self.connection.execute(
+            """
+            SELECT category, COUNT(*), TOTAL(selling_price * monthly_sales), TOTAL(monthly_profit),
+                   TOTAL(profit_margin), TOTAL(food_cost * monthly_sales), SUM(monthly_sales),
+                   SUM(prep_time <= :quick), SUM(CASE WHEN prep_time <= :quick THEN monthly_sales ELSE 0 END),
+                   SUM(prep_time > :slow), SUM(CASE WHEN prep_time > :slow THEN monthly_sales ELSE 0 END)
+            FROM menu_items
+            WHERE deleted = 0
+            GROUP BY category
+            ORDER BY MIN(id)
+            """,
+            {'quick': MenuAggregates.QUICK_PREP_MAX, 'slow': MenuAggregates.SLOW_PREP_MIN}
+        ).fetchall()
+
+def restaurant_db_path(restaurant):
+    """SQLite file for a restaurant; each gets its own so writers never contend"""
+    if restaurant == DEFAULT_RESTAURANT:
+        return MENU_DB_PATH
+    root, ext = os.path.splitext(MENU_DB_PATH)
+    return f"{root}-{restaurant}{ext or '.db'}"
+
+def create_menu_backend(restaurant=DEFAULT_RESTAURANT):
+    """Build the storage backend selected by MENU_STORAGE"""
+    if MENU_STORAGE == 'memory':
+        if WAL_DIR:
+            os.makedirs(WAL_DIR, exist_ok=True)
+            return LoggedMenuBackend(os.path.join(WAL_DIR, f"{restaurant}.wal"), WAL_COMMIT_WINDOW)
+        return MemoryMenuBackend()
+    if MENU_STORAGE == 'sqlite':
+        return SQLiteMenuBackend(restaurant_db_path(restaurant))
+    raise ValueError(f"Unknown MENU_STORAGE backend: {MENU_STORAGE}")
+
+class RankIndex:
+    """Sorted index over one numeric field for top-k and threshold queries
+    
+    Keys and item ids are kept in parallel typed arrays ordered by key, with
+    equal keys ordered by id so ties resolve to the earliest item, as a
+    stable sort would.
+    """
+    
+    def __init__(self, keys=None, ids=None):
+        self.keys = keys if keys is not None else array('d')
+        self.ids = ids if ids is not None else array('q')
+    
+    @classmethod
+    def from_columns(cls, values, ids):
+        """Build an index from a value column and the matching id column"""
+        # ids ascend by slot, so a stable sort on value alone keeps ties in id order
+        order = sorted(range(len(values)), key=values.__getitem__)
+        return cls(array('d', map(values.__getitem__, order)), array('q', map(ids.__getitem__, order)))
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def copy(self):
+        return RankIndex(self.keys[:], self.ids[:])
+    
+    def insert(self, value, item_id):
+        keys = self.keys
+        if not keys or value > keys[-1] or (value == keys[-1] and item_id > self.ids[-1]):
+            keys.append(value)
+            self.ids.append(item_id)
+            return
+        lo = bisect_left(keys, value)
+        hi = bisect_right(keys, value, lo)
+        position = bisect_right(self.ids, item_id, lo, hi)
+        keys.insert(position, value)
+        self.ids.insert(position, item_id)
+    
+    def remove(self, value, item_id):
+        lo = bisect_left(self.keys, value)
+        hi = bisect_right(self.keys, value, lo)
+        position = bisect_left(self.ids, item_id, lo, hi)
+        if position == hi or self.ids[position] != item_id:
+            raise KeyError(item_id)
+        del self.keys[position]
+        del self.ids[position]
+    
+    def update(self, old_value, new_value, item_id):
+        if old_value != new_value:
+            self.remove(old_value, item_id)
+            self.insert(new_value, item_id)
+    
+    def _bounds(self, above=None, below=None):
+        lo = 0 if above is None else bisect_right(self.keys, above)
+        hi = len(self.keys) if below is None else bisect_left(self.keys, below)
+        return lo, max(lo, hi)
+    
+    def count(self, above=None, below=None):
+        """Number of items strictly between the thresholds"""
+        lo, hi = self._bounds(above, below)
+        return hi - lo
+    
+    def bottom(self, limit, above=None, below=None):
+        """Ids of the `limit` smallest values, optionally within thresholds"""
+        lo, hi = self._bounds(above, below)
+        return list(self.ids[lo:min(hi, lo + limit)])
+    
+    def top(self, limit, above=None, below=None):
+        """Ids of the `limit` largest values, ties in insertion order"""
+        lo, hi = self._bounds(above, below)
+        return list(islice(self._descending(lo, hi), limit))
+    
+    def _descending(self, lo, hi):
+        keys, ids = self.keys, self.ids
+        end = hi
+        while end > lo:
+            start = bisect_left(keys, keys[end - 1], lo, end)
+            yield from ids[start:end]
+            end = start
+
+class IngredientIndex:
+    """Inverted index from normalized ingredient names to the items that use them
+    
+    Names are interned to ingredient ids in first-seen order. Each posting is
+    an array of item ids with one entry per occurrence, so its length is the
+    ingredient's usage count. Ingredients are also bucketed by count, which
+    keeps the most-used and single-use queries independent of menu size.
+    """
+    
+    def __init__(self):
+        self.names = []
+        self._lookup = {}
+        self._postings = {}
+        self._by_count = {}
+        self.max_count = 0
+    
+    @staticmethod
+    def normalize(ingredient):
+        return ingredient.strip().lower()
+    
+    def copy(self):
+        clone = IngredientIndex()
+        clone.names = self.names[:]
+        clone._lookup = dict(self._lookup)
+        clone._postings = {ingredient_id: posting[:] for ingredient_id, posting in self._postings.items()}
+        clone._by_count = {count: set(bucket) for count, bucket in self._by_count.items()}
+        clone.max_count = self.max_count
+        return clone
+    
+    def postings(self):
+        """The posting for every interned name in id order, empty for unused names"""
+        return [self._postings.get(ingredient_id, ()) for ingredient_id in range(len(self.names))]
+    
+    @classmethod
+    def from_postings(cls, names, postings):
+        """Rebuild an index from its interned names and their postings"""
+        index = cls()
+        index.names = list(names)
+        index._lookup = {name: ingredient_id for ingredient_id, name in enumerate(index.names)}
+        for ingredient_id, posting in enumerate(postings):
+            if posting:
+                index._postings[ingredient_id] = posting
+                index._by_count.setdefault(len(posting), set()).add(ingredient_id)
+        index.max_count = max(index._by_count, default=0)
+        return index
+    
+    def add(self, item_id, ingredients):
+        for ingredient in ingredients:
+            name = self.normalize(ingredient)
+            if not name:
+                continue
+            ingredient_id = self._lookup.get(name)
+            if ingredient_id is None:
+                ingredient_id = self._lookup[name] = len(self.names)
+                self.names.append(name)
+            posting = self._postings.get(ingredient_id)
+            if posting is None:
+                posting = self._postings[ingredient_id] = array('q')
+            posting.append(item_id)
+            self._move(ingredient_id, len(posting) - 1, len(posting))
+    
+    def remove(self, item_id, ingredients):
+        for ingredient in ingredients:
+            ingredient_id = self._lookup.get(self.normalize(ingredient))
+            if ingredient_id is None:
+                continue
+            posting = self._postings[ingredient_id]
+            posting.remove(item_id)
+            self._move(ingredient_id, len(posting) + 1, len(posting))
+            if not posting:
+                del self._postings[ingredient_id]
+    
+    def _move(self, ingredient_id, old_count, new_count):
+        if old_count:
+            bucket = self._by_count[old_count]
+            bucket.discard(ingredient_id)
+            if not bucket:
+                del self._by_count[old_count]
+        if new_count:
+            self._by_count.setdefault(new_count, set()).add(ingredient_id)
+        if new_count > self.max_count:
+            self.max_count = new_count
+        while self.max_count and self.max_count not in self._by_count:
+            self.max_count -= 1
+    
+    def __len__(self):
+        return len(self._postings)
+    
+    def uses(self, name):
+        """How many times an ingredient appears across the menu"""
+        ingredient_id = self._lookup.get(self.normalize(name))
+        posting = self._postings.get(ingredient_id)
+        return len(posting) if posting is not None else 0
+    
+    def item_ids(self, name):
+        """Ids of the items using an ingredient, in insertion order"""
+        posting = self._postings.get(self._lookup.get(self.normalize(name)))
+        return list(dict.fromkeys(posting)) if posting is not None else []
+    
+    def most_used(self):
+        """(name, uses) of the most used ingredient, earliest seen on ties"""
+        if not self.max_count:
+            return None
+        return self.names[min(self._by_count[self.max_count])], self.max_count
+    
+    @property
+    def single_use_count(self):
+        return len(self._by_count.get(1, ()))
+    
+    def usage(self):
+        """(name, uses, distinct items) for every ingredient, most used first"""
+        rows = [(self.names[ingredient_id], len(posting), len(set(posting)))
+                for ingredient_id, posting in self._postings.items()]
+        rows.sort(key=lambda row: (-row[1], row[0]))
+        return rows
+
+class RecipeBook:
+    """Ingredient catalog with unit costs, and the recipes that derive food costs from it
+    
+    A recipe maps normalized ingredient names to quantities in the catalog's
+    units. `used_by` is the dependency graph from each ingredient to the
+    items whose recipes use it, so a price change reaches only those items.
+    Recipe dicts are replaced rather than edited, which lets copies share them.
+    """
+    
+    def __init__(self):
+        self.catalog = {}
+        self.recipes = {}
+        self.used_by = {}
+    
+    def copy(self):
+        clone = RecipeBook()
+        clone.catalog = dict(self.catalog)
+        clone.recipes = dict(self.recipes)
+        clone.used_by = {name: set(item_ids) for name, item_ids in self.used_by.items()}
+        return clone
+    
+    def set_ingredient(self, name, unit, unit_cost):
+        self.catalog[name] = (unit, unit_cost)
+    
+    def set_recipe(self, item_id, recipe):
+        """Give an item a recipe, or take its recipe away when `recipe` is empty"""
+        for name in self.recipes.pop(item_id, ()):
+            users = self.used_by[name]
+            users.discard(item_id)
+            if not users:
+                del self.used_by[name]
+        if recipe:
+            self.recipes[item_id] = recipe
+            for name in recipe:
+                self.used_by.setdefault(name, set()).add(item_id)
+    
+    def affected(self, names):
+        """Ids of the items whose recipes use any of the ingredients"""
+        item_ids = set()
+        for name in names:
+            item_ids.update(self.used_by.get(name, ()))
+        return item_ids
+    
+    def cost(self, recipe, prices=None):
+        """Food cost of a recipe at catalog prices, with `prices` overriding some of them"""
+        catalog = self.catalog
+        total = 0.0
+        for name, quantity in recipe.items():
+            unit_cost = prices[name] if prices and name in prices else catalog[name][1]
+            total += quantity * unit_cost
+        # Keep float residue out of a value that is shown as money
+        return round(total, 6)
+
+class QuantileSketch:
+    """KLL sketch of a numeric field: approximate ranks and quantiles in bounded memory
+    
+    Values enter the bottom compactor. When the sketch is full, the lowest
+    compactor over its capacity sorts itself and promotes every other value
+    (from a random offset) one level up, where each stands for twice the
+    weight. With k=200, ranks stay within about 1% of the item count however
+    many values are added, and the sketch is exact until the first compaction.
+    Sketches built separately can be merged.
+    
+    Values can be taken back out (when an item is edited) by recording them
+    in a second sketch whose weights are subtracted at query time.
+    """
+    
+    CAPACITY_DECAY = 2 / 3
+    
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = []
+        self.size = 0
+        self.max_size = 0
+        self._random = random.Random(seed)
+        self._cdf = None
+        self._removed = None
+        self._grow()
+    
+    def copy(self):
+        clone = QuantileSketch.__new__(QuantileSketch)
+        clone.__dict__.update(self.__dict__)
+        clone.levels = [list(level) for level in self.levels]
+        clone._random = random.Random()
+        clone._random.setstate(self._random.getstate())
+        if self._removed is not None:
+            clone._removed = self._removed.copy()
+        return clone
+    
+    def __len__(self):
+        return self.count - (self._removed.count if self._removed is not None else 0)
+    
+    def state(self):
+        """The sketch as plain data, for snapshot files"""
+        return {'k': self.k, 'count': self.count, 'levels': self.levels,
+                'removed': self._removed.state() if self._removed is not None else None}
+    
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        while len(sketch.levels) < len(state['levels']):
+            sketch._grow()
+        sketch.levels = [list(values) for values in state['levels']]
+        sketch.size = sum(map(len, sketch.levels))
+        sketch.count = state['count']
+        if state['removed'] is not None:
+            sketch._removed = cls.from_state(state['removed'])
+        return sketch
+    
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return math.ceil(self.k * self.CAPACITY_DECAY ** depth) + 1
+    
+    def _grow(self):
+        self.levels.append([])
+        self.max_size = sum(map(self._capacity, range(len(self.levels))))
+    
+    def update(self, value):
+        self.levels[0].append(value)
+        self.size += 1
+        self.count += 1
+        self._cdf = None
+        if self.size >= self.max_size:
+            self._compress()
+    
+    def remove(self, value):
+        """Take back a value added earlier"""
+        if self._removed is None:
+            self._removed = QuantileSketch(self.k, seed=self._random.getrandbits(32))
+        self._removed.update(value)
+        self._cdf = None
+    
+    def merge(self, other):
+        """Fold another sketch's values into this one"""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for level, values in zip(self.levels, other.levels):
+            level.extend(values)
+        self.size += other.size
+        self.count += other.count
+        if other._removed is not None:
+            if self._removed is None:
+                self._removed = other._removed.copy()
+            else:
+                self._removed.merge(other._removed)
+        self._cdf = None
+        self._compress()
+    
+    def _compress(self):
+        for level, values in enumerate(self.levels):
+            if self.size < self.max_size:
+                break
+            if len(values) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self._grow()
+            values.sort()
+            # An odd one out stays behind; the rest pair up and half move up a level
+            odd = len(values) % 2
+            self.levels[level + 1].extend(values[odd + self._random.getrandbits(1)::2])
+            self.levels[level] = values[:odd]
+            self.size = sum(map(len, self.levels))
+    
+    def cdf(self):
+        """(sorted values, cumulative weights), rebuilt only after the sketch changes"""
+        cdf = self._cdf
+        if cdf is None:
+            weighted = [(value, 1 << level) for level, values in enumerate(self.levels) for value in values]
+            if self._removed is not None:
+                weighted.extend((value, -(1 << level))
+                                for level, values in enumerate(self._removed.levels) for value in values)
+            weighted.sort()
+            values = [value for value, _ in weighted]
+            # Removals sort ahead of equal values, so taking the running maximum
+            # keeps the ranks ascending without overstating any of them
+            cumulative = [0]
+            total = 0
+            for _, weight in weighted:
+                total += weight
+                cumulative.append(max(total, cumulative[-1]))
+            cdf = self._cdf = (values, cumulative)
+        return cdf
+    
+    def rank(self, value):
+        """Estimated number of values strictly below `value`"""
+        values, cumulative = self.cdf()
+        return cumulative[bisect_left(values, value)]
+    
+    def quantile(self, fraction):
+        """Estimated value at a fraction of the way through the sorted values, or None when empty"""
+        values, cumulative = self.cdf()
+        if not values:
+            return None
+        target = fraction * len(self)
+        position = bisect_left(cumulative, target, 1) - 1
+        return values[min(position, len(values) - 1)]
+
+def week_of(day):
+    """Week number of a day ordinal; weeks start on Monday"""
+    return (day - 1) // 7
+
+def month_of(day):
+    """Month number (year * 12 + month - 1) of a day ordinal"""
+    d = date.fromordinal(day)
+    return d.year * 12 + d.month - 1
+
+class SalesBuckets:
+    """Units sold per bucket (day, week or month number), for a contiguous range of buckets"""
+    
+    __slots__ = ('first', 'counts')
+    
+    def __init__(self):
+        self.first = None
+        self.counts = array('q')
+    
+    def copy(self):
+        clone = SalesBuckets()
+        clone.first = self.first
+        clone.counts = array('q', self.counts)
+        return clone
+    
+    def add(self, bucket, quantity):
+        if self.first is None:
+            self.first = bucket
+        elif bucket < self.first:
+            # Backfilled history: extend the range to start earlier
+            self.counts = array('q', repeat(0, self.first - bucket)) + self.counts
+            self.first = bucket
+        offset = bucket - self.first
+        if offset >= len(self.counts):
+            self.counts.extend(repeat(0, offset - len(self.counts) + 1))
+        self.counts[offset] += quantity
+    
+    def total(self, start, stop):
+        """Units in buckets start <= bucket < stop"""
+        if self.first is None:
+            return 0
+        low = max(start - self.first, 0)
+        high = min(stop - self.first, len(self.counts))
+        return sum(self.counts[low:high]) if low < high else 0
+    
+    def series(self, start, stop):
+        """Units per bucket for start <= bucket < stop, zero where nothing sold"""
+        counts = array('q', repeat(0, stop - start))
+        if self.first is not None:
+            low = max(start, self.first)
+            high = min(stop, self.first + len(self.counts))
+            if low < high:
+                counts[low - start:high - start] = self.counts[low - self.first:high - self.first]
+        return counts
+
+class ItemSales:
+    """One item's recorded sales: the raw events, append-only, and their day/week/month rollups"""
+    
+    __slots__ = ('days', 'quantities', 'daily', 'weekly', 'monthly')
+    
+    def __init__(self):
+        self.days = array('i')
+        self.quantities = array('q')
+        self.daily = SalesBuckets()
+        self.weekly = SalesBuckets()
+        self.monthly = SalesBuckets()
+    
+    def copy(self):
+        clone = ItemSales.__new__(ItemSales)
+        clone.days = array('i', self.days)
+        clone.quantities = array('q', self.quantities)
+        clone.daily = self.daily.copy()
+        clone.weekly = self.weekly.copy()
+        clone.monthly = self.monthly.copy()
+        return clone
+    
+    def add(self, day, quantity):
+        self.days.append(day)
+        self.quantities.append(quantity)
+        self.daily.add(day, quantity)
+        self.weekly.add(week_of(day), quantity)
+        self.monthly.add(month_of(day), quantity)
+
+class SalesHistory:
+    """Dated sales per item, with rollups kept current as events arrive
+    
+    Every item keeps its raw events plus day, week and month totals, and the
+    history keeps each item's units over the rolling ROLLING_WINDOWS days
+    ending at `as_of`, the latest day with recorded sales. Queries read the
+    rollups only, never the raw events.
+    
+    Like the other indexes it is copied before a write while a snapshot
+    still reads it; items are then copied one at a time as they are touched.
+    """
+    
+    ROLLING_WINDOWS = (7, 28, 90)
+    
+    def __init__(self):
+        self.items = {}
+        self.as_of = None
+        self.event_count = 0
+        self.windows = {window: {} for window in self.ROLLING_WINDOWS}
+        self._owned = set()
+    
+    def copy(self):
+        """An independent copy, for copy-on-write snapshots"""
+        clone = SalesHistory.__new__(SalesHistory)
+        clone.items = dict(self.items)
+        clone.as_of = self.as_of
+        clone.event_count = self.event_count
+        clone.windows = {window: dict(totals) for window, totals in self.windows.items()}
+        clone._owned = set()
+        return clone
+    
+    def add_many(self, events):
+        """Fold (item id, day, quantity) events into the rollups"""
+        in_window = []
+        latest = self.as_of
+        for item_id, day, quantity in events:
+            sales = self.items.get(item_id)
+            if sales is None:
+                sales = self.items[item_id] = ItemSales()
+                self._owned.add(item_id)
+            elif item_id not in self._owned:
+                sales = self.items[item_id] = sales.copy()
+                self._owned.add(item_id)
+            sales.add(day, quantity)
+            self.event_count += 1
+            in_window.append((item_id, day, quantity))
+            if latest is None or day > latest:
+                latest = day
+        if not in_window:
+            return
+        
+        if latest != self.as_of:
+            # The windows moved: recount them from the daily rollups in one pass
+            self.as_of = latest
+            for window, totals in self.windows.items():
+                start = latest - window + 1
+                totals.clear()
+                for item_id, sales in self.items.items():
+                    units = sales.daily.total(start, latest + 1)
+                    if units:
+                        totals[item_id] = units
+            return
+        
+        for window, totals in self.windows.items():
+            start = self.as_of - window + 1
+            for item_id, day, quantity in in_window:
+                if start <= day <= self.as_of:
+                    totals[item_id] = totals.get(item_id, 0) + quantity
+    
+    def window_units(self, item_id, window):
+        """Units an item sold in the rolling window ending at as_of"""
+        return self.windows[window].get(item_id, 0)
+    
+    def trends(self, window):
+        """Yield (item id, units this window, units the window before) for items that sold in either"""
+        if self.as_of is None:
+            return
+        current = self.windows[window]
+        start = self.as_of - window + 1
+        for item_id, sales in self.items.items():
+            units = current.get(item_id, 0)
+            previous = sales.daily.total(start - window, start)
+            if units or previous:
+                yield item_id, units, previous
+
+def efficiency_score(selling_price, food_cost, prep_time):
+    """Profit per minute of prep time; items without a prep time rank last"""
+    return (selling_price - food_cost) / prep_time if prep_time else -math.inf
+
+class MenuView:
+    """Read operations shared by the live MenuStore and its snapshots
+    
+    Subclasses provide the columns, `_rankings`, `_slots` and column(), which
+    returns a whole column for the scan kernels.
+    """
+    
+    RANKED_COLUMNS = {
+        'monthlyProfit': 'monthly_profit',
+        'profitMargin': 'profit_margin',
+        'monthlySales': 'monthly_sales',
+        'prepTime': 'prep_time'
+    }
+    
+    def ranking(self, field):
+        """The rank index for a field, built on first use"""
+        index = self._rankings.get(field)
+        if index is None:
+            index = self._rankings[field] = self._build_ranking(field)
+        return index
+    
+    def _build_ranking(self, field):
+        if field == 'efficiency':
+            values = array('d', self.efficiency_scores())
+        else:
+            values = self.column(self.RANKED_COLUMNS[field])
+        return RankIndex.from_columns(values, self.column('ids'))
+    
+    def slot(self, item_id):
+        """Column position of an item id"""
+        slot = self._slots[item_id]
+        if slot >= len(self):
+            raise KeyError(item_id)
+        return slot
+    
+    def item(self, slot):
+        """Materialize the item stored at a slot"""
+        return {
+            "id": self.ids[slot],
+            "name": self.names[slot],
+            "category": self.categories[self.category_codes[slot]],
+            "sellingPrice": self.selling_price[slot],
+            "foodCost": self.food_cost[slot],
+            "prepTime": self.prep_time[slot],
+            "monthlySales": self.monthly_sales[slot],
+            "ingredients": self.ingredients[slot],
+            "profitMargin": self.profit_margin[slot],
+            "monthlyProfit": self.monthly_profit[slot],
+            "createdAt": datetime.fromtimestamp(self.created_at[slot]).isoformat()
+        }
+    
+    def items(self):
+        """Materialize every item in insertion order"""
+        return [self.item(slot) for slot in range(len(self))]
+    
+    def item_json(self, slot):
+        """The item at a slot as JSON bytes, encoded once and kept until the item changes"""
+        fragment = self.fragments[slot]
+        if fragment is None:
+            fragment = self.fragments[slot] = encode_item(self.item(slot))
+        return fragment
+    
+    def items_json(self, slots):
+        """A JSON array of the items at some slots, spliced together from their cached encodings"""
+        return RawJSON(b'[' + b','.join(map(self.item_json, slots)) + b']')
+    
+    def slots_after(self, item_id, limit):
+        """Slots of up to `limit` items whose id is greater than item_id"""
+        start = bisect_right(self.ids, item_id, 0, len(self))
+        return range(start, min(start + limit, len(self)))
+    
+    def argmax(self, column):
+        """Slot of the first largest value in a column"""
+        return max(range(len(column)), key=column.__getitem__)
+    
+    def efficiency_scores(self):
+        """Profit per minute of prep time for every slot"""
+        selling_price, food_cost, prep_time = self.column('selling_price'), self.column('food_cost'), self.column('prep_time')
+        if 0 not in prep_time:
+            return list(map(truediv, map(sub, selling_price, food_cost), prep_time))
+        return list(map(efficiency_score, selling_price, food_cost, prep_time))
+    
+    def food_cost_ratios(self):
+        """Food cost as a fraction of selling price for every slot"""
+        selling_price, food_cost = self.column('selling_price'), self.column('food_cost')
+        if 0 not in selling_price:
+            return list(map(truediv, food_cost, selling_price))
+        return [cost / price if price else 0
+                for cost, price in zip(food_cost, selling_price)]
+    
+    def price_grid(self, elasticities, multipliers, chunk_size=4096):
+        """Profit-maximizing price multiplier for every slot, searched over a grid
+        
+        Demand follows a constant elasticity per slot: sales at a price
+        multiplier m become sales * m ** elasticity. Slots are grouped by
+        elasticity and scored a chunk at a time, one column of projected
+        monthly profits per candidate and then one max/index pass over the
+        rows. Ties go to the earlier multiplier, so callers list the current
+        price (1.0) first. Returns (multiplier index, projected profit) columns.
+        """
+        selling_price, food_cost, monthly_sales = (self.column('selling_price'), self.column('food_cost'),
+                                                   self.column('monthly_sales'))
+        revenue = list(map(mul, selling_price, monthly_sales))
+        cost = list(map(mul, food_cost, monthly_sales))
+        groups = {}
+        for slot, elasticity in enumerate(elasticities):
+            groups.setdefault(elasticity, []).append(slot)
+        
+        best_index = [0] * len(revenue)
+        best_profit = [0.0] * len(revenue)
+        for elasticity, slots in groups.items():
+            # Profit at m is (m * revenue - cost) * m ** elasticity
+            factors = [(m * m ** elasticity, m ** elasticity) for m in multipliers]
+            for start in range(0, len(slots), chunk_size):
+                chunk = slots[start:start + chunk_size]
+                chunk_revenue = [revenue[slot] for slot in chunk]
+                chunk_cost = [cost[slot] for slot in chunk]
+                rows = list(zip(*[list(map(sub, map(mul, chunk_revenue, repeat(revenue_factor)),
+                                           map(mul, chunk_cost, repeat(cost_factor))))
+                                  for revenue_factor, cost_factor in factors]))
+                profits = list(map(max, rows))
+                for slot, index, profit in zip(chunk, map(tuple.index, rows, profits), profits):
+                    best_index[slot] = index
+                    best_profit[slot] = profit
+        return best_index, best_profit
+    
+    def category_price_stats(self):
+        """(category, prices) pairs for every category in first-seen order"""
+        # One pass appending into per-code buckets, not a compress pass per category
+        buckets = [array('d') for _ in self.categories]
+        appends = [bucket.append for bucket in buckets]
+        for code, price in zip(self.column('category_codes'), self.column('selling_price')):
+            appends[code](price)
+        return [(category, prices) for category, prices in zip(self.categories, buckets) if prices]
+
+class MenuStore(MenuView):
+    """Struct-of-arrays menu storage with interned category codes
+    
+    Numeric fields live in typed arrays so the analysis kernels can run over
+    whole columns with map/sum/max instead of walking per-item dicts. Item
+    dicts are only materialized at the API boundary.
+    
+    Writes go through the storage backend first; the columns then act as this
+    worker's mirror of it and are brought up to date by sync().
+    
+    Rank indexes are built on first use and then maintained row by row;
+    batches larger than RANK_REBUILD_THRESHOLD drop them to be rebuilt with
+    one sort on the next query instead.
+    
+    The `fragments` column caches each item's encoded JSON. Any reader may
+    fill it in; a rewritten row clears its slot, and like the other columns
+    it is copied first if a snapshot shares it, so a cached encoding always
+    matches the row the reader sees.
+    
+    Items with a recipe derive their food cost from the ingredient catalog;
+    repricing an ingredient rewrites just the rows that depend on it.
+    
+    `_slots` maps item ids to slots. Deleting an item leaves its slot in the
+    columns as a tombstone (taking it out of every index and total at once),
+    and a background compaction shortly after drops the dead slots and
+    renumbers the rest.
+    
+    Writers serialize on `lock`; readers work from snapshot() and never take
+    it except to publish a snapshot for a new version. A writer waits for
+    the backend to make its write durable only after releasing the lock, so
+    concurrent writers can share one log sync.
+    """
+    
+    RANK_REBUILD_THRESHOLD = 256
+    COMPACTION_DELAY = 1.0
+    ROW_COLUMNS = ('names', 'category_codes', 'selling_price', 'food_cost', 'prep_time', 'monthly_sales',
+                   'ingredients', 'profit_margin', 'monthly_profit', 'created_at')
+    ITEM_FIELDS = ('name', 'category', 'selling_price', 'food_cost', 'prep_time', 'monthly_sales', 'ingredients')
+    NUMERIC_COLUMNS = ('ids', 'selling_price', 'food_cost', 'prep_time', 'monthly_sales', 'profit_margin',
+                       'monthly_profit', 'category_codes', 'created_at')
+    SKETCHED_FIELDS = {
+        'profitMargin': lambda row: row[8],
+        'monthlySales': lambda row: row[6],
+        'sellingPrice': lambda row: row[3],
+        'prepTime': lambda row: row[5]
+    }
+    RANKED_FIELDS = {
+        'monthlyProfit': lambda row: row[9],
+        'profitMargin': lambda row: row[8],
+        'monthlySales': lambda row: row[6],
+        'prepTime': lambda row: row[5],
+        'efficiency': lambda row: efficiency_score(row[3], row[4], row[5])
+    }
+    
+    def __init__(self, backend=None, snapshot_path=None):
+        self.backend = backend if backend is not None else MemoryMenuBackend()
+        self.snapshot_path = snapshot_path
+        self.listeners = []
+        self.lock = threading.RLock()
+        self._writer = threading.local()
+        self.load()
+    
+    def load(self):
+        """(Re)build the columns from the backend"""
+        with self.lock:
+            self.ids = array('q')
+            self.selling_price = array('d')
+            self.food_cost = array('d')
+            self.prep_time = array('q')
+            self.monthly_sales = array('q')
+            self.profit_margin = array('d')
+            self.monthly_profit = array('d')
+            self.category_codes = array('i')
+            self.created_at = array('d')
+            self.names = []
+            self.ingredients = []
+            self.fragments = []
+            self.categories = []
+            self._category_lookup = {}
+            self._slots = {}
+            self._rankings = {}
+            self.ingredient_index = IngredientIndex()
+            self.aggregates = MenuAggregates()
+            self.sales = SalesHistory()
+            self.sketches = {field: QuantileSketch() for field in self.SKETCHED_FIELDS}
+            self.recipes = RecipeBook()
+            self.updated_ids = []
+            self.deleted_ids = []
+            self._dead = set()
+            self._compaction = None
+            self._mapped = False
+            self.version = 0
+            self._snapshot = None
+            self._shared = False
+            self._shared_columns = set()
+            
+            if self.snapshot_path and self._restore():
+                # Only what was written since the snapshot is read from the backend
+                self.sync()
+                return
+            
+            category_totals = self.backend.category_totals()
+            if category_totals is None:
+                self.sync()
+                return
+            
+            # Aggregates are summed inside the backend; only the columns are filled here
+            version = self.backend.current_version()
+            for row in self.backend.rows_since(0):
+                self._append(row)
+            self.aggregates.load_category_totals(category_totals)
+            self.sales.add_many(self.backend.sales_since(0, version))
+            self._load_recipes(0, version)
+            self._set_version(version)
+    
+    def sync(self):
+        """Pull in rows other workers have written since our last look"""
+        if self.backend.current_version() == self.version:
+            return
+        with self.lock:
+            version = self.backend.current_version()
+            if version == self.version:
+                return
+            rows = list(self.backend.rows_since(self.version))
+            if len(rows) > self.RANK_REBUILD_THRESHOLD:
+                self._rankings = {}
+            self._unshare()
+            for row in rows:
+                slot = self._slots.get(row[0])
+                if slot is None:
+                    self._append(row)
+                    self.aggregates.add_row(row)
+                else:
+                    self._replace(slot, row)
+            for item_id in self.backend.deleted_since(self.version, version):
+                if item_id in self._slots:
+                    self._delete(item_id)
+            self.sales.add_many(self.backend.sales_since(self.version, version))
+            self._load_recipes(self.version, version)
+            self._set_version(version)
+    
+    def _restore(self):
+        """Load the columns and indexes from the snapshot file, if there is one this backend can resume from
+        
+        Numeric columns stay memory-mapped and strings are decoded on
+        demand until the first write that needs them in memory.
+        """
+        try:
+            header, sections = read_snapshot_file(self.snapshot_path)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            app.logger.warning("Ignoring menu snapshot %s: %s", self.snapshot_path, e)
+            return False
+        if not self.backend.resume_from(header["meta"], header["version"]):
+            return False
+        
+        for name in self.NUMERIC_COLUMNS:
+            setattr(self, name, sections[name])
+        count = header["count"]
+        names_text, names_offsets = sections['names_text'], sections['names_offsets']
+        self.names = PackedColumn(lambda slot: str(names_text[names_offsets[slot]:names_offsets[slot + 1]], 'utf-8'),
+                                  count)
+        vocabulary = header["vocabulary"]
+        codes, ends = sections['ingredient_codes'], sections['ingredient_offsets']
+        self.ingredients = PackedColumn(lambda slot: list(map(vocabulary.__getitem__, codes[ends[slot]:ends[slot + 1]])),
+                                        count)
+        self.fragments = [None] * count
+        self.categories = header["categories"]
+        self._category_lookup = {category: code for code, category in enumerate(self.categories)}
+        self._slots = dict(zip(self.ids, range(count)))
+        self._mapped = True
+        
+        posting_ids, posting_offsets = sections['posting_ids'].cast('B'), sections['posting_offsets']
+        postings = []
+        for start, end in zip(posting_offsets, posting_offsets[1:]):
+            posting = array('q')
+            posting.frombytes(posting_ids[start * 8:end * 8])
+            postings.append(posting)
+        self.ingredient_index = IngredientIndex.from_postings(header["ingredientNames"], postings)
+        self.aggregates = MenuAggregates.from_state(header["aggregates"])
+        self.sketches = {field: QuantileSketch.from_state(state) for field, state in header["sketches"].items()}
+        for name, (unit, unit_cost) in header["catalog"].items():
+            self.recipes.set_ingredient(name, unit, unit_cost)
+        for item_id, recipe in header["recipes"]:
+            self.recipes.set_recipe(item_id, recipe)
+        self.sales.add_many(zip(sections['sales_items'], sections['sales_days'], sections['sales_quantities']))
+        self._set_version(header["version"])
+        return True
+    
+    def _unmap(self):
+        """Swap the numeric columns still mapped from a snapshot file for writable arrays"""
+        for name in self.NUMERIC_COLUMNS:
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                copy = array(column.format)
+                copy.frombytes(column.cast('B'))
+                setattr(self, name, copy)
+        self._mapped = False
+    
+    def dump(self, path=None):
+        """Write the current version to a snapshot file; returns (version, item count, bytes written)
+        
+        Once the store's own snapshot file is replaced, the backend may drop
+        its record of everything up to that version.
+        """
+        snapshot = self.snapshot()
+        size = write_snapshot_file(snapshot, path or self.snapshot_path, self.backend.snapshot_meta())
+        if path is None or path == self.snapshot_path:
+            self.backend.checkpoint(snapshot.version)
+        return snapshot.version, len(snapshot), size
+    
+    def _load_recipes(self, version, until):
+        """Apply the catalog entries and recipes written in versions (version, until]"""
+        catalog = list(self.backend.catalog_since(version, until))
+        recipes = list(self.backend.recipes_since(version, until))
+        if catalog or recipes:
+            self._own_recipes()
+        for name, unit, unit_cost in catalog:
+            self.recipes.set_ingredient(name, unit, unit_cost)
+        for item_id, recipe in recipes:
+            self.recipes.set_recipe(item_id, recipe)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def column(self, name):
+        return getattr(self, name)
+    
+    def slot(self, item_id):
+        """Column position of a live item id"""
+        slot = self._slots[item_id]
+        if slot in self._dead:
+            raise KeyError(item_id)
+        return slot
+    
+    def _build_ranking(self, field):
+        # Snapshots leave out tombstoned slots, so build from one
+        return self.snapshot().ranking(field)
+    
+    def snapshot(self):
+        """A read-only view of the current version
+        
+        Snapshots are published lazily, one per version, and reused by every
+        reader until the next write.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self.version:
+            with self.lock:
+                if self._snapshot is None or self._snapshot.version != self.version:
+                    self._snapshot = MenuSnapshot(self)
+                    self._shared = True
+                snapshot = self._snapshot
+        return snapshot
+    
+    def _unshare(self):
+        """Copy the indexes the published snapshot still reads before writing to them"""
+        if not self._shared:
+            return
+        self._rankings = {field: index.copy() for field, index in self._rankings.items()}
+        self.ingredient_index = self.ingredient_index.copy()
+        self.aggregates = self.aggregates.copy()
+        self.sales = self.sales.copy()
+        self.sketches = {field: sketch.copy() for field, sketch in self.sketches.items()}
+        self._shared = False
+    
+    def _own_column(self, name):
+        """A column that is safe to overwrite in place, copied first if any snapshot may still read it
+        
+        Snapshots mark the columns they share in `_shared_columns`; the
+        newest one is not enough to go by, since it may hold compacted
+        copies while an older one still reads the array itself.
+        """
+        if self._mapped:
+            self._unmap()
+        column = getattr(self, name)
+        if name in self._shared_columns:
+            column = column.copy() if isinstance(column, PackedColumn) else column[:]
+            setattr(self, name, column)
+            self._shared_columns.discard(name)
+        return column
+    
+    def _own_recipes(self):
+        """Copy the recipe book before changing it if the published snapshot reads it"""
+        if self._snapshot is not None and self._snapshot.recipes is self.recipes:
+            self.recipes = self.recipes.copy()
+    
+    def _adopt_ranking(self, field, index, version):
+        """Keep a rank index a snapshot built, if the menu has not changed since"""
+        with self.lock:
+            if version == self.version:
+                self._rankings.setdefault(field, index)
+    
+    def category_code(self, category):
+        """Intern a category name and return its code"""
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = self._category_lookup[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+    
+    def add(self, name, category, selling_price, food_cost, prep_time, monthly_sales, ingredients):
+        """Persist a new menu item and return it as a dict"""
+        with self.lock:
+            item_ids, version = self._insert([{
+                'name': name,
+                'category': category,
+                'selling_price': selling_price,
+                'food_cost': food_cost,
+                'prep_time': prep_time,
+                'monthly_sales': monthly_sales,
+                'ingredients': ingredients
+            }])
+            item = self.item(self._slots[item_ids[0]])
+        self._commit(version)
+        return item
+    
+    @staticmethod
+    def _row_values(fields):
+        """Backend row values for parsed item fields, with the profit fields derived from them"""
+        return (fields['name'], fields['category'], fields['selling_price'], fields['food_cost'],
+                fields['prep_time'], fields['monthly_sales'], fields['ingredients'],
+                calculate_profit_margin(fields['selling_price'], fields['food_cost']),
+                calculate_monthly_profit(fields['selling_price'], fields['food_cost'], fields['monthly_sales']))
+    
+    def add_many(self, items):
+        """Persist a batch of parsed items atomically and return their ids"""
+        item_ids, version = self._insert(items)
+        self._commit(version)
+        return item_ids
+    
+    @contextmanager
+    def writing(self):
+        """Hold the write lock across several reads and writes
+        
+        The writes made inside only wait to be durable once the lock is
+        released, so other writers can still share their log sync.
+        """
+        outermost = not hasattr(self._writer, 'pending')
+        if outermost:
+            self._writer.pending = 0
+        try:
+            with self.lock:
+                yield
+        finally:
+            if outermost:
+                version = self._writer.pending
+                del self._writer.pending
+                if version:
+                    self.backend.commit(version)
+    
+    def _commit(self, version):
+        """Wait for the backend to make a write durable, or leave that to the enclosing writing() block"""
+        if hasattr(self._writer, 'pending'):
+            self._writer.pending = max(self._writer.pending, version)
+        else:
+            self.backend.commit(version)
+    
+    def _insert(self, items):
+        """Write a batch of parsed items to the backend and mirror it; returns (ids, version)"""
+        created_at = datetime.now().timestamp()
+        rows = [self._row_values(fields) + (created_at,) for fields in items]
+        with self.lock:
+            item_ids, version = self.backend.insert_many(rows)
+            
+            if version == self.version + 1:
+                if len(rows) > self.RANK_REBUILD_THRESHOLD:
+                    self._rankings = {}
+                self._unshare()
+                for item_id, row in zip(item_ids, rows):
+                    row = (item_id,) + row
+                    self._append(row)
+                    self.aggregates.add_row(row)
+                self._set_version(version)
+            else:
+                # Another worker wrote in between; replay everything in version order
+                self.sync()
+        return item_ids, version
+    
+    def record_sales(self, events):
+        """Persist a batch of (item id, day ordinal, quantity) sales events atomically
+        
+        Raises KeyError for the first unknown item id, checked under the lock
+        so that a concurrent delete cannot slip in between.
+        """
+        with self.lock:
+            for item_id in dict.fromkeys(item_id for item_id, _, _ in events):
+                self.slot(item_id)
+            version = self.backend.insert_sales(events)
+            if version == self.version + 1:
+                self._unshare()
+                self.sales.add_many(events)
+                self._set_version(version)
+            else:
+                self.sync()
+        self._commit(version)
+        return version
+    
+    def set_ingredient_costs(self, catalog):
+        """Upsert catalog entries {name: (unit, unit cost)} and reprice the items whose recipes use them
+        
+        A None unit keeps the ingredient's current unit (the default for a
+        new one), resolved under the lock. Only items reached through the
+        dependency graph are recomputed, so the cost of a price feed grows
+        with the recipes it touches rather than with the menu. Returns
+        (version, ids of the repriced items).
+        """
+        entries = catalog
+        item_ids = []
+        
+        def derive():
+            nonlocal item_ids
+            recipes = self.recipes
+            catalog = {name: (unit or recipes.catalog.get(name, (CATALOG_DEFAULT_UNIT,))[0], unit_cost)
+                       for name, (unit, unit_cost) in entries.items()}
+            prices = {name: unit_cost for name, (unit, unit_cost) in catalog.items()}
+            changed = [name for name, unit_cost in prices.items()
+                       if name not in recipes.catalog or recipes.catalog[name][1] != unit_cost]
+            item_ids = sorted(recipes.affected(changed))
+            rows = [self._derived_row(self._slots[item_id],
+                                      {'food_cost': recipes.cost(recipes.recipes[item_id], prices)})
+                    for item_id in item_ids]
+            return rows, catalog, {}
+        
+        version = self._write_updates(derive)
+        self._commit(version)
+        return version, item_ids
+    
+    def set_recipe(self, item_id, recipe):
+        """Give an item a recipe {ingredient: quantity}, or remove it with an empty one
+        
+        With a recipe, the item's food cost and ingredient list follow from
+        it; removing the recipe leaves both as they were.
+        """
+        def derive():
+            slot = self.slot(item_id)
+            changes = {'food_cost': self.recipes.cost(recipe), 'ingredients': list(recipe)} if recipe else {}
+            return [self._derived_row(slot, changes)], {}, {item_id: recipe}
+        
+        version = self._write_updates(derive)
+        self._commit(version)
+        return version
+    
+    def update(self, item_id, changes):
+        """Persist changes to some of an item's fields and return the updated item as a dict"""
+        with self.lock:
+            version = self._write_updates(lambda: ([self._derived_row(self.slot(item_id), changes)], {}, {}))
+            item = self.item(self.slot(item_id))
+        self._commit(version)
+        return item
+    
+    def delete(self, item_id):
+        """Delete an item and return the new version"""
+        with self.lock:
+            self.slot(item_id)
+            version = self.backend.delete_items([item_id])
+            if version == self.version + 1:
+                self._unshare()
+                self._delete(item_id)
+                self._set_version(version)
+            else:
+                self.sync()
+        self._commit(version)
+        return version
+    
+    def _derived_row(self, slot, changes):
+        """The row at a slot with some item fields changed and the profit fields recomputed"""
+        row = self._row(slot)
+        fields = dict(zip(self.ITEM_FIELDS, row[1:8]))
+        fields.update(changes)
+        return (row[0],) + self._row_values(fields) + (row[10],)
+    
+    def _write_updates(self, derive):
+        """Persist rewritten rows with the catalog and recipe changes behind them, then mirror them
+        
+        `derive` builds (rows, catalog, recipes) from the mirror. Rows are
+        written whole, so if another worker wrote since the mirror's version
+        the backend refuses them; the mirror then syncs and derives them
+        again, rather than overwriting that worker's changes.
+        """
+        with self.lock:
+            while True:
+                rows, catalog, recipes = derive()
+                version = self.backend.update_items(rows, catalog, recipes, self.version)
+                if version is not None:
+                    break
+                self.sync()
+            if len(rows) > self.RANK_REBUILD_THRESHOLD:
+                self._rankings = {}
+            self._unshare()
+            if catalog or recipes:
+                self._own_recipes()
+            for name, (unit, unit_cost) in catalog.items():
+                self.recipes.set_ingredient(name, unit, unit_cost)
+            for item_id, recipe in recipes.items():
+                self.recipes.set_recipe(item_id, recipe)
+            for row in rows:
+                self._replace(self._slots[row[0]], row)
+            self._set_version(version)
+        return version
+    
+    def _set_version(self, version):
+        """Record a new menu version and tell listeners the menu changed"""
+        if version == self.version:
+            return
+        self.version = version
+        for listener in self.listeners:
+            listener(version)
+        self.updated_ids = []
+        self.deleted_ids = []
+    
+    def _append(self, row):
+        """Append a backend row to the columns and return its slot"""
+        (item_id, name, category, selling_price, food_cost, prep_time, monthly_sales,
+         ingredients, profit_margin, monthly_profit, created_at) = row
+        if self._mapped:
+            self._unmap()
+        slot = len(self.ids)
+        self.names.append(name)
+        self.category_codes.append(self.category_code(category))
+        self.selling_price.append(selling_price)
+        self.food_cost.append(food_cost)
+        self.prep_time.append(prep_time)
+        self.monthly_sales.append(monthly_sales)
+        self.ingredients.append(ingredients)
+        self.profit_margin.append(profit_margin)
+        self.monthly_profit.append(monthly_profit)
+        self.created_at.append(created_at)
+        self.fragments.append(None)
+        self._slots[item_id] = slot
+        # ids goes last: its length is what marks the row as complete
+        self.ids.append(item_id)
+        self.ingredient_index.add(item_id, ingredients)
+        for field, index in self._rankings.items():
+            index.insert(self.RANKED_FIELDS[field](row), item_id)
+        for field, sketch in self.sketches.items():
+            sketch.update(self.SKETCHED_FIELDS[field](row))
+        return slot
+    
+    def _row(self, slot):
+        """The backend row for the item stored at a slot"""
+        return (self.ids[slot], self.names[slot], self.categories[self.category_codes[slot]],
+                self.selling_price[slot], self.food_cost[slot], self.prep_time[slot], self.monthly_sales[slot],
+                self.ingredients[slot], self.profit_margin[slot], self.monthly_profit[slot], self.created_at[slot])
+    
+    def _replace(self, slot, row):
+        """Overwrite the item at a slot with a rewritten row, keeping indexes, sketches and totals in step"""
+        old = self._row(slot)
+        if row == old:
+            return
+        item_id = row[0]
+        values = (row[1], self.category_code(row[2])) + row[3:]
+        current = (old[1], self.category_codes[slot]) + old[3:]
+        for name, value, previous in zip(self.ROW_COLUMNS, values, current):
+            if value != previous:
+                self._own_column(name)[slot] = value
+        self._own_column('fragments')[slot] = None
+        self.aggregates.remove_row(old)
+        self.aggregates.add_row(row)
+        if row[7] != old[7]:
+            self.ingredient_index.remove(item_id, old[7])
+            self.ingredient_index.add(item_id, row[7])
+        for field, index in self._rankings.items():
+            key = self.RANKED_FIELDS[field]
+            index.update(key(old), key(row), item_id)
+        for field, sketch in self.sketches.items():
+            key = self.SKETCHED_FIELDS[field]
+            if key(row) != key(old):
+                sketch.remove(key(old))
+                sketch.update(key(row))
+        self.updated_ids.append(item_id)
+    
+    def _delete(self, item_id):
+        """Tombstone an item's slot and take it out of every index and total"""
+        slot = self._slots[item_id]
+        if slot in self._dead:
+            return
+        row = self._row(slot)
+        self._dead.add(slot)
+        self.aggregates.remove_row(row)
+        self.ingredient_index.remove(item_id, row[7])
+        for field, index in self._rankings.items():
+            index.remove(self.RANKED_FIELDS[field](row), item_id)
+        for field, sketch in self.sketches.items():
+            sketch.remove(self.SKETCHED_FIELDS[field](row))
+        if item_id in self.recipes.recipes:
+            self._own_recipes()
+            self.recipes.set_recipe(item_id, {})
+        self.deleted_ids.append(item_id)
+        if self._compaction is None:
+            self._compaction = Timer(self.COMPACTION_DELAY, self.compact)
+            self._compaction.daemon = True
+            self._compaction.start()
+    
+    def compact(self):
+        """Drop tombstoned slots from the columns and renumber the live ones
+        
+        Runs in the background after deletes. The menu version does not
+        change: readers holding snapshots keep their own columns, and the
+        indexes and totals already leave the dead rows out.
+        """
+        with self.lock:
+            self._compaction = None
+            if not self._dead:
+                return
+            self._unmap()
+            live = [slot not in self._dead for slot in range(len(self.ids))]
+            for name in self.ROW_COLUMNS + ('ids', 'fragments'):
+                setattr(self, name, compact_column(getattr(self, name), live))
+            self._shared_columns.clear()
+            self._slots = {item_id: slot for slot, item_id in enumerate(self.ids)}
+            self._dead = set()
+
+def compact_column(column, live):
+    """A copy of a column keeping only the slots flagged live"""
+    if isinstance(column, array):
+        return array(column.typecode, compress(column, live))
+    if isinstance(column, memoryview):
+        return array(column.format, compress(column, live))
+    return list(compress(column, live))
+
+class MenuSnapshot(MenuView):
+    """Immutable view of a MenuStore at one version
+    
+    Columns are appended to in place, so a snapshot shares them with the
+    store and reads only its first `count` slots; scan kernels get copies cut
+    at that length. A store that rewrites a row copies the column first.
+    While deleted slots await compaction, the snapshot copies out the live
+    rows instead and finds slots by bisecting the ascending ids.
+    Rank indexes, the ingredient index, the aggregates, sales history
+    and quantile sketches are shared until the store's next write, which
+    copies them first.
+    """
+    
+    def __init__(self, store):
+        self._store = store
+        self.version = store.version
+        self.categories = tuple(store.categories)
+        if store._dead:
+            live = [slot not in store._dead for slot in range(len(store.ids))]
+            for name in MenuStore.ROW_COLUMNS + ('ids', 'fragments'):
+                setattr(self, name, compact_column(getattr(store, name), live))
+            self._slots = None
+        else:
+            for name in MenuStore.ROW_COLUMNS + ('ids', 'fragments'):
+                setattr(self, name, getattr(store, name))
+            store._shared_columns.update(MenuStore.ROW_COLUMNS + ('ids', 'fragments'))
+            self._slots = store._slots
+        self.count = len(self.ids)
+        self.aggregates = store.aggregates
+        self.ingredient_index = store.ingredient_index
+        self.sales = store.sales
+        self.sketches = store.sketches
+        self.recipes = store.recipes
+        self._rankings = dict(store._rankings)
+        self._columns = {}
+    
+    def __len__(self):
+        return self.count
+    
+    def slot(self, item_id):
+        if self._slots is not None:
+            return MenuView.slot(self, item_id)
+        slot = bisect_left(self.ids, item_id)
+        if slot == self.count or self.ids[slot] != item_id:
+            raise KeyError(item_id)
+        return slot
+    
+    def column(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = getattr(self, name)[:self.count]
+        return column
+    
+    def ranking(self, field):
+        index = self._rankings.get(field)
+        if index is None:
+            index = self._rankings[field] = self._build_ranking(field)
+            self._store._adopt_ranking(field, index, self.version)
+        return index
+
+class PackedColumn:
+    """A string or string-list column read slot by slot from a snapshot file
+    
+    Loading a snapshot maps the string table rather than decoding every
+    name and ingredient list up front. Overwritten slots are kept in an
+    overlay and appended ones in a plain list, so the column stays writable.
+    """
+    
+    def __init__(self, decode, length):
+        self._decode = decode
+        self._length = length
+        self._changed = {}
+        self._tail = []
+    
+    def copy(self):
+        clone = PackedColumn(self._decode, self._length)
+        clone._changed = dict(self._changed)
+        clone._tail = self._tail[:]
+        return clone
+    
+    def __len__(self):
+        return self._length + len(self._tail)
+    
+    def __getitem__(self, slot):
+        if isinstance(slot, slice):
+            return [self[i] for i in range(*slot.indices(len(self)))]
+        if slot < 0:
+            slot += len(self)
+        if slot >= self._length:
+            return self._tail[slot - self._length]
+        if slot < 0:
+            raise IndexError(slot)
+        if slot in self._changed:
+            return self._changed[slot]
+        return self._decode(slot)
+    
+    def __setitem__(self, slot, value):
+        if slot >= self._length:
+            self._tail[slot - self._length] = value
+        else:
+            self._changed[slot] = value
+    
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+    
+    def append(self, value):
+        self._tail.append(value)
+
+SNAPSHOT_MAGIC = b'MENUSNAP'
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_ALIGN = 8
+
+def snapshot_file(restaurant):
+    """Snapshot file for a restaurant, or None when snapshots are disabled"""
+    return os.path.join(SNAPSHOT_DIR, f"{restaurant}.menusnap") if SNAPSHOT_DIR else None
+
+def write_snapshot_file(view, path, meta):
+    """Write a menu view to a binary snapshot file and return its size in bytes
+    
+    Layout: the magic bytes, the header length, a JSON header, then 8-byte
+    aligned sections. Numeric columns are stored as raw native arrays so a
+    reader can map them in place; names and ingredient lists go into string
+    tables with an offsets array. The small structures (totals, sketches,
+    recipes, interned names) ride in the header. The file is written beside
+    the target and renamed over it, so readers only ever see a whole one.
+    """
+    count = len(view)
+    sections = []
+    for name in MenuStore.NUMERIC_COLUMNS:
+        column = view.column(name)
+        sections.append((name, getattr(column, 'typecode', None) or column.format, column))
+    
+    names = [name.encode() for name in islice(view.names, count)]
+    sections.append(('names_offsets', 'q', array('q', accumulate(map(len, names), initial=0))))
+    sections.append(('names_text', 'B', b''.join(names)))
+    
+    vocabulary = {}
+    codes = array('i')
+    ends = array('q', [0])
+    for ingredients in islice(view.ingredients, count):
+        codes.extend(vocabulary.setdefault(ingredient, len(vocabulary)) for ingredient in ingredients)
+        ends.append(len(codes))
+    sections.append(('ingredient_codes', 'i', codes))
+    sections.append(('ingredient_offsets', 'q', ends))
+    
+    postings = view.ingredient_index.postings()
+    posting_ids = array('q')
+    for posting in postings:
+        posting_ids.extend(posting)
+    sections.append(('posting_ids', 'q', posting_ids))
+    sections.append(('posting_offsets', 'q', array('q', accumulate(map(len, postings), initial=0))))
+    
+    sales_items, sales_days, sales_quantities = array('q'), array('i'), array('q')
+    for item_id, sales in view.sales.items.items():
+        sales_items.extend(repeat(item_id, len(sales.days)))
+        sales_days.extend(sales.days)
+        sales_quantities.extend(sales.quantities)
+    sections += [('sales_items', 'q', sales_items), ('sales_days', 'i', sales_days),
+                 ('sales_quantities', 'q', sales_quantities)]
+    
+    offsets = {}
+    position = 0
+    for name, typecode, data in sections:
+        length = memoryview(data).nbytes
+        offsets[name] = (position, length, typecode)
+        position += -(-length // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+    header = json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "byteorder": sys.byteorder,
+        "version": view.version,
+        "count": count,
+        "meta": meta,
+        "categories": list(view.categories),
+        "vocabulary": list(vocabulary),
+        "ingredientNames": view.ingredient_index.names,
+        "aggregates": view.aggregates.state(),
+        "sketches": {field: sketch.state() for field, sketch in view.sketches.items()},
+        "catalog": view.recipes.catalog,
+        "recipes": [[item_id, recipe] for item_id, recipe in view.recipes.recipes.items()],
+        "sections": offsets
+    }, separators=(',', ':')).encode()
+    
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack('<Q', len(header)) + header)
+            f.write(bytes(-f.tell() % SNAPSHOT_ALIGN))
+            for name, typecode, data in sections:
+                f.write(data)
+                f.write(bytes(-f.tell() % SNAPSHOT_ALIGN))
+            size = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        fsync_directory(path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return size
+
+def read_snapshot_file(path):
+    """Map a snapshot file and return (header, sections) with each section a memoryview into the mapping
+    
+    The mapping is read-only and shared, so every worker process that maps
+    the same file shares its pages through the OS page cache.
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapping[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a menu snapshot")
+    start = len(SNAPSHOT_MAGIC) + 8
+    (header_length,) = struct.unpack_from('<Q', mapping, len(SNAPSHOT_MAGIC))
+    header = json.loads(mapping[start:start + header_length])
+    if header.get("format") != SNAPSHOT_FORMAT or header.get("byteorder") != sys.byteorder:
+        raise ValueError(f"{path} was written in an incompatible format")
+    base = -(-(start + header_length) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+    view = memoryview(mapping)
+    sections = {name: view[base + offset:base + offset + length].cast(typecode)
+                for name, (offset, length, typecode) in header["sections"].items()}
+    return header, sections
+
+class AnalysisCache:
+    """Bounded LRU cache of analysis results keyed on (endpoint, menu version)"""
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, version=None):
+        """Drop results computed for any version other than `version`"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] != version]:
+                del self._entries[key]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "hitRate": self.hits / lookups if lookups else 0
+            }
+
+RESTAURANT_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+RESERVED_RESTAURANT_IDS = {'api', 'assets', 'static', 'menu-item', 'menu-items', 'rankings', 'ingredients', 'analysis', 'charts', 'stream',
+                           'metrics', 'profiles', 'sales',
+                           'simulations', 'snapshot'}
+
+class RestaurantError(LookupError):
+    """The requested restaurant id is invalid or not configured"""
+
+SSE_QUEUE_SIZE = 64
+SSE_MAX_ITEMS = 100
+SSE_POLL_SECONDS = 2
+SSE_RETRY_MS = 3000
+SSE_KEEPALIVE_SECONDS = 15
+SSE_MAX_SECONDS = 600
+
+class MenuEventBroker:
+    """Fans menu change events out to Server-Sent Events subscribers
+    
+    Each subscriber gets a bounded queue. Publishing never blocks: a
+    subscriber whose queue is full is dropped and its stream ends, and the
+    browser reconnects and resyncs from the stats event sent on connect.
+    """
+    
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.dropped = 0
+    
+    def __len__(self):
+        return len(self._subscribers)
+    
+    def subscribe(self):
+        subscriber = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self._drop(subscriber)
+    
+    def _drop(self, subscriber):
+        with self._lock:
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers.discard(subscriber)
+            self.dropped += 1
+        # Discard the backlog and leave the end-of-stream marker in its place
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        subscriber.put_nowait(None)
+
+def sse_message(event, data, event_id=None):
+    """Format one Server-Sent Events message"""
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data, separators=(',', ':'), sort_keys=True)}\n\n"
+
+def menu_stats(store):
+    """The dashboard's stat cards, from the running aggregates and the sales ranking"""
+    aggregates = store.aggregates
+    top = store.ranking('monthlySales').top(1)
+    return {
+        "totalRevenue": aggregates.total_revenue,
+        "itemCount": aggregates.count,
+        "avgMargin": aggregates.avg_margin,
+        "bestseller": store.names[store.slot(top[0])] if top else None
+    }
+
+class Tenant:
+    """One restaurant's partition: its menu store, analysis cache and change events"""
+    
+    def __init__(self, restaurant):
+        self.restaurant = restaurant
+        self.lock = threading.RLock()
+        self.cache = AnalysisCache(ANALYSIS_CACHE_SIZE)
+        self.events = MenuEventBroker(SSE_QUEUE_SIZE)
+        self.store = None
+        self.last_used = time.monotonic()
+        self.dump_lock = threading.Lock()
+        self.dumped_version = None
+    
+    def open(self):
+        """Load the store on first use, without holding up other tenants"""
+        with self.lock:
+            if self.store is None:
+                store = MenuStore(create_menu_backend(self.restaurant), snapshot_file(self.restaurant))
+                store.listeners.append(self.cache.invalidate)
+                store.listeners.append(self._menu_changed)
+                self._published = (store.version, store.ids[-1] if len(store) else 0)
+                self.store = store
+        return self.store
+    
+    def _menu_changed(self, version):
+        """Push a delta event for a write; runs under the store's write lock"""
+        store = self.store
+        # Tracked by id rather than slot, since compaction renumbers slots
+        previous_version, last_id = self._published
+        self._published = (version, store.ids[-1] if len(store) else 0)
+        if not self.events:
+            return
+        
+        live = [slot for slot in store.slots_after(last_id, len(store)) if slot not in store._dead]
+        # Rewritten items the subscribers already hold; new ones go out in full with `items`
+        updated = []
+        for item_id in dict.fromkeys(store.updated_ids):
+            slot = store._slots[item_id]
+            if item_id <= last_id and slot not in store._dead:
+                updated.append(slot)
+        deleted = [item_id for item_id in store.deleted_ids if item_id <= last_id]
+        truncated = len(live) + len(updated) + len(deleted) > SSE_MAX_ITEMS
+        self.events.publish(sse_message('menu', {
+            "version": version,
+            "previousVersion": previous_version,
+            "stats": menu_stats(store),
+            "items": [] if truncated else [store.item(slot) for slot in live],
+            "updated": [] if truncated else [store.item(slot) for slot in updated],
+            "deleted": [] if truncated else deleted,
+            "truncated": truncated
+        }, version))
+    
+    def sync(self):
+        self.store.sync()
+    
+    def snapshot(self):
+        return self.store.snapshot()
+    
+    def dump_snapshot(self):
+        """Write the menu to its snapshot file if it changed since the last dump
+        
+        Returns (version, item count, bytes written), with None for bytes when
+        the file was already current.
+        """
+        with self.dump_lock:
+            snapshot = self.store.snapshot()
+            if snapshot.version == self.dumped_version:
+                return snapshot.version, len(snapshot), None
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            result = self.store.dump()
+            self.dumped_version = result[0]
+            return result
+    
+    @property
+    def evictable(self):
+        """Only idle tenants whose menu lives in persistent storage can be dropped from memory"""
+        if self.events:
+            return False
+        return self.store is None or self.store.backend.persistent
+
+class TenantRegistry:
+    """Tenants resident in this worker, evicting idle ones back to storage
+    
+    Tenants are kept in least-recently-used order. When more than
+    max_resident are loaded, or one has been idle for idle_seconds, its
+    in-memory store is dropped; the next request reloads it from the backend.
+    """
+    
+    SWEEP_INTERVAL = 60
+    
+    def __init__(self, max_resident, idle_seconds):
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self._tenants = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+    
+    @staticmethod
+    def validate(restaurant):
+        if not RESTAURANT_ID_PATTERN.match(restaurant) or restaurant in RESERVED_RESTAURANT_IDS:
+            raise RestaurantError(f"Invalid restaurant id: {restaurant}")
+        if MENU_RESTAURANTS and restaurant != DEFAULT_RESTAURANT and restaurant not in MENU_RESTAURANTS:
+            raise RestaurantError(f"Unknown restaurant: {restaurant}")
+    
+    def get(self, restaurant):
+        """The tenant for a restaurant, loading it if it is not resident"""
+        self.validate(restaurant)
+        now = time.monotonic()
+        with self._lock:
+            tenant = self._tenants.get(restaurant)
+            if tenant is None:
+                tenant = self._tenants[restaurant] = Tenant(restaurant)
+            else:
+                self._tenants.move_to_end(restaurant)
+            tenant.last_used = now
+            self._evict(now)
+        tenant.open()
+        return tenant
+    
+    def _evict(self, now):
+        excess = len(self._tenants) - self.max_resident
+        if excess <= 0:
+            if now - self._last_sweep < self.SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        
+        # The most recently used tenant (the one being requested) is never evicted
+        for restaurant, tenant in list(self._tenants.items())[:-1]:
+            idle = now - tenant.last_used >= self.idle_seconds
+            if (excess > 0 or idle) and tenant.evictable:
+                del self._tenants[restaurant]
+                excess -= 1
+    
+    def resident(self):
+        with self._lock:
+            return list(self._tenants)
+    
+    def loaded(self):
+        """The resident tenants themselves, least recently used first"""
+        with self._lock:
+            return list(self._tenants.values())
+
+tenants = TenantRegistry(TENANT_MAX_RESIDENT, TENANT_IDLE_SECONDS)
+
+def dump_snapshots_periodically():
+    """Every SNAPSHOT_INTERVAL seconds, dump each resident restaurant whose menu changed"""
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        for tenant in tenants.loaded():
+            try:
+                tenant.dump_snapshot()
+            except Exception:
+                app.logger.exception("Snapshot of %s failed", tenant.restaurant)
+
+if SNAPSHOT_DIR and SNAPSHOT_INTERVAL > 0:
+    threading.Thread(target=dump_snapshots_periodically, name='menu-snapshots', daemon=True).start()
+
+@app.errorhandler(RestaurantError)
+def restaurant_not_found(e):
+    return jsonify({"error": str(e)}), 404
+
+# Cutoffs the analysis sections flag items against. In relative mode each is
+# read from the menu's quantile sketch instead: (field, percentile).
+FIXED_THRESHOLDS = {
+    'low_margin': 30,
+    'price_increase_margin': 40,
+    'good_margin': 60,
+    'high_margin': 80,
+    'low_sales': 50,
+    'high_sales': 100,
+    'low_demand_sales': 30,
+    'trending_sales': 150,
+    'high_cost_ratio': 0.4,
+    'long_prep': 30
+}
+RELATIVE_THRESHOLDS = {
+    'low_margin': ('profitMargin', 0.10),
+    'price_increase_margin': ('profitMargin', 0.20),
+    'good_margin': ('profitMargin', 0.50),
+    'high_margin': ('profitMargin', 0.90),
+    'low_sales': ('monthlySales', 0.25),
+    'high_sales': ('monthlySales', 0.75),
+    'low_demand_sales': ('monthlySales', 0.10),
+    'trending_sales': ('monthlySales', 0.95),
+    'long_prep': ('prepTime', 0.90)
+}
+THRESHOLD_MODES = ('fixed', 'relative')
+
+def parse_threshold_mode(args):
+    mode = args.get('thresholds', ANALYSIS_THRESHOLDS)
+    if mode not in THRESHOLD_MODES:
+        raise ValueError(f"thresholds must be {' or '.join(THRESHOLD_MODES)}")
+    return mode
+
+class AnalysisContext:
+    """Intermediate results shared by the analysis sections
+    
+    Each value is computed on first use and then reused by every section
+    built from the same context, so a combined report never scans a column
+    twice for the same thing.
+    """
+    
+    def __init__(self, store, threshold_mode='fixed'):
+        self.store = store
+        self.aggregates = store.aggregates
+        self.threshold_mode = threshold_mode
+    
+    def section_key(self, name):
+        """Cache key for a section built from this context, before the menu version"""
+        return (name, self.threshold_mode)
+    
+    @cached_property
+    def thresholds(self):
+        if self.threshold_mode == 'fixed':
+            return FIXED_THRESHOLDS
+        sketches = self.store.sketches
+        thresholds = {name: sketches[field].quantile(fraction)
+                      for name, (field, fraction) in RELATIVE_THRESHOLDS.items()}
+        # Food cost is (100 - margin)% of the price, so the costliest items are the lowest-margin ones
+        thresholds['high_cost_ratio'] = 1 - thresholds['low_margin'] / 100
+        return thresholds
+    
+    def top_slot(self, field):
+        """Slot of the item ranked highest on a field"""
+        return self.store.slot(self.store.ranking(field).top(1)[0])
+    
+    def bottom_slot(self, field):
+        """Slot of the item ranked lowest on a field"""
+        return self.store.slot(self.store.ranking(field).bottom(1)[0])
+    
+    @cached_property
+    def top_profit_slot(self):
+        return self.top_slot('monthlyProfit')
+    
+    @cached_property
+    def worst_margin_slot(self):
+        return self.bottom_slot('profitMargin')
+    
+    @cached_property
+    def top_sales_slot(self):
+        return self.top_slot('monthlySales')
+    
+    @cached_property
+    def low_volume_count(self):
+        return self.store.ranking('monthlySales').count(below=self.thresholds['low_demand_sales'])
+    
+    @cached_property
+    def low_volume_profit(self):
+        """Combined monthly profit of the items selling under the low-demand cutoff"""
+        store = self.store
+        item_ids = store.ranking('monthlySales').bottom(self.low_volume_count, below=self.thresholds['low_demand_sales'])
+        return sum(store.monthly_profit[store.slot(item_id)] for item_id in item_ids)
+    
+    @cached_property
+    def most_efficient(self):
+        """(slot, profit per minute) of the most efficient item"""
+        slot = self.top_slot('efficiency')
+        store = self.store
+        return slot, efficiency_score(store.selling_price[slot], store.food_cost[slot], store.prep_time[slot])
+    
+    @cached_property
+    def cost_ratios(self):
+        return self.store.food_cost_ratios()
+    
+    @cached_property
+    def worst_cost_slot(self):
+        return self.store.argmax(self.cost_ratios)
+    
+    @cached_property
+    def most_intensive_slot(self):
+        return self.top_slot('prepTime')
+    
+    @cached_property
+    def category_prices(self):
+        return self.store.category_price_stats()
+    
+    @cached_property
+    def sales_movers(self):
+        """(slot, units, previous units) of the items whose last 7 days of sales rose and fell the most"""
+        store = self.store
+        rising = falling = None
+        for item_id, units, previous in store.sales.trends(7):
+            try:
+                slot = store.slot(item_id)
+            except KeyError:
+                continue
+            change = units - previous
+            if change > 0 and (rising is None or change > rising[1] - rising[2]):
+                rising = (slot, units, previous)
+            elif change < 0 and (falling is None or change < falling[1] - falling[2]):
+                falling = (slot, units, previous)
+        return rising, falling
+    
+
+ANALYSIS_SECTIONS = {}
+RECOMMENDATION_TYPES = {'danger': 'danger', 'warning': 'warning', 'info': ''}
+
+def analysis_section(tenant, context, name):
+    """(recommendations, cache hit) for one section, built from the context on a miss"""
+    key = (context.section_key(name), context.store.version)
+    recommendations = tenant.cache.get(key)
+    if recommendations is not None:
+        return recommendations, True
+    recommendations = list(ANALYSIS_SECTIONS[name](context)) if len(context.store) else []
+    tenant.cache.put(key, recommendations)
+    return recommendations, False
+
+def ranked_section(tenant, context, name):
+    """(recommendations, cache hit) for one section, largest estimated monthly impact first"""
+    key = (context.section_key(name) + ('impact',), context.store.version)
+    ranked = tenant.cache.get(key)
+    if ranked is not None:
+        return ranked, True
+    recommendations, cache_hit = analysis_section(tenant, context, name)
+    # Stable, so equal impacts keep the order the section produced them in
+    ranked = sorted(recommendations, key=itemgetter('impact'), reverse=True)
+    tenant.cache.put(key, ranked)
+    return ranked, cache_hit
+
+def streamed_section(tenant, context, name):
+    """Yield a section's recommendations as they are built, caching the full list at the end"""
+    if not len(context.store):
+        return
+    recommendations = []
+    for recommendation in ANALYSIS_SECTIONS[name](context):
+        recommendations.append(recommendation)
+        yield recommendation
+    tenant.cache.put((context.section_key(name), context.store.version), recommendations)
+
+def parse_recommendation_query(args):
+    """(types, offset, limit, ranked) from the analysis query string
+    
+    Results are ranked by impact whenever they are filtered or paged, or
+    when sort=impact; sort=none keeps the order they were produced in.
+    """
+    types = None
+    if args.get('type'):
+        names = [name.strip() for name in args['type'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in RECOMMENDATION_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown type: {', '.join(unknown)}. Choose from {', '.join(RECOMMENDATION_TYPES)}")
+        types = {RECOMMENDATION_TYPES[name] for name in names}
+    try:
+        offset = max(0, int(args.get('offset', 0)))
+        limit = max(1, int(args['limit'])) if 'limit' in args else None
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    sort = args.get('sort', 'impact' if (types or 'offset' in args or 'limit' in args) else 'none')
+    if sort not in ('impact', 'none'):
+        raise ValueError("sort must be impact or none")
+    return types, offset, limit, sort == 'impact'
+
+def wants_ndjson():
+    """Whether the client asked for newline-delimited JSON"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':'), sort_keys=True) + '\n'
+
+def cached_analysis(name):
+    """Register an analysis section and serve it from the cache while the menu version is unchanged
+    
+    Sections are generators. `type`, `offset` and `limit` filter and page the
+    recommendations, ranked by estimated monthly impact; format=ndjson (or
+    Accept: application/x-ndjson) streams them one per line instead.
+    thresholds=relative flags items against the menu's own percentiles.
+    """
+    def decorator(build):
+        ANALYSIS_SECTIONS[name] = build
+        
+        @wraps(build)
+        def endpoint(restaurant=DEFAULT_RESTAURANT):
+            tenant = current_tenant(restaurant)
+            try:
+                types, offset, limit, ranked = parse_recommendation_query(request.args)
+                context = AnalysisContext(tenant.snapshot(), parse_threshold_mode(request.args))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            streaming = wants_ndjson()
+            if ranked:
+                recommendations, cache_hit = ranked_section(tenant, context, name)
+            elif streaming and (context.section_key(name), context.store.version) not in tenant.cache:
+                recommendations, cache_hit = streamed_section(tenant, context, name), False
+            else:
+                recommendations, cache_hit = analysis_section(tenant, context, name)
+            if types is not None:
+                recommendations = (rec for rec in recommendations if rec['type'] in types)
+            
+            if streaming:
+                stop = offset + limit if limit is not None else None
+                response = app.response_class(ndjson_lines(islice(recommendations, offset, stop)),
+                                              mimetype='application/x-ndjson')
+            else:
+                recommendations = list(recommendations)
+                end = len(recommendations) if limit is None else min(offset + limit, len(recommendations))
+                response = jsonify({
+                    "recommendations": recommendations[offset:end],
+                    "total": len(recommendations),
+                    "nextOffset": end if end < len(recommendations) else None,
+                    "version": context.store.version
+                })
+            response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+            return response
+        return endpoint
+    return decorator
+
+CHARTS = {}
+CHART_TOP_LIMIT = 8
+CHART_SCATTER_POINTS = 200
+CHART_SCATTER_MAX = 2500
+MARGIN_BIN_EDGES = (30.0, 50.0, 70.0)
+
+def chart(name):
+    """Register a chart data builder for /api/charts/<name>"""
+    def decorator(build):
+        CHARTS[name] = build
+        return build
+    return decorator
+
+def current_tenant(restaurant=DEFAULT_RESTAURANT):
+    """The restaurant's tenant, with its store synced with writes from other workers"""
+    tenant = tenants.get(restaurant)
+    tenant.sync()
+    return tenant
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestMetrics:
+    """Per-route request counters and latency histograms for this worker
+    
+    Routes are labelled by their URL rule (e.g. /api/<restaurant>/analysis/profit),
+    so the label set stays small however many restaurants there are. Streamed
+    responses are timed until their headers are sent.
+    """
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.response_bytes = Counter()
+        self.durations = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.duration_sums = Counter()
+    
+    def observe(self, method, route, status, seconds, size):
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            if status >= 500:
+                self.errors[(method, route)] += 1
+            self.response_bytes[(method, route)] += size
+            self.durations[(method, route)][bucket] += 1
+            self.duration_sums[(method, route)] += seconds
+    
+    def exposition(self):
+        """The metrics in Prometheus text format"""
+        with self._lock:
+            requests = sorted(self.requests.items())
+            errors = sorted(self.errors.items())
+            response_bytes = sorted(self.response_bytes.items())
+            durations = sorted((key, counts[:]) for key, counts in self.durations.items())
+            duration_sums = dict(self.duration_sums)
+        
+        lines = [
+            '# HELP menu_http_requests_total Requests handled, by route and status.',
+            '# TYPE menu_http_requests_total counter'
+        ]
+        lines += [f'menu_http_requests_total{{{prometheus_labels(method=method, route=route, status=status)}}} {count}'
+                  for (method, route, status), count in requests]
+        lines += [
+            '# HELP menu_http_request_errors_total Requests that ended in a 5xx response.',
+            '# TYPE menu_http_request_errors_total counter'
+        ]
+        lines += [f'menu_http_request_errors_total{{{prometheus_labels(method=method, route=route)}}} {count}'
+                  for (method, route), count in errors]
+        lines += [
+            '# HELP menu_http_response_bytes_total Response body bytes sent (streamed bodies are not counted).',
+            '# TYPE menu_http_response_bytes_total counter'
+        ]
+        lines += [f'menu_http_response_bytes_total{{{prometheus_labels(method=method, route=route)}}} {size}'
+                  for (method, route), size in response_bytes]
+        lines += [
+            '# HELP menu_http_request_duration_seconds Time to produce a response.',
+            '# TYPE menu_http_request_duration_seconds histogram'
+        ]
+        for (method, route), counts in durations:
+            labels = prometheus_labels(method=method, route=route)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'menu_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'menu_http_request_duration_seconds_sum{{{labels}}} {duration_sums[(method, route)]}')
+            lines.append(f'menu_http_request_duration_seconds_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+def prometheus_labels(**labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+class ProfileLog:
+    """The last few cProfile captures, kept in memory for download"""
+    
+    def __init__(self, keep):
+        self._profiles = deque(maxlen=keep)
+        self._next_id = 1
+        self._lock = threading.Lock()
+        # Only one request is profiled at a time: Python's profiler hooks are
+        # not meant to be stacked across threads
+        self.active = threading.Lock()
+    
+    def add(self, profiler, method, path, status, seconds, cache):
+        with self._lock:
+            record = {
+                "id": self._next_id,
+                "method": method,
+                "path": path,
+                "status": status,
+                "durationMs": round(seconds * 1000, 3),
+                "cache": cache,
+                "capturedAt": datetime.now().isoformat()
+            }
+            self._next_id += 1
+            self._profiles.append((record, profiler))
+    
+    def list(self):
+        with self._lock:
+            return [record for record, _ in reversed(self._profiles)]
+    
+    def get(self, profile_id):
+        with self._lock:
+            for record, profiler in self._profiles:
+                if record['id'] == profile_id:
+                    return record, profiler
+        raise KeyError(profile_id)
+
+request_metrics = RequestMetrics(LATENCY_BUCKETS)
+profiles = ProfileLog(PROFILE_KEEP)
+
+def profiling_requested():
+    """Whether this request should be profiled: analysis and chart routes only"""
+    rule = request.url_rule.rule if request.url_rule else ''
+    if '/analysis/' not in rule and '/charts/' not in rule:
+        return False
+    if PROFILE_TOKEN and request.headers.get('X-Profile-Token') == PROFILE_TOKEN:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiling_requested() and profiles.active.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request_metrics(response):
+    profiler = g.pop('profiler', None)
+    started = g.get('request_started')
+    seconds = time.perf_counter() - started if started is not None else 0.0
+    if profiler is not None:
+        method, path, cache = request.method, request.full_path.rstrip('?'), response.headers.get('X-Cache')
+        
+        def finish_profile():
+            profiler.disable()
+            profiles.active.release()
+            elapsed = time.perf_counter() - started if response.is_streamed else seconds
+            profiles.add(profiler, method, path, response.status_code, elapsed, cache)
+        
+        # A streamed body (the NDJSON export) is only generated as the server sends it
+        if response.is_streamed:
+            response.call_on_close(finish_profile)
+        else:
+            finish_profile()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    size = 0 if response.is_streamed else (response.content_length or 0)
+    request_metrics.observe(request.method, route, response.status_code, seconds, size)
+    return response
+
+@app.teardown_request
+def stop_abandoned_profiler(exc):
+    # after_request is skipped if another hook fails; never leave the profiler running
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        profiles.active.release()
+
+REQUIRED_MENU_FIELDS = ['name', 'category', 'sellingPrice', 'foodCost', 'prepTime', 'monthlySales']
+EDITABLE_MENU_FIELDS = REQUIRED_MENU_FIELDS + ['ingredients']
+BULK_BATCH_SIZE = 1000
+BULK_READ_SIZE = 64 * 1024
+MENU_PAGE_SIZE = 100
+MENU_PAGE_MAX = 1000
+MENU_ITEM_FIELDS = ('id', 'name', 'category', 'sellingPrice', 'foodCost', 'prepTime', 'monthlySales',
+                    'ingredients', 'profitMargin', 'monthlyProfit', 'createdAt')
+BULK_MAX_ERRORS = 100
+SALES_BATCH_MAX = 10000
+SALES_BACKFILL_YEARS = 2
+SALES_TREND_CHANGE_MIN = 1.25
+SALES_TREND_LIMIT = 10
+SALES_HISTORY_PERIODS = {'day': 30, 'week': 12, 'month': 12}
+SALES_HISTORY_MAX_PERIODS = 1000
+CATALOG_BATCH_MAX = 10000
+CATALOG_DEFAULT_UNIT = 'unit'
+RECIPE_MAX_INGREDIENTS = 100
+
+class MenuItemError(ValueError):
+    """Submitted menu item data failed validation"""
+
+def parse_menu_item(data):
+    """Validate submitted item data and convert each field exactly once"""
+    if not isinstance(data, dict):
+        raise MenuItemError("Expected a JSON object")
+    
+    for field in REQUIRED_MENU_FIELDS:
+        if field not in data or data[field] == '' or data[field] is None:
+            raise MenuItemError(f"Missing field: {field}")
+    
+    fields = convert_menu_fields(data)
+    fields.setdefault('ingredients', [])
+    return fields
+
+def parse_menu_item_changes(data):
+    """Validate a partial update into just the fields it changes"""
+    if not isinstance(data, dict) or not data:
+        raise MenuItemError("Expected a JSON object of fields to change")
+    unknown = [field for field in data if field not in EDITABLE_MENU_FIELDS]
+    if unknown:
+        raise MenuItemError(f"Cannot change: {', '.join(unknown)}")
+    for field in REQUIRED_MENU_FIELDS:
+        if field in data and (data[field] == '' or data[field] is None):
+            raise MenuItemError(f"Missing field: {field}")
+    return convert_menu_fields(data)
+
+def convert_menu_fields(data):
+    """Convert each item field present in `data` exactly once"""
+    fields = {}
+    for field, key, convert in (('name', 'name', str),
+                                ('category', 'category', str),
+                                ('sellingPrice', 'selling_price', float),
+                                ('foodCost', 'food_cost', float),
+                                ('prepTime', 'prep_time', int),
+                                ('monthlySales', 'monthly_sales', int)):
+        if field not in data:
+            continue
+        try:
+            value = convert(data[field])
+        except (TypeError, ValueError, OverflowError):
+            raise MenuItemError(f"Invalid value for {field}: {data[field]!r}")
+        # float() takes "nan" and "inf", which would poison the totals and rankings for good
+        if convert is float and not math.isfinite(value):
+            raise MenuItemError(f"{field} must be a finite number")
+        fields[key] = value
+    
+    if 'ingredients' in data:
+        ingredients = data['ingredients'] or []
+        if isinstance(ingredients, str):
+            ingredients = [part.strip() for part in ingredients.split(';') if part.strip()]
+        elif not isinstance(ingredients, list) or not all(isinstance(i, str) for i in ingredients):
+            raise MenuItemError("ingredients must be a list of strings")
+        fields['ingredients'] = ingredients
+    return fields
+
+def parse_sales_events(data):
+    """Validate posted sales into (item id, day ordinal, quantity) events
+    
+    Accepts one record, a list of them or {"sales": [...]}; each record is
+    {"itemId", "quantity", "date"} with an ISO date defaulting to today.
+    Whether the items exist is checked by MenuStore.record_sales.
+    """
+    if isinstance(data, dict):
+        data = data['sales'] if 'sales' in data else [data]
+    if not isinstance(data, list) or not data:
+        raise ValueError("Expected a sales record or a list of them")
+    if len(data) > SALES_BATCH_MAX:
+        raise ValueError(f"At most {SALES_BATCH_MAX} sales records per request")
+    
+    latest = date.today().toordinal() + 1  # allow for clients a timezone ahead
+    # Rollups are dense per day, so an ancient date would allocate every day since
+    earliest = latest - 1 - SALES_BACKFILL_YEARS * 366
+    events = []
+    for number, record in enumerate(data, 1):
+        if not isinstance(record, dict):
+            raise ValueError(f"Record {number}: expected a JSON object")
+        item_id, quantity = record.get('itemId'), record.get('quantity')
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            raise ValueError(f"Record {number}: itemId must be an integer")
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+            raise ValueError(f"Record {number}: quantity must be a non-negative integer")
+        try:
+            day = date.fromisoformat(record['date']).toordinal() if record.get('date') else latest - 1
+        except (TypeError, ValueError):
+            raise ValueError(f"Record {number}: date must be YYYY-MM-DD")
+        if day > latest:
+            raise ValueError(f"Record {number}: date is in the future")
+        if day < earliest:
+            raise ValueError(f"Record {number}: date is more than {SALES_BACKFILL_YEARS} years ago")
+        events.append((item_id, day, quantity))
+    return events
+
+def finite_number(value):
+    """Whether a JSON value is a finite number (booleans are not)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def parse_catalog_entries(data):
+    """Validate posted catalog entries into {name: (unit, unit cost)}
+    
+    Accepts one entry, a list of them or {"ingredients": [...]}; each entry
+    is {"name", "unitCost", "unit"}. An omitted unit comes back as None,
+    so the store keeps a known ingredient's unit and defaults only new ones.
+    Later entries for the same ingredient win.
+    """
+    if isinstance(data, dict):
+        data = data['ingredients'] if 'ingredients' in data else [data]
+    if not isinstance(data, list) or not data:
+        raise ValueError("Expected a catalog entry or a list of them")
+    if len(data) > CATALOG_BATCH_MAX:
+        raise ValueError(f"At most {CATALOG_BATCH_MAX} catalog entries per request")
+    
+    catalog = {}
+    for number, entry in enumerate(data, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Entry {number}: expected a JSON object")
+        name = entry.get('name')
+        name = IngredientIndex.normalize(name) if isinstance(name, str) else ''
+        if not name:
+            raise ValueError(f"Entry {number}: name is required")
+        unit_cost = entry.get('unitCost')
+        if not finite_number(unit_cost) or unit_cost < 0:
+            raise ValueError(f"Entry {number}: unitCost must be a non-negative number")
+        unit = entry.get('unit') or None
+        if unit is not None and not isinstance(unit, str):
+            raise ValueError(f"Entry {number}: unit must be a string")
+        catalog[name] = (unit and unit.strip() or None, float(unit_cost))
+    return catalog
+
+def parse_recipe(data, catalog):
+    """Validate a posted recipe into {ingredient: quantity}
+    
+    Accepts {"recipe": [...]} or the bare list; each line is
+    {"ingredient", "quantity"} naming a catalog ingredient. Repeated
+    ingredients are added together.
+    """
+    if isinstance(data, dict):
+        data = data.get('recipe')
+    if not isinstance(data, list) or not data:
+        raise ValueError("Expected a non-empty recipe list")
+    if len(data) > RECIPE_MAX_INGREDIENTS:
+        raise ValueError(f"At most {RECIPE_MAX_INGREDIENTS} ingredients per recipe")
+    
+    recipe = {}
+    for number, line in enumerate(data, 1):
+        if not isinstance(line, dict):
+            raise ValueError(f"Line {number}: expected a JSON object")
+        name = line.get('ingredient')
+        name = IngredientIndex.normalize(name) if isinstance(name, str) else ''
+        if name not in catalog:
+            raise ValueError(f"Line {number}: unknown ingredient {line.get('ingredient')!r}; add it to the catalog first")
+        quantity = line.get('quantity')
+        if not finite_number(quantity) or quantity <= 0:
+            raise ValueError(f"Line {number}: quantity must be a positive number")
+        recipe[name] = recipe.get(name, 0) + quantity
+    return recipe
+
+class BulkFormatError(ValueError):
+    """An upload that cannot be read past some row: invalid UTF-8 or malformed CSV"""
+    
+    def __init__(self, message, row=None):
+        super().__init__(message)
+        self.row = row
+
+def decoded_lines(stream):
+    """Decode an upload line by line, splitting at \\r, \\n or \\r\\n, and name the byte offset of invalid UTF-8"""
+    offset = 0
+    pending = b''
+    while True:
+        chunk = stream.read(BULK_READ_SIZE)
+        lines = (pending + chunk).splitlines(keepends=True)
+        # The last line may continue in the next chunk, even if it ends in \\r
+        pending = lines.pop() if chunk and lines else b''
+        for line in lines:
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                raise BulkFormatError(f"Invalid UTF-8 at byte {offset + e.start}")
+            offset += len(line)
+        if not chunk:
+            return
+
+def iter_bulk_records(stream, content_type):
+    """Yield (row number, record) pairs from a CSV or NDJSON upload without buffering it
+    
+    Raises BulkFormatError, with the row it stopped at, when the rest of the
+    upload cannot be read.
+    """
+    lines = decoded_lines(stream)
+    row_number = 0
+    try:
+        if 'csv' in content_type:
+            reader = csv.DictReader(lines)
+            reader.fieldnames  # reads the header, so its errors are put on row 1
+            # Row 1 is the header, so data rows are numbered from 2 as in a spreadsheet
+            row_number = 1
+            for row_number, record in enumerate(reader, 2):
+                yield row_number, record
+            return
+        
+        for row_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, MenuItemError(f"Invalid JSON: {e}")
+    except csv.Error as e:
+        raise BulkFormatError(f"Malformed CSV: {e}", row_number + 1)
+    except BulkFormatError as e:
+        e.row = row_number + 1
+        raise
+
+ITEM_FLOAT_FIELDS = ('sellingPrice', 'foodCost', 'profitMargin', 'monthlyProfit')
+NON_ASCII_PATTERN = re.compile('[\x7f-\U0010ffff]')
+
+def stdlib_item_json(item):
+    """An item encoded the way jsonify encodes it: compact, key-sorted and ASCII-only"""
+    return json.dumps(item, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode()
+
+def orjson_item_json(item):
+    """orjson's encoding of an item, made byte-identical to stdlib_item_json
+    
+    orjson writes non-ASCII text unescaped, which is escaped afterwards, and
+    floats outside [1e-4, 1e16) or non-finite in other notations, so items
+    holding one of those are left to the stdlib.
+    """
+    for field in ITEM_FLOAT_FIELDS:
+        value = abs(item[field])
+        if not (1e-4 <= value < 1e16 or value == 0):
+            return stdlib_item_json(item)
+    try:
+        data = orjson.dumps(item, option=orjson.OPT_SORT_KEYS)
+    except TypeError:  # integers beyond 64 bits
+        return stdlib_item_json(item)
+    if not data.isascii() or b'\x7f' in data:
+        data = NON_ASCII_PATTERN.sub(lambda m: json.encoder.encode_basestring_ascii(m.group())[1:-1],
+                                     data.decode()).encode()
+    return data
+
+def item_encoder(name):
+    """The item encoder selected by JSON_ENCODER"""
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'json':
+        return stdlib_item_json
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError("JSON_ENCODER=orjson but orjson is not installed")
+        return orjson_item_json
+    raise ValueError(f"Unknown JSON_ENCODER: {name}")
+
+encode_item = item_encoder(JSON_ENCODER)
+
+class RawJSON:
+    """JSON that is already encoded, spliced into responses as is"""
+    
+    __slots__ = ('data',)
+    
+    def __init__(self, data):
+        self.data = data
+
+class MenuJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, plus RawJSON fragments
+    
+    Fragments are swapped for placeholder strings while the rest of the
+    response is encoded as usual, then written in their place, so a list of
+    cached items costs a byte join rather than an encode. Output is the same
+    as encoding the equivalent objects.
+    """
+    
+    PLACEHOLDER = f"raw-json-{os.urandom(16).hex()}-"
+    PLACEHOLDER_PATTERN = re.compile(rf'"{PLACEHOLDER}(\d+)"'.encode())
+    
+    def _encode(self, obj, **kwargs):
+        fragments = []
+        
+        def default(o):
+            if isinstance(o, RawJSON):
+                fragments.append(o.data)
+                return f"{self.PLACEHOLDER}{len(fragments) - 1}"
+            return self.default(o)
+        
+        data = super().dumps(obj, default=default, **kwargs).encode()
+        if fragments:
+            data = self.PLACEHOLDER_PATTERN.sub(lambda m: fragments[int(m.group(1))], data)
+        return data
+    
+    def _expand(self, o):
+        return json.loads(o.data) if isinstance(o, RawJSON) else self.default(o)
+    
+    def dumps(self, obj, **kwargs):
+        if 'indent' in kwargs:
+            # Pretty-printing has to see inside the fragments
+            return super().dumps(obj, default=self._expand, **kwargs)
+        return self._encode(obj, **kwargs).decode()
+    
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj, separators=(',', ':')) + b'\n', mimetype=self.mimetype)
+
+app.json = MenuJSONProvider(app)
+
+class StaticAsset:
+    """An in-memory response body with precompressed variants
+    
+    Variants are built once at startup: identity, gzip and, when the brotli
+    package is installed, br. A variant is only kept if it is smaller than
+    the identity body.
+    """
+    
+    def __init__(self, name, body, mimetype):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.name = name
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()
+        stem, ext = os.path.splitext(name)
+        self.fingerprinted_name = f"{stem}.{self.digest[:12]}{ext}"
+        self.variants = {'identity': body}
+        compressed = gzip.compress(body, 9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.variants['br'] = compressed
+    
+    def response(self, cache_control):
+        """Serve the best variant the client accepts, honouring If-None-Match"""
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        response = app.response_class(self.variants[encoding], mimetype=self.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = cache_control
+        # Each encoding is a different byte stream, so each gets its own strong ETag
+        response.set_etag(f"{self.digest[:32]}-{encoding}")
+        return response.make_conditional(request)
+
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DASHBOARD_ASSETS = {}
+CSS_URL_PATTERN = re.compile(rb'url\(\s*([\'"]?)([^\'")?#]+)([^\'")]*)\1\s*\)')
+
+def register_asset(name, body, mimetype):
+    """Add an asset to the /assets/ route and return its fingerprinted URL"""
+    asset = StaticAsset(name, body, mimetype)
+    DASHBOARD_ASSETS[asset.fingerprinted_name] = asset
+    return f"/assets/{asset.fingerprinted_name}"
+
+def vendor_asset(path, cdn_url):
+    """URL of a self-hosted copy under static/vendor/
+    
+    A missing copy raises FileNotFoundError, unless DASHBOARD_CDN_FALLBACK
+    allows `cdn_url` instead; url() references inside a stylesheet pass None
+    and are left as they are. Stylesheets have their relative url()
+    references (fonts, images) registered too and rewritten to the
+    fingerprinted URLs.
+    """
+    full_path = os.path.join(VENDOR_DIR, path)
+    if not os.path.isfile(full_path):
+        if cdn_url is None:
+            return None
+        if not DASHBOARD_CDN_FALLBACK:
+            raise FileNotFoundError(f"Missing dashboard asset {full_path}", full_path)
+        app.logger.warning("Dashboard asset %s is missing; the page loads %s instead", full_path, cdn_url)
+        return cdn_url
+    with open(full_path, 'rb') as f:
+        body = f.read()
+    if path.endswith('.css'):
+        base_dir = os.path.dirname(path)
+        
+        def rewrite(match):
+            target = os.path.normpath(os.path.join(base_dir, match.group(2).decode('utf-8')))
+            url = vendor_asset(target, None)
+            if url is None:
+                return match.group(0)
+            return b'url(' + url.encode('utf-8') + match.group(3) + b')'
+        body = CSS_URL_PATTERN.sub(rewrite, body)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return register_asset(os.path.basename(path), body, mimetype)
+
+def build_dashboard():
+    """Render the dashboard page once, pointing at fingerprinted assets"""
+    html = app.jinja_env.from_string(HTML_TEMPLATE).render(
+        dashboard_css=register_asset('dashboard.css', DASHBOARD_CSS, 'text/css'),
+        dashboard_js=register_asset('dashboard.js', DASHBOARD_JS, 'text/javascript'),
+        chart_js=vendor_asset('chart.umd.min.js', CHART_JS_CDN),
+        fontawesome_css=vendor_asset('fontawesome/css/all.min.css', FONT_AWESOME_CDN)
+    )
+    return StaticAsset('index.html', html, 'text/html')
+
+def npm_package_files(url):
+    """Yield (path inside the package, contents) for the files of an npm package tarball"""
+    with urllib.request.urlopen(url, timeout=60) as response:
+        data = response.read()
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as package:
+        for member in package:
+            if member.isfile() and member.name.startswith('package/'):
+                yield member.name[len('package/'):], package.extractfile(member).read()
+
+def install_vendor_assets(package_files=npm_package_files):
+    """Download Chart.js and Font Awesome into static/vendor/ and return the paths written"""
+    chart_js = dict(package_files(CHART_JS_PACKAGE))
+    # Chart.js 4.4.1 ships its minified UMD build as chart.umd.js; later releases add chart.umd.min.js
+    files = {'chart.umd.min.js': chart_js.get('dist/chart.umd.min.js') or chart_js['dist/chart.umd.js']}
+    for path, body in package_files(FONT_AWESOME_PACKAGE):
+        if path.split('/')[0] in ('css', 'webfonts'):
+            files['fontawesome/' + path] = body
+    
+    written = []
+    for path, body in sorted(files.items()):
+        full_path = os.path.normpath(os.path.join(VENDOR_DIR, path))
+        if not full_path.startswith(VENDOR_DIR + os.sep):
+            raise ValueError(f"Unexpected vendor asset {path}")
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(body)
+        written.append(full_path)
+    return written
+
+@app.cli.command('vendor-assets')
+def vendor_assets_command():
+    """Download the dashboard's third-party assets into static/vendor/"""
+    for path in install_vendor_assets():
+        print(path)
+
+try:
+    dashboard_page, dashboard_error = build_dashboard(), None
+except FileNotFoundError as e:
+    dashboard_page = None
+    dashboard_error = (f"{e.args[0]}. Run `flask --app app vendor-assets` to install the dashboard assets, "
+                       f"or set DASHBOARD_CDN_FALLBACK=1 to load them from public CDNs.")
+    app.logger.error(dashboard_error)
+
+@app.route('/')
+@app.route('/<restaurant>/')
+def index(restaurant=DEFAULT_RESTAURANT):
+    """The dashboard; the same pre-rendered page serves every restaurant"""
+    TenantRegistry.validate(restaurant)
+    if dashboard_page is None:
+        return dashboard_error, 503, {'Content-Type': 'text/plain; charset=utf-8'}
+    return dashboard_page.response('no-cache')
+
+@app.route('/assets/<name>')
+def dashboard_asset(name):
+    """Fingerprinted dashboard assets, cacheable forever"""
+    asset = DASHBOARD_ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    return asset.response(ASSET_CACHE_CONTROL)
+
+@app.route('/api/menu-item', methods=['POST'])
+@app.route('/api/<restaurant>/menu-item', methods=['POST'])
+def add_menu_item(restaurant=DEFAULT_RESTAURANT):
+    """Add a new menu item"""
+    # Resolved first, so an unknown restaurant gets the usual 404
+    store = current_tenant(restaurant).store
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        try:
+            fields = parse_menu_item(data)
+        except MenuItemError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        with store.writing():
+            menu_item = store.add(**fields)
+            version = store.version
+        
+        return jsonify({
+            "success": True,
+            "menuItem": menu_item,
+            "version": version
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/menu-item/<int:item_id>', methods=['PATCH'])
+@app.route('/api/<restaurant>/menu-item/<int:item_id>', methods=['PATCH'])
+def update_menu_item(item_id, restaurant=DEFAULT_RESTAURANT):
+    """Change some of an item's fields; the profit fields and totals follow"""
+    try:
+        changes = parse_menu_item_changes(request.get_json(silent=True))
+    except MenuItemError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    store = current_tenant(restaurant).store
+    with store.writing():
+        if item_id in store.recipes.recipes and ('food_cost' in changes or 'ingredients' in changes):
+            return jsonify({"error": "foodCost and ingredients come from this item's recipe; change the recipe instead"}), 400
+        try:
+            menu_item = store.update(item_id, changes)
+        except KeyError:
+            return jsonify({"error": "Menu item not found"}), 404
+        version = store.version
+    return jsonify({"success": True, "menuItem": menu_item, "version": version})
+
+@app.route('/api/menu-item/<int:item_id>', methods=['DELETE'])
+@app.route('/api/<restaurant>/menu-item/<int:item_id>', methods=['DELETE'])
+def delete_menu_item(item_id, restaurant=DEFAULT_RESTAURANT):
+    """Retire an item from the menu"""
+    store = current_tenant(restaurant).store
+    try:
+        version = store.delete(item_id)
+    except KeyError:
+        return jsonify({"error": "Menu item not found"}), 404
+    return jsonify({"success": True, "deleted": item_id, "version": version})
+
+open_streams = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+@app.route('/api/stream')
+@app.route('/api/<restaurant>/stream')
+def menu_stream(restaurant=DEFAULT_RESTAURANT):
+    """Server-Sent Events feed of menu changes
+    
+    A `stats` event with the current version and stat cards is sent on
+    connect, then a `menu` event per write carrying the new stats, the
+    items added since the previous version, the ones rewritten in place and
+    the ids of deleted ones (or `truncated` when there were too many;
+    clients then reload them from /api/menu-items).
+    """
+    tenant = current_tenant(restaurant)
+    if not open_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many open streams"}), 503
+    subscriber = tenant.events.subscribe()
+    snapshot = tenant.snapshot()
+    greeting = sse_message('stats', {"version": snapshot.version, "stats": menu_stats(snapshot)}, snapshot.version)
+    
+    def stream():
+        yield f"retry: {SSE_RETRY_MS}\n" + greeting
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                message = subscriber.get(timeout=SSE_POLL_SECONDS)
+            except queue.Empty:
+                # Writes made by other workers only reach us through sync()
+                tenant.sync()
+                if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                    last_sent = time.monotonic()
+                    yield ": keepalive\n\n"
+                continue
+            if message is None:
+                return
+            last_sent = time.monotonic()
+            yield message
+    
+    def close():
+        tenant.events.unsubscribe(subscriber)
+        open_streams.release()
+    
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(close)
+    return response
+
+@app.route('/api/sales', methods=['POST'])
+@app.route('/api/<restaurant>/sales', methods=['POST'])
+def record_sales(restaurant=DEFAULT_RESTAURANT):
+    """Record dated sales counts for menu items"""
+    tenant = current_tenant(restaurant)
+    data = request.get_json(silent=True)
+    try:
+        events = parse_sales_events(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        version = tenant.store.record_sales(events)
+    except KeyError as e:
+        item_id = e.args[0]
+        number = next(number for number, event in enumerate(events, 1) if event[0] == item_id)
+        return jsonify({"error": f"Record {number}: unknown item {item_id}"}), 400
+    return jsonify({"success": True, "recorded": len(events), "version": version})
+
+@app.route('/api/sales/trends')
+@app.route('/api/<restaurant>/sales/trends')
+def sales_trends(restaurant=DEFAULT_RESTAURANT):
+    """Units per item over a rolling window against the window before, biggest movers first"""
+    tenant = current_tenant(restaurant)
+    store = tenant.snapshot()
+    try:
+        window = int(request.args.get('window', SalesHistory.ROLLING_WINDOWS[0]))
+        limit = max(1, int(request.args.get('limit', SALES_TREND_LIMIT)))
+    except ValueError:
+        return jsonify({"error": "window and limit must be integers"}), 400
+    if window not in SalesHistory.ROLLING_WINDOWS:
+        return jsonify({"error": f"window must be one of {', '.join(map(str, SalesHistory.ROLLING_WINDOWS))}"}), 400
+    
+    key = (('sales-trends', window, limit), store.version)
+    result = tenant.cache.get(key)
+    cache_hit = result is not None
+    if not cache_hit:
+        sales = store.sales
+        movers = []
+        categories = {}
+        units_total = previous_total = 0
+        for item_id, units, previous in sales.trends(window):
+            try:
+                slot = store.slot(item_id)
+            except KeyError:
+                continue
+            category = store.categories[store.category_codes[slot]]
+            categories[category] = categories.get(category, 0) + units
+            units_total += units
+            previous_total += previous
+            movers.append((units - previous, slot, units, previous))
+        
+        def mover(entry):
+            change, slot, units, previous = entry
+            return {
+                "id": store.ids[slot],
+                "name": store.names[slot],
+                "category": store.categories[store.category_codes[slot]],
+                "units": units,
+                "previousUnits": previous,
+                "change": change,
+                "changePercent": round(change / previous * 100, 1) if previous else None
+            }
+        
+        movers.sort(key=itemgetter(0))
+        result = {
+            "asOf": date.fromordinal(sales.as_of).isoformat() if sales.as_of else None,
+            "window": window,
+            "units": units_total,
+            "previousUnits": previous_total,
+            "categories": categories,
+            "rising": [mover(entry) for entry in reversed(movers[-limit:]) if entry[0] > 0],
+            "falling": [mover(entry) for entry in movers[:limit] if entry[0] < 0],
+            "version": store.version
+        }
+        tenant.cache.put(key, result)
+    
+    response = jsonify(result)
+    response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
+
+@app.route('/api/sales/<int:item_id>')
+@app.route('/api/<restaurant>/sales/<int:item_id>')
+def item_sales(item_id, restaurant=DEFAULT_RESTAURANT):
+    """An item's sales per day, week or month, plus its rolling window totals"""
+    store = current_tenant(restaurant).snapshot()
+    try:
+        slot = store.slot(item_id)
+    except KeyError:
+        return jsonify({"error": "Menu item not found"}), 404
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in SALES_HISTORY_PERIODS:
+        return jsonify({"error": "bucket must be day, week or month"}), 400
+    try:
+        periods = int(request.args.get('periods', SALES_HISTORY_PERIODS[bucket]))
+    except ValueError:
+        return jsonify({"error": "periods must be an integer"}), 400
+    periods = min(max(1, periods), SALES_HISTORY_MAX_PERIODS)
+    
+    sales = store.sales
+    as_of = sales.as_of or date.today().toordinal()
+    item = sales.items.get(item_id) or ItemSales()
+    if bucket == 'day':
+        end, rollup, first = as_of, item.daily, 1
+        start_of = date.fromordinal
+    elif bucket == 'week':
+        end, rollup, first = week_of(as_of), item.weekly, week_of(1)
+        start_of = lambda week: date.fromordinal(week * 7 + 1)
+    else:
+        end, rollup, first = month_of(as_of), item.monthly, month_of(1)
+        start_of = lambda month: date(month // 12, month % 12 + 1, 1)
+    # No period can start before 1 January of year 1
+    start = max(end - periods + 1, first)
+    series = rollup.series(start, end + 1)
+    
+    return jsonify({
+        "id": item_id,
+        "name": store.names[slot],
+        "bucket": bucket,
+        "asOf": date.fromordinal(as_of).isoformat(),
+        "series": [{"start": start_of(start + offset).isoformat(), "units": units}
+                   for offset, units in enumerate(series)],
+        "windows": {str(window): sales.window_units(item_id, window) for window in SalesHistory.ROLLING_WINDOWS},
+        "totalUnits": sum(item.quantities),
+        "version": store.version
+    })
+
+@app.route('/api/menu-items')
+@app.route('/api/<restaurant>/menu-items')
+def list_menu_items(restaurant=DEFAULT_RESTAURANT):
+    """List menu items a page at a time
+    
+    Pages are keyed by item id: pass the previous response's nextCursor as
+    `cursor` to continue, or the last id you hold to fetch only newer items.
+    `fields` limits each item to a comma-separated set of keys, and `stats`
+    holds the dashboard's stat cards for the whole menu. Responses carry
+    an ETag derived from the menu version, so unchanged pages revalidate with
+    a 304.
+    """
+    store = current_tenant(restaurant).snapshot()
+    etag = f"menu-{store.version}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        limit = int(request.args.get('limit', MENU_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+    limit = max(1, min(limit, MENU_PAGE_MAX))
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in MENU_ITEM_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    slots = store.slots_after(cursor, limit)
+    if fields is None:
+        items = store.items_json(slots)
+    else:
+        items = []
+        for slot in slots:
+            item = store.item(slot)
+            items.append({field: item[field] for field in fields})
+    
+    next_cursor = None
+    if slots and slots.stop < len(store):
+        next_cursor = str(store.ids[slots.stop - 1])
+    
+    response = jsonify({
+        "items": items,
+        "nextCursor": next_cursor,
+        "total": len(store),
+        "stats": menu_stats(store),
+        "version": store.version
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/rankings/<field>')
+@app.route('/api/<restaurant>/rankings/<field>')
+def ranked_menu_items(field, restaurant=DEFAULT_RESTAURANT):
+    """Top-k / bottom-k items on a ranked field, optionally within thresholds
+    
+    `order` is top (default) or bottom, `limit` caps the items returned, and
+    `above` / `below` restrict results to values strictly between them, e.g.
+    /api/rankings/profitMargin?order=bottom&below=30.
+    """
+    store = current_tenant(restaurant).snapshot()
+    if field not in MenuStore.RANKED_FIELDS:
+        return jsonify({"error": f"Unknown ranking: {field}. Choose from {', '.join(MenuStore.RANKED_FIELDS)}"}), 404
+    
+    order = request.args.get('order', 'top')
+    if order not in ('top', 'bottom'):
+        return jsonify({"error": "order must be top or bottom"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), MENU_PAGE_MAX))
+        above = float(request.args['above']) if 'above' in request.args else None
+        below = float(request.args['below']) if 'below' in request.args else None
+    except ValueError:
+        return jsonify({"error": "limit, above and below must be numbers"}), 400
+    
+    index = store.ranking(field)
+    item_ids = index.top(limit, above, below) if order == 'top' else index.bottom(limit, above, below)
+    return jsonify({
+        "field": field,
+        "order": order,
+        "count": index.count(above, below),
+        "items": store.items_json(store.slot(item_id) for item_id in item_ids),
+        "version": store.version
+    })
+
+@app.route('/api/ingredients')
+@app.route('/api/<restaurant>/ingredients')
+def list_ingredients(restaurant=DEFAULT_RESTAURANT):
+    """Every ingredient on the menu with its usage, most used first"""
+    store = current_tenant(restaurant).snapshot()
+    index = store.ingredient_index
+    return jsonify({
+        "ingredients": [{"name": name, "uses": uses, "items": items} for name, uses, items in index.usage()],
+        "total": len(index),
+        "singleUse": index.single_use_count,
+        "version": store.version
+    })
+
+@app.route('/api/ingredients/<name>/items')
+@app.route('/api/<restaurant>/ingredients/<name>/items')
+def ingredient_items(name, restaurant=DEFAULT_RESTAURANT):
+    """Menu items that use an ingredient"""
+    store = current_tenant(restaurant).snapshot()
+    item_ids = store.ingredient_index.item_ids(name)
+    if not item_ids:
+        return jsonify({"error": f"No menu items use {name}"}), 404
+    return jsonify({
+        "ingredient": IngredientIndex.normalize(name),
+        "uses": store.ingredient_index.uses(name),
+        "items": store.items_json(store.slot(item_id) for item_id in item_ids),
+        "version": store.version
+    })
+
+@app.route('/api/ingredients/catalog')
+@app.route('/api/<restaurant>/ingredients/catalog')
+def ingredient_catalog(restaurant=DEFAULT_RESTAURANT):
+    """The ingredient catalog with unit costs and how many recipes use each ingredient"""
+    store = current_tenant(restaurant).snapshot()
+    recipes = store.recipes
+    return jsonify({
+        "ingredients": [{"name": name, "unit": unit, "unitCost": unit_cost, "recipes": len(recipes.used_by.get(name, ()))}
+                        for name, (unit, unit_cost) in sorted(recipes.catalog.items())],
+        "total": len(recipes.catalog),
+        "version": store.version
+    })
+
+@app.route('/api/ingredients/catalog', methods=['POST'])
+@app.route('/api/<restaurant>/ingredients/catalog', methods=['POST'])
+def update_ingredient_catalog(restaurant=DEFAULT_RESTAURANT):
+    """Add catalog ingredients or change their unit costs, repricing only the recipes that use them"""
+    tenant = current_tenant(restaurant)
+    try:
+        catalog = parse_catalog_entries(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    version, item_ids = tenant.store.set_ingredient_costs(catalog)
+    return jsonify({"success": True, "updated": len(catalog), "repriced": len(item_ids), "version": version})
+
+def recipe_lines(recipe, catalog):
+    """A recipe as API lines with each ingredient's unit, unit cost and line cost"""
+    lines = []
+    for name, quantity in recipe.items():
+        unit, unit_cost = catalog[name]
+        lines.append({"ingredient": name, "quantity": quantity, "unit": unit,
+                      "unitCost": unit_cost, "cost": quantity * unit_cost})
+    return lines
+
+@app.route('/api/menu-item/<int:item_id>/recipe')
+@app.route('/api/<restaurant>/menu-item/<int:item_id>/recipe')
+def item_recipe(item_id, restaurant=DEFAULT_RESTAURANT):
+    """An item's recipe, costed at current catalog prices"""
+    store = current_tenant(restaurant).snapshot()
+    try:
+        slot = store.slot(item_id)
+    except KeyError:
+        return jsonify({"error": "Menu item not found"}), 404
+    recipe = store.recipes.recipes.get(item_id)
+    if recipe is None:
+        return jsonify({"error": f"Menu item {item_id} has no recipe"}), 404
+    return jsonify({
+        "itemId": item_id,
+        "name": store.names[slot],
+        "recipe": recipe_lines(recipe, store.recipes.catalog),
+        "foodCost": store.food_cost[slot],
+        "version": store.version
+    })
+
+@app.route('/api/menu-item/<int:item_id>/recipe', methods=['PUT', 'DELETE'])
+@app.route('/api/<restaurant>/menu-item/<int:item_id>/recipe', methods=['PUT', 'DELETE'])
+def set_item_recipe(item_id, restaurant=DEFAULT_RESTAURANT):
+    """Set an item's recipe, deriving its food cost from the catalog, or remove it"""
+    store = current_tenant(restaurant).store
+    recipe = {}
+    if request.method == 'PUT':
+        try:
+            recipe = parse_recipe(request.get_json(silent=True), store.snapshot().recipes.catalog)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    
+    with store.writing():
+        try:
+            slot = store.slot(item_id)
+        except KeyError:
+            return jsonify({"error": "Menu item not found"}), 404
+        if not recipe and item_id not in store.recipes.recipes:
+            return jsonify({"error": f"Menu item {item_id} has no recipe"}), 404
+        version = store.set_recipe(item_id, recipe)
+        menu_item = store.item(slot)
+    return jsonify({"success": True, "menuItem": menu_item, "version": version})
+
+@app.route('/api/menu-items/bulk', methods=['POST'])
+@app.route('/api/<restaurant>/menu-items/bulk', methods=['POST'])
+def bulk_import_menu_items(restaurant=DEFAULT_RESTAURANT):
+    """Import many menu items from a streamed CSV or NDJSON body
+    
+    Rows are validated as they arrive and inserted in batches of
+    BULK_BATCH_SIZE; each batch commits atomically. Invalid rows are skipped
+    and reported back by row number. An upload that cannot be read to the
+    end is a 400, and like any failure part way it keeps the batches already
+    committed, which the error response counts.
+    """
+    content_type = request.args.get('format') or request.mimetype or ''
+    if not any(kind in content_type for kind in ('csv', 'ndjson', 'jsonl')):
+        return jsonify({"error": "Send text/csv or application/x-ndjson"}), 415
+    
+    store = current_tenant(restaurant).store
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+    try:
+        for row_number, record in iter_bulk_records(request.stream, content_type):
+            try:
+                if isinstance(record, MenuItemError):
+                    raise record
+                batch.append(parse_menu_item(record))
+            except MenuItemError as e:
+                failed += 1
+                if len(errors) < BULK_MAX_ERRORS:
+                    errors.append({"row": row_number, "error": str(e)})
+                continue
+            
+            if len(batch) >= BULK_BATCH_SIZE:
+                store.add_many(batch)
+                inserted += len(batch)
+                batch = []
+        
+        if batch:
+            store.add_many(batch)
+            inserted += len(batch)
+    except BulkFormatError as e:
+        return jsonify({"error": f"Row {e.row}: {e}; {inserted} rows were already imported",
+                        "row": e.row, "inserted": inserted, "failed": failed, "errors": errors,
+                        "version": store.version}), 400
+    except Exception as e:
+        return jsonify({"error": f"{e}; {inserted} rows were already imported",
+                        "inserted": inserted, "failed": failed, "errors": errors, "version": store.version}), 500
+    
+    return jsonify({
+        "success": True,
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errorsTruncated": failed > len(errors),
+        "version": store.version
+    })
+
+@app.route('/api/analysis/cache')
+@app.route('/api/<restaurant>/analysis/cache')
+def analysis_cache_stats(restaurant=DEFAULT_RESTAURANT):
+    """Hit/miss counters for the restaurant's analysis result cache"""
+    return jsonify(tenants.get(restaurant).cache.stats())
+
+@app.route('/api/snapshot', methods=['POST'])
+@app.route('/api/<restaurant>/snapshot', methods=['POST'])
+def dump_snapshot(restaurant=DEFAULT_RESTAURANT):
+    """Write the menu to its binary snapshot file now"""
+    if not SNAPSHOT_DIR:
+        return jsonify({"error": "Snapshots are disabled; set SNAPSHOT_DIR"}), 404
+    started = time.perf_counter()
+    version, count, size = current_tenant(restaurant).dump_snapshot()
+    return jsonify({
+        "success": True,
+        "version": version,
+        "items": count,
+        "bytes": size,
+        "written": size is not None,
+        "seconds": round(time.perf_counter() - started, 4)
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Request metrics for this worker in Prometheus text format"""
+    return app.response_class(request_metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
+def profiles_authorized():
+    return not PROFILE_TOKEN or request.headers.get('X-Profile-Token') == PROFILE_TOKEN
+
+@app.route('/api/profiles')
+def list_profiles():
+    """The profiles captured by this worker, newest first"""
+    if not profiles_authorized():
+        return jsonify({"error": "X-Profile-Token required"}), 403
+    return jsonify({"profiles": profiles.list()})
+
+@app.route('/api/profiles/<int:profile_id>')
+def download_profile(profile_id):
+    """A captured profile as a cumulative-time report, or as a pstats file with format=pstats"""
+    if not profiles_authorized():
+        return jsonify({"error": "X-Profile-Token required"}), 403
+    try:
+        record, profiler = profiles.get(profile_id)
+    except KeyError:
+        return jsonify({"error": "Profile not found"}), 404
+    
+    if request.args.get('format') == 'pstats':
+        profiler.create_stats()
+        response = app.response_class(marshal.dumps(profiler.stats), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.pstats'
+        return response
+    
+    report = io.StringIO()
+    report.write(f"{record['method']} {record['path']} -> {record['status']} in {record['durationMs']} ms"
+                 f" (cache {record['cache'] or 'n/a'})\n\n")
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+    return app.response_class(report.getvalue(), mimetype='text/plain')
+
+@app.route('/api/analysis/all')
+@app.route('/api/<restaurant>/analysis/all')
+def combined_analysis(restaurant=DEFAULT_RESTAURANT):
+    """Build several analysis sections in one request from shared intermediates
+    
+    `sections` is an optional comma-separated subset of profit, pricing,
+    trends and costs; all four are returned by default.
+    """
+    tenant = current_tenant(restaurant)
+    store = tenant.snapshot()
+    requested = request.args.get('sections')
+    sections = list(ANALYSIS_SECTIONS)
+    if requested:
+        sections = [section.strip() for section in requested.split(',') if section.strip()]
+        unknown = [section for section in sections if section not in ANALYSIS_SECTIONS]
+        if unknown:
+            return jsonify({"error": f"Unknown sections: {', '.join(unknown)}"}), 400
+    
+    try:
+        context = AnalysisContext(store, parse_threshold_mode(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "sections": {section: analysis_section(tenant, context, section)[0] for section in sections},
+        "version": store.version
+    })
+
+@app.route('/api/analysis/profit')
+@app.route('/api/<restaurant>/analysis/profit')
+@cached_analysis('profit')
+def profit_analysis(context):
+    """Generate profit analysis recommendations"""
+    store = context.store
+    
+    # Overall metrics come from the running aggregates
+    avg_margin = context.aggregates.avg_margin
+    
+    # High performers
+    top_item = store.item(context.top_profit_slot)
+    yield {
+        "title": f"Star Performer: {top_item['name']}",
+        "description": f"This item generates ${top_item['monthlyProfit']:.2f} monthly profit with {top_item['profitMargin']:.1f}% margin. Consider featuring it prominently, training staff to upsell it, or creating similar items.",
+        "type": "",
+        "impact": round(top_item['monthlyProfit'], 2)
+    }
+    
+    # Low performers
+    worst_slot = context.worst_margin_slot
+    if store.profit_margin[worst_slot] < context.thresholds['low_margin']:
+        worst_item = store.item(worst_slot)
+        yield {
+            "title": f"Underperformer Alert: {worst_item['name']}",
+            "description": f"Only {worst_item['profitMargin']:.1f}% margin (${worst_item['monthlyProfit']:.2f}/month). Consider increasing price by 15-20%, reducing portion size, or finding cheaper ingredients.",
+            "type": "warning",
+            "impact": round(worst_item['sellingPrice'] * 0.15 * worst_item['monthlySales'], 2)
+        }
+    
+    # Category analysis
+    best_category = max(context.aggregates.categories.items(), key=lambda x: x[1]['profit'])
+    yield {
+        "title": f"Category Winner: {best_category[0]}",
+        "description": f"Your {best_category[0].lower()} generate ${best_category[1]['profit']:.2f} monthly profit. Consider expanding this category with 2-3 similar items to capitalize on success.",
+        "type": "",
+        "impact": round(best_category[1]['profit'], 2)
+    }
+    
+    # Overall health check
+    if avg_margin > 65:
+        yield {
+            "title": "Excellent Profit Health",
+            "description": f"Average margin of {avg_margin:.1f}% is above industry standard (60-70%). Focus on maintaining quality and consider strategic price increases on popular items.",
+            "type": "",
+            "impact": round(context.aggregates.total_profit, 2)
+        }
+    elif avg_margin < 50:
+        yield {
+            "title": "Profit Margin Warning",
+            "description": f"Average margin of {avg_margin:.1f}% is below recommended 60%. Review food costs, negotiate with suppliers, or adjust pricing across the menu.",
+            "type": "danger",
+            "impact": round((60 - avg_margin) / 100 * context.aggregates.total_revenue, 2)
+        }
+
+@app.route('/api/analysis/pricing')
+@app.route('/api/<restaurant>/analysis/pricing')
+@cached_analysis('pricing')
+def pricing_optimization(context):
+    """Generate pricing optimization recommendations"""
+    store = context.store
+    thresholds = context.thresholds
+    low_margin, high_margin, good_margin = (thresholds['price_increase_margin'], thresholds['high_margin'],
+                                            thresholds['good_margin'])
+    low_sales, high_sales = thresholds['low_sales'], thresholds['high_sales']
+    
+    # Shared columns can run past the snapshot, so read them cut to its length
+    columns = zip(islice(store.names, len(store)), store.column('profit_margin'), store.column('selling_price'),
+                  store.column('food_cost'), store.column('monthly_sales'))
+    for name, margin, current_price, food_cost, sales in columns:
+        # Price optimization suggestions
+        if margin < low_margin:  # Very low margin
+            target_price = food_cost / 0.6  # Target 60% margin
+            price_increase = target_price - current_price
+            yield {
+                "title": f"Price Increase Needed: {name}",
+                "description": f"Current margin is only {margin:.1f}%. Increase price from ${current_price:.2f} to ${target_price:.2f} (+${price_increase:.2f}) to achieve 60% margin. Monitor sales impact.",
+                "type": "warning",
+                "impact": round(price_increase * sales, 2)
+            }
+        
+        elif margin > high_margin and sales > high_sales:  # Very high margin with good sales
+            suggested_decrease = current_price * 0.05  # 5% decrease
+            new_price = current_price - suggested_decrease
+            yield {
+                "title": f"Price Optimization Opportunity: {name}",
+                "description": f"High margin ({margin:.1f}%) with strong sales ({sales} units). Consider reducing price by ${suggested_decrease:.2f} to ${new_price:.2f} to increase volume and competitiveness.",
+                "type": "",
+                "impact": round(suggested_decrease * sales, 2)
+            }
+        
+        elif sales < low_sales:  # Low sales items
+            if margin > good_margin:
+                price_reduction = current_price * 0.1  # 10% reduction
+                new_price = current_price - price_reduction
+                yield {
+                    "title": f"Volume Booster: {name}",
+                    "description": f"Low sales ({sales} units) despite good margin. Reduce price from ${current_price:.2f} to ${new_price:.2f} (-${price_reduction:.2f}) to stimulate demand.",
+                    "type": "",
+                    "impact": round(price_reduction * sales, 2)
+                }
+            else:
+                yield {
+                    "title": f"Menu Review Required: {name}",
+                    "description": f"Low sales ({sales} units) and poor margin ({margin:.1f}%). Consider removing from menu or complete recipe/pricing overhaul.",
+                    "type": "danger",
+                    "impact": round(current_price * sales, 2)
+                }
+    
+    # Competitive pricing analysis
+    for category, prices in context.category_prices:
+        if len(prices) > 1:
+            avg_price = sum(prices) / len(prices)
+            max_price = max(prices)
+            min_price = min(prices)
+            
+            if max_price > avg_price * 1.5:
+                yield {
+                    "title": f"Price Consistency Check: {category}",
+                    "description": f"Large price variation in {category.lower()} (${min_price:.2f} - ${max_price:.2f}). Ensure pricing reflects value differences or consider adjustment.",
+                    "type": "warning",
+                    "impact": round(context.aggregates.categories[category]['profit'], 2)
+                }
+
+@app.route('/api/analysis/trends')
+@app.route('/api/<restaurant>/analysis/trends')
+@cached_analysis('trends')
+def trend_analysis(context):
+    """Generate trend analysis recommendations"""
+    store = context.store
+    agg = context.aggregates
+    
+    # Sales volume trends
+    top_slot = context.top_sales_slot
+    if store.monthly_sales[top_slot] > context.thresholds['trending_sales']:
+        yield {
+            "title": f"Trending Item: {store.names[top_slot]}",
+            "description": f"Selling {store.monthly_sales[top_slot]} units monthly. This high demand indicates strong customer preference. Consider creating variations or limited-time specials based on this item.",
+            "type": "",
+            "impact": round(store.monthly_profit[top_slot], 2)
+        }
+    
+    # Week-over-week movers, from recorded daily sales
+    rising, falling = context.sales_movers
+    if rising and rising[1] >= rising[2] * SALES_TREND_CHANGE_MIN:
+        slot, units, previous = rising
+        yield {
+            "title": f"Sales Rising: {store.names[slot]}",
+            "description": f"Sold {units} units in the last 7 days, up from {previous} the week before. Make sure prep and stock keep up, and consider featuring it.",
+            "type": "",
+            "impact": round((units - previous) * (store.selling_price[slot] - store.food_cost[slot]) * 30 / 7, 2)
+        }
+    if falling and falling[1] * SALES_TREND_CHANGE_MIN <= falling[2]:
+        slot, units, previous = falling
+        yield {
+            "title": f"Sales Falling: {store.names[slot]}",
+            "description": f"Sold {units} units in the last 7 days, down from {previous} the week before. Check quality and visibility, or run a promotion before it becomes a low-demand item.",
+            "type": "warning",
+            "impact": round((previous - units) * (store.selling_price[slot] - store.food_cost[slot]) * 30 / 7, 2)
+        }
+    
+    low_volume_count = context.low_volume_count
+    if low_volume_count:
+        yield {
+            "title": "Low Demand Items",
+            "description": f"{low_volume_count} items selling less than {context.thresholds['low_demand_sales']:g} units monthly. Review these for menu simplification, better promotion, or removal to focus kitchen resources on popular items.",
+            "type": "warning",
+            "impact": round(context.low_volume_profit, 2)
+        }
+    
+    # Category performance trends
+    category_sales = agg.category_sales()
+    
+    if category_sales:
+        trending_category = max(category_sales.items(), key=lambda x: x[1])
+        slow_category = min(category_sales.items(), key=lambda x: x[1])
+        
+        yield {
+            "title": f"Category Trend: {trending_category[0]} Leading",
+            "description": f"{trending_category[0]} selling {trending_category[1]} total units. Customer preference is clear - consider expanding this category with seasonal specials or premium options.",
+            "type": "",
+            "impact": round(agg.categories[trending_category[0]]['profit'], 2)
+        }
+        
+        if slow_category[1] < trending_category[1] * 0.3:
+            yield {
+                "title": f"Category Decline: {slow_category[0]}",
+                "description": f"{slow_category[0]} underperforming with only {slow_category[1]} units. Consider refreshing recipes, adjusting presentation, or seasonal repositioning.",
+                "type": "warning",
+                "impact": round(agg.categories[slow_category[0]]['profit'], 2)
+            }
+    
+    # Prep time efficiency trends
+    if agg.quick_count and agg.slow_count:
+        avg_quick_sales = agg.quick_sales / agg.quick_count
+        avg_slow_sales = agg.slow_sales / agg.slow_count
+        
+        if avg_quick_sales > avg_slow_sales * 1.2:
+            yield {
+                "title": "Kitchen Efficiency Trend",
+                "description": f"Quick-prep items (≤10 min) outselling complex items by {((avg_quick_sales/avg_slow_sales-1)*100):.0f}%. Focus on streamlined recipes and consider simplifying high-prep items.",
+                "type": "",
+                "impact": 0
+            }
+    
+    # Profit per minute analysis
+    most_efficient, efficiency = context.most_efficient
+    yield {
+        "title": f"Efficiency Champion: {store.names[most_efficient]}",
+        "description": f"Generates ${efficiency:.2f} profit per minute of prep time. This efficiency model should guide future menu development and staff training priorities.",
+        "type": "",
+        "impact": round(store.monthly_profit[most_efficient], 2)
+    }
+
+@app.route('/api/analysis/costs')
+@app.route('/api/<restaurant>/analysis/costs')
+@cached_analysis('costs')
+def cost_analysis(context):
+    """Generate cost analysis recommendations"""
+    store = context.store
+    
+    # Food cost percentage analysis
+    total_revenue = context.aggregates.total_revenue
+    total_food_cost = context.aggregates.total_food_cost
+    overall_food_cost_percentage = (total_food_cost / total_revenue) * 100 if total_revenue else 0
+    
+    yield {
+        "title": f"Overall Food Cost: {overall_food_cost_percentage:.1f}%",
+        "description": f"Industry target is 28-35%. {'Excellent cost control!' if overall_food_cost_percentage < 30 else 'Good range' if overall_food_cost_percentage < 35 else 'Above target - review supplier costs and portion sizes'}",
+        "type": "" if overall_food_cost_percentage < 35 else "warning",
+        "impact": round(max(0, total_food_cost - 0.35 * total_revenue), 2)
+    }
+    
+    # High food cost items
+    cost_ratios = context.cost_ratios
+    worst_slot = context.worst_cost_slot
+    if cost_ratios[worst_slot] > context.thresholds['high_cost_ratio']:
+        cost_percentage = cost_ratios[worst_slot] * 100
+        yield {
+            "title": f"High Food Cost Alert: {store.names[worst_slot]}",
+            "description": f"Food cost is {cost_percentage:.1f}% of selling price. Consider negotiating with suppliers, reducing portion size by 10-15%, or finding substitute ingredients.",
+            "type": "danger",
+            "impact": round(store.food_cost[worst_slot] * store.monthly_sales[worst_slot] * 0.1, 2)
+        }
+    
+    # Ingredient cost optimization
+    ingredient_index = store.ingredient_index
+    most_used = ingredient_index.most_used()
+    
+    if most_used:
+        yield {
+            "title": f"Bulk Purchase Opportunity: {most_used[0].title()}",
+            "description": f"Used in {most_used[1]} different menu items. Negotiate volume discounts with suppliers or consider buying in larger quantities to reduce per-unit cost.",
+            "type": "",
+            "impact": 0
+        }
+    
+    # Labor cost implications (prep time analysis)
+    most_intensive = context.most_intensive_slot
+    if store.prep_time[most_intensive] > context.thresholds['long_prep']:
+        yield {
+            "title": f"Labor Cost Concern: {store.names[most_intensive]}",
+            "description": f"{store.prep_time[most_intensive]} minutes prep time significantly impacts labor costs. Consider pre-prep strategies, simplifying recipe, or pricing adjustment to account for labor investment.",
+            "type": "warning",
+            "impact": 0
+        }
+    
+    # Seasonal cost considerations
+    yield {
+        "title": "Seasonal Cost Planning",
+        "description": "Review your menu quarterly for seasonal ingredient price fluctuations. Consider featuring seasonal specials when ingredients are at peak freshness and lowest cost.",
+        "type": "",
+        "impact": 0
+    }
+    
+    # Waste reduction opportunities
+    single_use_count = ingredient_index.single_use_count
+    
+    if single_use_count > 3:
+        yield {
+            "title": "Ingredient Utilization",
+            "description": f"{single_use_count} ingredients used in only one dish. Cross-utilize ingredients across multiple menu items to reduce waste and inventory costs.",
+            "type": "warning",
+            "impact": 0
+        }
+
+@app.route('/api/charts/<name>')
+@app.route('/api/<restaurant>/charts/<name>')
+def chart_data(name, restaurant=DEFAULT_RESTAURANT):
+    """Chart-ready data computed on the server, a few KB whatever the menu size
+    
+    `top-sellers` takes `limit`, `margin-histogram` takes `edges` (comma-separated
+    margin percentages) and `cost-scatter` takes `points`, the most points to
+    return. Results are cached per menu version and revalidate by ETag.
+    """
+    build = CHARTS.get(name)
+    if build is None:
+        return jsonify({"error": f"Unknown chart: {name}. Choose from {', '.join(CHARTS)}"}), 404
+    
+    tenant = current_tenant(restaurant)
+    store = tenant.snapshot()
+    etag = f"chart-{store.version}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    try:
+        params = (
+            max(1, min(int(request.args.get('limit', CHART_TOP_LIMIT)), MENU_PAGE_MAX)),
+            max(1, min(int(request.args.get('points', CHART_SCATTER_POINTS)), CHART_SCATTER_MAX)),
+            tuple(sorted({float(edge) for edge in request.args['edges'].split(',')}))
+            if request.args.get('edges') else MARGIN_BIN_EDGES
+        )
+    except ValueError:
+        return jsonify({"error": "limit and points must be integers and edges a list of numbers"}), 400
+    
+    key = (('chart', name, params), store.version)
+    data = tenant.cache.get(key)
+    cache_hit = data is not None
+    if not cache_hit:
+        limit, points, edges = params
+        data = build(store, limit=limit, points=points, edges=edges)
+        tenant.cache.put(key, data)
+    
+    response = jsonify({"chart": name, **data, "version": store.version})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
+
+@chart('category-profit')
+def category_profit_chart(store, **params):
+    """Monthly profit per category, straight from the running aggregates"""
+    categories = store.aggregates.categories
+    return {
+        "labels": list(categories),
+        "values": [totals['profit'] for totals in categories.values()]
+    }
+
+@chart('top-sellers')
+def top_sellers_chart(store, limit, **params):
+    """The best selling items by monthly units"""
+    slots = [store.slot(item_id) for item_id in store.ranking('monthlySales').top(limit)]
+    return {
+        "ids": [store.ids[slot] for slot in slots],
+        "labels": [store.names[slot] for slot in slots],
+        "values": [store.monthly_sales[slot] for slot in slots]
+    }
+
+@chart('margin-histogram')
+def margin_histogram_chart(store, edges, **params):
+    """Item counts per profit margin band, lowest band first
+    
+    Read from the margin quantile sketch, so no sort or scan is needed: exact
+    for small menus, within about 1% of the item count for large ones.
+    """
+    sketch = store.sketches['profitMargin']
+    below = [sketch.rank(edge) for edge in edges]
+    counts = [below[0]] + list(map(sub, below[1:], below)) + [len(sketch) - below[-1]]
+    labels = ([f"<{edges[0]:g}%"] +
+              [f"{low:g}-{high:g}%" for low, high in zip(edges, edges[1:])] +
+              [f"{edges[-1]:g}%+"])
+    return {"labels": labels, "counts": counts, "edges": list(edges)}
+
+@chart('cost-scatter')
+def cost_scatter_chart(store, points, **params):
+    """Food cost against selling price, thinned to at most `points` points
+    
+    Larger menus are bucketed on a square grid over the cost/price plane and
+    each occupied cell is drawn once, at its earliest item, with the number of
+    items it stands for. Outliers keep their own cells, so the shape survives.
+    """
+    food_cost, selling_price = store.column('food_cost'), store.column('selling_price')
+    count = len(store)
+    if count <= points:
+        return {"points": [{"x": food_cost[slot], "y": selling_price[slot], "name": store.names[slot], "count": 1}
+                           for slot in range(count)], "total": count}
+    
+    grid = math.isqrt(points)
+    
+    def grid_cells(column):
+        low, high = min(column), max(column)
+        scale = (grid - 1) / (high - low) if high > low else 0
+        return map(int, map(mul, map(sub, column, repeat(low)), repeat(scale)))
+    
+    cells = list(map(add, map(mul, grid_cells(food_cost), repeat(grid)), grid_cells(selling_price)))
+    # Built back to front, so each cell ends up holding its earliest slot
+    first_slots = dict(zip(reversed(cells), range(count - 1, -1, -1)))
+    cell_counts = Counter(cells)
+    return {"points": [{"x": food_cost[slot], "y": selling_price[slot], "name": store.names[slot],
+                        "count": cell_counts[cells[slot]]}
+                       for slot in sorted(first_slots.values())], "total": count}
+
+SIMULATION_ELASTICITY = -1.5
+SIMULATION_PRICE_RANGE = (-0.3, 0.3)
+SIMULATION_STEPS = 61
+SIMULATION_MAX_STEPS = 201
+SIMULATION_PAGE_SIZE = 50
+
+def parse_price_simulation(data):
+    """(default elasticity, category elasticities, item elasticities, multipliers) from a simulation request"""
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    
+    def elasticity(value, where):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not -10 <= value <= 0:
+            raise ValueError(f"{where} must be a number between -10 and 0")
+        return float(value)
+    
+    default = elasticity(data.get('elasticity', SIMULATION_ELASTICITY), 'elasticity')
+    categories = data.get('categories', {})
+    items = data.get('items', {})
+    if not isinstance(categories, dict) or not isinstance(items, dict):
+        raise ValueError("categories and items must map names or ids to elasticities")
+    categories = {str(name): elasticity(value, f"categories.{name}") for name, value in categories.items()}
+    by_id = {}
+    for item_id, value in items.items():
+        try:
+            key = int(item_id)
+        except ValueError:
+            raise ValueError(f"items: {item_id!r} is not an item id")
+        by_id[key] = elasticity(value, f"items.{item_id}")
+    
+    low, high = data.get('minChange', SIMULATION_PRICE_RANGE[0]), data.get('maxChange', SIMULATION_PRICE_RANGE[1])
+    steps = data.get('steps', SIMULATION_STEPS)
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (low, high)) or not -0.9 <= low <= high <= 3:
+        raise ValueError("minChange and maxChange must satisfy -0.9 <= minChange <= maxChange <= 3")
+    if not isinstance(steps, int) or isinstance(steps, bool) or not 2 <= steps <= SIMULATION_MAX_STEPS:
+        raise ValueError(f"steps must be an integer from 2 to {SIMULATION_MAX_STEPS}")
+    # The current price goes first so that ties keep it
+    grid = [1 + low + (high - low) * step / (steps - 1) for step in range(steps)]
+    multipliers = (1.0,) + tuple(m for m in grid if m != 1.0)
+    return default, categories, by_id, multipliers
+
+@app.route('/api/simulations/pricing', methods=['POST'])
+@app.route('/api/<restaurant>/simulations/pricing', methods=['POST'])
+def price_simulation(restaurant=DEFAULT_RESTAURANT):
+    """What-if pricing: the profit-maximizing price per item under assumed price elasticities
+    
+    The body may set a default `elasticity` (-1.5: a 10% price rise loses about
+    15% of sales), per-category and per-item overrides in `categories` and
+    `items`, and the candidate price range as `minChange`/`maxChange` fractions
+    with `steps` points. Items come back largest profit gain first, paged by
+    `offset` and `limit`.
+    """
+    tenant = current_tenant(restaurant)
+    store = tenant.snapshot()
+    try:
+        default, categories, items, multipliers = parse_price_simulation(request.get_json(silent=True))
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(int(request.args.get('limit', SIMULATION_PAGE_SIZE)), MENU_PAGE_MAX))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    key = (('price-simulation', default, tuple(sorted(categories.items())), tuple(sorted(items.items())),
+            multipliers), store.version)
+    result = tenant.cache.get(key)
+    cache_hit = result is not None
+    if not cache_hit:
+        by_category = [categories.get(category, default) for category in store.categories]
+        elasticities = [by_category[code] for code in store.column('category_codes')]
+        for item_id, elasticity in items.items():
+            try:
+                elasticities[store.slot(item_id)] = elasticity
+            except KeyError:
+                pass
+        best_index, best_profit = store.price_grid(elasticities, multipliers)
+        
+        current_profit = store.column('monthly_profit')
+        deltas = list(map(sub, best_profit, current_profit))
+        order = sorted(range(len(deltas)), key=deltas.__getitem__, reverse=True)
+        projected_sales = [store.monthly_sales[slot] * multipliers[index] ** elasticity
+                           for slot, (index, elasticity) in enumerate(zip(best_index, elasticities))]
+        # Kept as typed arrays: this stays cached for as long as the menu version lasts
+        result = {
+            "order": array('q', order),
+            "best_index": array('i', best_index),
+            "best_profit": array('d', best_profit),
+            "elasticities": array('d', elasticities),
+            "projected_sales": array('d', projected_sales),
+            "totals": {
+                "currentProfit": round(sum(current_profit), 2),
+                "projectedProfit": round(sum(best_profit), 2),
+                "profitDelta": round(sum(deltas), 2),
+                "salesDelta": round(sum(projected_sales) - sum(store.column('monthly_sales')), 1),
+                "repriced": len(best_index) - best_index.count(0)
+            }
+        }
+        tenant.cache.put(key, result)
+    
+    def simulated(slot):
+        price, sales = store.selling_price[slot], store.monthly_sales[slot]
+        multiplier = multipliers[result['best_index'][slot]]
+        projected_sales = result['projected_sales'][slot]
+        return {
+            "id": store.ids[slot],
+            "name": store.names[slot],
+            "category": store.categories[store.category_codes[slot]],
+            "elasticity": result['elasticities'][slot],
+            "currentPrice": price,
+            "recommendedPrice": round(price * multiplier, 2),
+            "priceChangePercent": round((multiplier - 1) * 100, 1),
+            "currentSales": sales,
+            "projectedSales": round(projected_sales, 1),
+            "salesDelta": round(projected_sales - sales, 1),
+            "currentProfit": round(store.monthly_profit[slot], 2),
+            "projectedProfit": round(result['best_profit'][slot], 2),
+            "profitDelta": round(result['best_profit'][slot] - store.monthly_profit[slot], 2)
+        }
+    
+    order = result['order']
+    end = min(offset + limit, len(order))
+    response = jsonify({
+        "items": [simulated(slot) for slot in order[offset:end]],
+        "total": len(order),
+        "nextOffset": end if end < len(order) else None,
+        "totals": result['totals'],
+        "pricePoints": len(multipliers),
+        "version": store.version
+    })
+    response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
 
 def calculate_profit_margin(selling_price, food_cost):
     """Calculate profit margin percentage"""
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Columnar store benchmark
+Compares memory per item and analysis latency of the array-backed MenuStore
+against the old list-of-dicts layout.
+Run with: python benchmarks/bench_columnar.py [sizes...]   (default 100000 1000000)
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('MENU_STORAGE', 'memory')
+
+import app as menu_app
+
+CATEGORIES = ["Appetizers", "Main Courses", "Desserts", "Beverages", "Salads", "Soups"]
+INGREDIENTS = ["salt", "pepper", "olive oil", "lemon", "garlic", "basil", "salmon", "beef", "rice", "tomato"]
+
+
+def synthetic_rows(count, seed=42):
+    """Yield reproducible menu item fields"""
+    rnd = random.Random(seed)
+    for i in range(count):
+        price = round(rnd.uniform(3, 40), 2)
+        yield {
+            "name": f"Item {i}",
+            "category": rnd.choice(CATEGORIES),
+            "sellingPrice": price,
+            "foodCost": round(price * rnd.uniform(0.1, 0.9), 2),
+            "prepTime": rnd.randint(1, 45),
+            "monthlySales": rnd.randint(0, 300),
+            "ingredients": rnd.sample(INGREDIENTS, rnd.randint(1, 4)),
+        }
+
+
+def build_dicts(count):
+    """The pre-columnar layout: one dict per item"""
+    items = []
+    for row in synthetic_rows(count):
+        price, cost, sales = row['sellingPrice'], row['foodCost'], row['monthlySales']
+        items.append({
+            "id": len(items) + 1,
+            **row,
+            "profitMargin": menu_app.calculate_profit_margin(price, cost),
+            "monthlyProfit": menu_app.calculate_monthly_profit(price, cost, sales),
+            "createdAt": datetime.now().isoformat()
+        })
+    return items
+
+
+def build_store(count):
+    store = menu_app.MenuStore()
+    for row in synthetic_rows(count):
+        store.add(row['name'], row['category'], row['sellingPrice'], row['foodCost'],
+                  row['prepTime'], row['monthlySales'], row['ingredients'])
+    return store
+
+
+def legacy_profit(items):
+    sum(item['sellingPrice'] * item['monthlySales'] for item in items)
+    sum(item['monthlyProfit'] for item in items)
+    sum(item['profitMargin'] for item in items) / len(items)
+    sorted(items, key=lambda x: x['monthlyProfit'], reverse=True)[:3]
+    low = [item for item in items if item['profitMargin'] < 30]
+    if low:
+        min(low, key=lambda x: x['profitMargin'])
+    categories = {}
+    for item in items:
+        totals = categories.setdefault(item['category'], {'profit': 0, 'count': 0})
+        totals['profit'] += item['monthlyProfit']
+        totals['count'] += 1
+
+
+def legacy_pricing(items):
+    # Emits the same fields, impact included, as the pricing endpoint does now
+    recommendations = []
+    for item in items:
+        margin, current_price, food_cost, sales = item['profitMargin'], item['sellingPrice'], item['foodCost'], item['monthlySales']
+        if margin < 40:
+            target_price = food_cost / 0.6
+            price_increase = target_price - current_price
+            recommendations.append({
+                "title": f"Price Increase Needed: {item['name']}",
+                "description": f"Current margin is only {margin:.1f}%. Increase price from ${current_price:.2f} to ${target_price:.2f} (+${price_increase:.2f}) to achieve 60% margin. Monitor sales impact.",
+                "type": "warning",
+                "impact": round(price_increase * sales, 2)
+            })
+        elif margin > 80 and sales > 100:
+            suggested_decrease = current_price * 0.05
+            new_price = current_price - suggested_decrease
+            recommendations.append({
+                "title": f"Price Optimization Opportunity: {item['name']}",
+                "description": f"High margin ({margin:.1f}%) with strong sales ({sales} units). Consider reducing price by ${suggested_decrease:.2f} to ${new_price:.2f} to increase volume and competitiveness.",
+                "type": "",
+                "impact": round(suggested_decrease * sales, 2)
+            })
+        elif sales < 50:
+            if margin > 60:
+                price_reduction = current_price * 0.1
+                new_price = current_price - price_reduction
+                recommendations.append({
+                    "title": f"Volume Booster: {item['name']}",
+                    "description": f"Low sales ({sales} units) despite good margin. Reduce price from ${current_price:.2f} to ${new_price:.2f} (-${price_reduction:.2f}) to stimulate demand.",
+                    "type": "",
+                    "impact": round(price_reduction * sales, 2)
+                })
+            else:
+                recommendations.append({
+                    "title": f"Menu Review Required: {item['name']}",
+                    "description": f"Low sales ({sales} units) and poor margin ({margin:.1f}%). Consider removing from menu or complete recipe/pricing overhaul.",
+                    "type": "danger",
+                    "impact": round(current_price * sales, 2)
+                })
+    prices = {}
+    for item in items:
+        prices.setdefault(item['category'], []).append(item['sellingPrice'])
+    for values in prices.values():
+        sum(values) / len(values), max(values), min(values)
+    return recommendations
+
+
+def legacy_trends(items):
+    high = [item for item in items if item['monthlySales'] > 150]
+    [item for item in items if item['monthlySales'] < 30]
+    if high:
+        max(high, key=lambda x: x['monthlySales'])
+    sales = {}
+    for item in items:
+        sales[item['category']] = sales.get(item['category'], 0) + item['monthlySales']
+    quick = [item for item in items if item['prepTime'] <= 10]
+    slow = [item for item in items if item['prepTime'] > 20]
+    sum(item['monthlySales'] for item in quick), sum(item['monthlySales'] for item in slow)
+    for item in items:
+        item['efficiency_score'] = (item['sellingPrice'] - item['foodCost']) / item['prepTime']
+    max(items, key=lambda x: x['efficiency_score'])
+
+
+def legacy_costs(items):
+    sum(item['sellingPrice'] * item['monthlySales'] for item in items)
+    sum(item['foodCost'] * item['monthlySales'] for item in items)
+    high = [item for item in items if (item['foodCost'] / item['sellingPrice']) > 0.4]
+    if high:
+        max(high, key=lambda x: x['foodCost'] / x['sellingPrice'])
+    frequency = {}
+    for item in items:
+        for ingredient in item['ingredients']:
+            ingredient = ingredient.strip().lower()
+            frequency[ingredient] = frequency.get(ingredient, 0) + 1
+    sorted(items, key=lambda x: x['prepTime'], reverse=True)[:3]
+
+
+def measure(build, count):
+    """Return (result, bytes per item, build seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(count)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / count, elapsed
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def run(count):
+    print(f"\n=== {count:,} items ===")
+    items, dict_bytes, dict_build = measure(build_dicts, count)
+    print(f"dict-per-item : {dict_bytes:8.0f} B/item   build {dict_build:6.2f}s")
+    legacy = {
+        'profit': legacy_profit,
+        'pricing': legacy_pricing,
+        'trends': legacy_trends,
+        'costs': legacy_costs,
+    }
+    with menu_app.app.test_request_context():
+        # Both sides pay for building the JSON response
+        legacy_ms = {name: best_of(lambda: menu_app.jsonify({"recommendations": fn(items) or []}))
+                     for name, fn in legacy.items()}
+    del items
+    gc.collect()
+
+    store, store_bytes, store_build = measure(build_store, count)
+    print(f"columnar store: {store_bytes:8.0f} B/item   build {store_build:6.2f}s")
+    endpoints = {
+        'profit': menu_app.profit_analysis,
+        'pricing': menu_app.pricing_optimization,
+        'trends': menu_app.trend_analysis,
+        'costs': menu_app.cost_analysis,
+    }
+    with menu_app.app.test_request_context():
+        for name, endpoint in endpoints.items():
+            # Bypass the analysis cache so every repetition recomputes
+            build = endpoint.__wrapped__
+            columnar_ms = best_of(lambda: menu_app.jsonify({"recommendations": list(build(menu_app.AnalysisContext(store)))}))
+            print(f"  {name:8s} dict scan {legacy_ms[name]:9.1f} ms   columnar endpoint {columnar_ms:9.1f} ms"
+                  f"   {legacy_ms[name] / columnar_ms:6.1f}x")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        run(size)
+    print("\npricing formats one recommendation per flagged item in both layouts; that text and its"
+          "\nJSON encoding dominate, so expect it level with the dict scan rather than faster.")
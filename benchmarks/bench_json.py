@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+JSON serialization benchmark
+Times encoding a response holding every item of a synthetic menu: the plain
+jsonify of item dicts, and the spliced path of cached item fragments, both
+cold (every item encoded) and warm (fragments already cached), with orjson
+when it is installed and with the stdlib encoder. Checks that every path
+produces the same bytes.
+Run with: python benchmarks/bench_json.py [--items 10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('MENU_STORAGE', 'memory')
+
+import app as menu_app
+from bench_columnar import synthetic_rows
+
+
+def best_of(fn, repeat, setup=None):
+    """Fastest of `repeat` timed calls, in ms"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=10_000, help='items in the response')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per path (the best is reported)')
+    args = parser.parse_args()
+
+    store = menu_app.MenuStore()
+    store.add_many([menu_app.parse_menu_item(row) for row in synthetic_rows(args.items)])
+    snapshot = store.snapshot()
+    slots = range(len(snapshot))
+    envelope = {"nextCursor": None, "total": len(snapshot), "version": snapshot.version}
+    provider = menu_app.app.json
+
+    def plain():
+        return provider.response(dict(envelope, items=[snapshot.item(slot) for slot in slots])).get_data()
+
+    def spliced():
+        return provider.response(dict(envelope, items=snapshot.items_json(slots))).get_data()
+
+    def clear_fragments():
+        snapshot.fragments[:] = [None] * len(snapshot.fragments)
+
+    encoders = ['json'] + (['orjson'] if menu_app.orjson is not None else [])
+    with menu_app.app.app_context():
+        expected = plain()
+        baseline = best_of(plain, args.repeat)
+        size = len(expected) / 1024
+        print(f"{args.items:,} items, {size:,.0f} KiB response")
+        print(f"  {'jsonify item dicts':34s} {baseline:9.2f} ms")
+        for name in encoders:
+            menu_app.encode_item = menu_app.item_encoder(name)
+            clear_fragments()
+            assert spliced() == expected, f"{name} fragments differ from jsonify"
+            cold = best_of(spliced, args.repeat, setup=clear_fragments)
+            warm = best_of(spliced, args.repeat)
+            print(f"  {f'fragments ({name}), cold':34s} {cold:9.2f} ms  {baseline / cold:5.1f}x")
+            print(f"  {f'fragments ({name}), cached':34s} {warm:9.2f} ms  {baseline / warm:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite
+Times item adds, every /api/analysis/* endpoint, JSON serialization and the
+dashboard page through Flask's test client on synthetic menus, and records
+p50/p95/p99 latency and peak traced memory per benchmark as JSON.
+Run with: python benchmarks/bench_suite.py [--sizes 100 10000 100000] [--output FILE]
+          python benchmarks/bench_suite.py --compare BASELINE.json [--threshold 0.20]
+Comparing exits with status 1 when any p50 is slower than the baseline by
+more than the threshold, so results from two commits can be checked locally.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('MENU_STORAGE', 'memory')
+
+import app as menu_app
+from bench_columnar import synthetic_rows
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [100, 10_000, 100_000]
+
+# The requests the dashboard makes, in the form it makes them
+ENDPOINTS = {
+    'analysis:profit': '/api/{restaurant}/analysis/profit',
+    'analysis:pricing': '/api/{restaurant}/analysis/pricing?limit=50',
+    'analysis:pricing-all': '/api/{restaurant}/analysis/pricing',
+    'analysis:trends': '/api/{restaurant}/analysis/trends',
+    'analysis:costs': '/api/{restaurant}/analysis/costs',
+    'analysis:all': '/api/{restaurant}/analysis/all',
+    'menu-items:page': '/api/{restaurant}/menu-items?limit=1000',
+}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted sample"""
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+    }
+
+
+def peak_memory(fn):
+    """Peak traced allocation of one call, in KiB; measured apart from the timed runs"""
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def bench(fn, repeat, budget, setup=None):
+    """Time fn until `repeat` runs or `budget` seconds, whichever comes first (at least 5 runs)"""
+    if setup:
+        setup()
+    fn()  # warm-up
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < repeat and (len(timings) < 5 or time.perf_counter() < deadline):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    result = summarize(timings)
+    if setup:
+        setup()
+    result["peak_kb"] = peak_memory(fn)
+    return result
+
+
+def load_menu(restaurant, count):
+    """Fill a fresh in-memory restaurant with `count` synthetic items"""
+    tenant = menu_app.tenants.get(restaurant)
+    store = tenant.open()
+    batch = []
+    for row in synthetic_rows(count):
+        batch.append(menu_app.parse_menu_item(row))
+        if len(batch) == menu_app.BULK_BATCH_SIZE:
+            store.add_many(batch)
+            batch = []
+    if batch:
+        store.add_many(batch)
+    return tenant
+
+
+def checked(response):
+    assert response.status_code == 200, (response.status_code, response.get_data(as_text=True)[:200])
+    return response
+
+
+def run_size(client, count, args):
+    restaurant = f"bench-{count}"
+    gc.collect()
+    started = time.perf_counter()
+    tenant = load_menu(restaurant, count)
+    print(f"\n=== {count:,} items (loaded in {time.perf_counter() - started:.2f}s) ===")
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        print(f"  {name:22s} p50 {result['p50_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms  "
+              f"p99 {result['p99_ms']:10.3f} ms  peak {result['peak_kb']:10.1f} KiB  ({result['runs']} runs)")
+
+    def clear_cache():
+        tenant.cache.invalidate()
+
+    for name, path in ENDPOINTS.items():
+        url = path.format(restaurant=restaurant)
+        # Cold: the analysis cache is emptied before every run, so each one recomputes
+        record(name, bench(lambda: checked(client.get(url)), args.repeat, args.budget, setup=clear_cache))
+    url = f"/api/{restaurant}/simulations/pricing"
+    record('simulation:pricing', bench(lambda: checked(client.post(url, json={"steps": 100})),
+                                       args.repeat, args.budget, setup=clear_cache))
+    url = ENDPOINTS['analysis:all'].format(restaurant=restaurant)
+    record('analysis:all-cached', bench(lambda: checked(client.get(url)), args.repeat, args.budget))
+
+    # Serialization alone, on a result that is already computed
+    with menu_app.app.test_request_context():
+        snapshot = tenant.snapshot()
+        recommendations = list(menu_app.ANALYSIS_SECTIONS['pricing'](menu_app.AnalysisContext(snapshot)))
+        page = [snapshot.item(slot) for slot in range(min(len(snapshot), 1000))]
+        record('json:recommendations', bench(lambda: menu_app.jsonify({"recommendations": recommendations}),
+                                             args.repeat, args.budget))
+        record('json:menu-page', bench(lambda: menu_app.jsonify({"items": page}), args.repeat, args.budget))
+
+    record('index', bench(lambda: checked(client.get(f"/{restaurant}/")), args.repeat, args.budget))
+
+    # Adds last, since every one of them moves the menu to a new version
+    payloads = iter(list(synthetic_rows(args.adds * 2 + 10, seed=count)))
+    url = f"/api/{restaurant}/menu-item"
+    started = time.perf_counter()
+    result = bench(lambda: checked(client.post(url, json=next(payloads))), args.adds, float('inf'))
+    result["items_per_second"] = round(result["runs"] / (time.perf_counter() - started), 1)
+    record('add_menu_item', result)
+
+    with menu_app.tenants._lock:
+        menu_app.tenants._tenants.pop(restaurant, None)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, baseline, threshold, floor_ms):
+    """Print p50 changes against a baseline run and return the regressed benchmarks"""
+    regressions = []
+    print(f"\n=== vs {baseline['meta']['commit']} (threshold +{threshold:.0%}) ===")
+    for size, benchmarks in current['results'].items():
+        for name, result in benchmarks.items():
+            before = baseline['results'].get(size, {}).get(name)
+            if before is None:
+                continue
+            old, new = before['p50_ms'], result['p50_ms']
+            change = (new - old) / old if old else 0.0
+            regressed = new - old > floor_ms and change > threshold
+            if regressed:
+                regressions.append(f"{size}/{name}")
+            print(f"  {size:>8s} {name:22s} {old:10.3f} -> {new:10.3f} ms  {change:+7.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='menu sizes to generate (default: %(default)s; up to 1000000)')
+    parser.add_argument('--repeat', type=int, default=50, help='maximum timed runs per benchmark')
+    parser.add_argument('--budget', type=float, default=5.0, help='seconds to spend per benchmark')
+    parser.add_argument('--adds', type=int, default=200, help='items to add when timing add_menu_item')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='baseline results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='allowed p50 slowdown as a fraction (default: %(default)s)')
+    parser.add_argument('--floor-ms', type=float, default=0.5,
+                        help='ignore slowdowns smaller than this many ms (default: %(default)s)')
+    args = parser.parse_args()
+
+    client = menu_app.app.test_client()
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "budget": args.budget,
+        },
+        "results": {str(size): run_size(client, size, args) for size in args.sizes},
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.floor_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Write-ahead log benchmark
+Measures durable item adds per second through MenuStore on the logged memory
+backend, for several group commit windows and numbers of concurrent writers,
+against the unlogged memory backend.
+Run with: python benchmarks/bench_wal.py [--windows 0 0.001 0.002 0.005] [--writers 1 4 16]
+                                         [--writes 2000] [--dir DIR]
+The log is written under --dir (default: a temporary directory), so point it
+at the disk the app will really use: the best window depends on fsync latency.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('MENU_STORAGE', 'memory')
+
+import app as menu_app
+from bench_columnar import synthetic_rows
+
+
+def run(backend, writers, writes):
+    """Add `writes` items from `writers` threads; returns (seconds, per-write latencies)"""
+    store = menu_app.MenuStore(backend)
+    items = [menu_app.parse_menu_item(row) for row in synthetic_rows(writes)]
+    latencies = []
+    start = threading.Barrier(writers + 1)
+
+    def writer(batch):
+        start.wait()
+        timings = []
+        for fields in batch:
+            started = time.perf_counter()
+            store.add(**fields)
+            timings.append(time.perf_counter() - started)
+        latencies.extend(timings)
+
+    threads = [threading.Thread(target=writer, args=(items[i::writers],)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def report(label, writers, writes, seconds, latencies, syncs=None):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000
+    batching = f"{writes / syncs:8.1f}" if syncs else f"{'-':>8s}"
+    print(f"  {label:>10s} {writers:8d} {writes / seconds:12,.0f} {p50:9.3f} {p99:9.3f} {syncs or '-':>7} {batching}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--windows', type=float, nargs='+', default=[0, 0.0005, 0.001, 0.002, 0.005],
+                        help='commit windows to try, in seconds (default: %(default)s)')
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 4, 16],
+                        help='concurrent writer threads (default: %(default)s)')
+    parser.add_argument('--writes', type=int, default=2000, help='items added per run')
+    parser.add_argument('--dir', help='directory for the log files (default: a temporary directory)')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-wal-', dir=args.dir)
+    print(f"log directory: {root}")
+    print(f"  {'window':>10s} {'writers':>8s} {'writes/s':>12s} {'p50 ms':>9s} {'p99 ms':>9s} {'syncs':>7s} {'per sync':>8s}")
+    try:
+        for writers in args.writers:
+            seconds, latencies = run(menu_app.MemoryMenuBackend(), writers, args.writes)
+            report('no log', writers, args.writes, seconds, latencies)
+            for window in args.windows:
+                path = os.path.join(root, f"{writers}-{window}.wal")
+                backend = menu_app.LoggedMenuBackend(path, window)
+                seconds, latencies = run(backend, writers, args.writes)
+                backend.log.close()
+                report(f"{window * 1000:g} ms", writers, args.writes, seconds, latencies, backend.log.syncs)
+            print()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ['MENU_STORAGE'] = 'memory'
+os.environ.pop('SNAPSHOT_DIR', None)
+os.environ.pop('WAL_DIR', None)
+
+import app as menu_app
+
+
+@pytest.fixture
+def client():
+    """A test client on empty in-memory restaurants"""
+    with menu_app.tenants._lock:
+        menu_app.tenants._tenants.clear()
+    return menu_app.app.test_client()
+
+
+@pytest.fixture
+def item():
+    return {
+        "name": "Grilled Salmon",
+        "category": "Main Courses",
+        "sellingPrice": 24.0,
+        "foodCost": 8.5,
+        "prepTime": 20,
+        "monthlySales": 120,
+        "ingredients": ["salmon", "lemon"]
+    }
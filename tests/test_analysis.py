@@ -0,0 +1,60 @@
+import app as menu_app
+
+
+def test_pricing_ignores_items_added_after_snapshot():
+    store = menu_app.MenuStore()
+    store.add('Lobster', 'Main Courses', 10.0, 8.0, 20, 120, [])
+    snapshot = store.snapshot()
+    store.add('Crab', 'Main Courses', 10.0, 8.0, 20, 120, [])
+    
+    titles = [rec['title'] for rec in menu_app.pricing_optimization.__wrapped__(menu_app.AnalysisContext(snapshot))]
+    assert titles == ["Price Increase Needed: Lobster"]
+
+
+def test_snapshot_keeps_its_rows_when_a_newer_snapshot_is_compacted():
+    store = menu_app.MenuStore()
+    kept = store.add('Lobster', 'Main Courses', 30.0, 12.0, 20, 120, [])['id']
+    gone = store.add('Crab', 'Main Courses', 25.0, 10.0, 20, 80, [])['id']
+    old = store.snapshot()
+    store.delete(gone)
+    store.snapshot()
+    store.update(kept, {'selling_price': 99.0, 'name': 'Lobster Thermidor'})
+    
+    item = old.item(old.slot(kept))
+    assert (item['name'], item['sellingPrice']) == ('Lobster', 30.0)
+    assert old.version + 2 == store.version
+
+
+def test_analysis_is_cached_until_the_menu_changes(client, item):
+    client.post('/api/menu-item', json=dict(item, name='Lobster', sellingPrice=10.0, foodCost=8.0))
+    first = client.get('/api/analysis/pricing')
+    assert first.headers['X-Cache'] == 'MISS'
+    second = client.get('/api/analysis/pricing')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    
+    client.post('/api/menu-item', json=dict(item, name='Crab', sellingPrice=10.0, foodCost=8.0))
+    third = client.get('/api/analysis/pricing')
+    assert third.headers['X-Cache'] == 'MISS'
+    assert third.get_json()['total'] == first.get_json()['total'] + 1
+    
+    stats = client.get('/api/analysis/cache').get_json()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 1)
+
+
+def test_edits_and_deletes_invalidate_the_cache(client, item):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    client.get('/api/analysis/profit')
+    client.patch(f'/api/menu-item/{item_id}', json={"foodCost": 20.0})
+    assert client.get('/api/analysis/profit').headers['X-Cache'] == 'MISS'
+    client.delete(f'/api/menu-item/{item_id}')
+    response = client.get('/api/analysis/profit')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['total'] == 0
+
+
+def test_restaurants_have_separate_caches(client, item):
+    client.post('/api/harbor-grill/menu-item', json=item)
+    client.get('/api/harbor-grill/analysis/costs')
+    assert client.get('/api/analysis/costs').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/harbor-grill/analysis/costs').headers['X-Cache'] == 'HIT'
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import app as menu_app
+
+HEADER = b"name,category,sellingPrice,foodCost,prepTime,monthlySales,ingredients\r\n"
+
+
+def csv_rows(count):
+    return b"".join(b"Item %d,Soups,9.5,3.0,10,40,salt;pepper\r\n" % i for i in range(count))
+
+
+def import_body(client, body, content_type='text/csv'):
+    return client.post('/api/menu-items/bulk', data=body, content_type=content_type)
+
+
+def test_csv_import_reports_rejected_rows(client):
+    body = HEADER + csv_rows(3) + b"Broken,Soups,abc,3.0,10,40,\r\n" + csv_rows(1)
+    response = import_body(client, body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['inserted'], result['failed']) == (4, 1)
+    assert result['errors'][0]['row'] == 5
+    items = client.get('/api/menu-items').get_json()['items']
+    assert items[0]['ingredients'] == ['salt', 'pepper']
+
+
+def test_ndjson_import(client, item):
+    lines = [json.dumps(dict(item, name=f"Item {i}")) for i in range(3)] + ['', '{not json']
+    response = import_body(client, '\n'.join(lines).encode(), 'application/x-ndjson')
+    result = response.get_json()
+    assert (result['inserted'], result['failed']) == (3, 1)
+    assert result['errors'][0]['row'] == 5
+
+
+def test_invalid_utf8_is_400_with_position(client, monkeypatch):
+    monkeypatch.setattr(menu_app, 'BULK_BATCH_SIZE', 2)
+    body = HEADER + csv_rows(3) + b"Caf\xe9,Soups,9.5,3.0,10,40,\r\n"
+    response = import_body(client, body)
+    assert response.status_code == 400
+    result = response.get_json()
+    assert result['row'] == 5
+    bad_byte = body.index(b"\xe9")
+    assert f"byte {bad_byte}" in result['error']
+    # The first full batch was committed before the bad row; the rest was not
+    assert result['inserted'] == 2
+    assert client.get('/api/menu-items').get_json()['total'] == 2
+
+
+def test_malformed_csv_is_400(client):
+    body = HEADER + csv_rows(1) + b"x" * 200_000 + b"\r\n"
+    response = import_body(client, body)
+    assert response.status_code == 400
+    result = response.get_json()
+    assert (result['row'], result['inserted']) == (3, 0)
+    assert 'Malformed CSV' in result['error']
+
+
+@pytest.mark.parametrize('newline', [b'\n', b'\r', b'\r\n'])
+def test_csv_line_endings(client, newline):
+    body = HEADER.replace(b'\r\n', newline) + csv_rows(2).replace(b'\r\n', newline)
+    assert import_body(client, body).get_json()['inserted'] == 2
+
+
+@pytest.mark.parametrize('read_size', [1, 3, 7])
+def test_lines_split_across_reads(client, monkeypatch, read_size):
+    monkeypatch.setattr(menu_app, 'BULK_READ_SIZE', read_size)
+    body = HEADER + "Café Crème,Desserts,6.0,1.5,5,30,\r\n".encode() + csv_rows(1)
+    assert import_body(client, body).get_json()['inserted'] == 2
+    names = [item['name'] for item in client.get('/api/menu-items').get_json()['items']]
+    assert names == ['Café Crème', 'Item 0']
+
+
+def test_unsupported_body_is_415(client, item):
+    response = client.post('/api/menu-items/bulk', json=[item])
+    assert response.status_code == 415
+
+
+def test_batches_match_single_adds(client, item, monkeypatch):
+    monkeypatch.setattr(menu_app, 'BULK_BATCH_SIZE', 4)
+    monkeypatch.setattr(menu_app, 'BULK_MAX_ERRORS', 2)
+    lines = [json.dumps(dict(item, name=f"Item {i}", monthlySales=i * 10)) for i in range(10)] + ['{}'] * 3
+    result = import_body(client, '\n'.join(lines).encode(), 'application/x-ndjson').get_json()
+    assert (result['inserted'], result['failed'], len(result['errors'])) == (10, 3, 2)
+    assert result['errorsTruncated'] is True
+    bulk = client.get('/api/menu-items').get_json()
+    
+    for i in range(10):
+        client.post('/api/single/menu-item', json=dict(item, name=f"Item {i}", monthlySales=i * 10))
+    single = client.get('/api/single/menu-items').get_json()
+    assert bulk['stats'] == single['stats']
+    assert [menu_item['name'] for menu_item in bulk['items']] == [menu_item['name'] for menu_item in single['items']]
@@ -0,0 +1,62 @@
+import os
+import re
+import warnings
+
+import pytest
+
+import app as menu_app
+
+
+def test_app_compiles_without_warnings():
+    with open(menu_app.__file__, encoding='utf-8') as f:
+        source = f.read()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        compile(source, menu_app.__file__, 'exec')
+
+
+def test_dashboard_script_keeps_escaped_slashes():
+    assert r"location.pathname.match(/^\/([^\/]+)\/?$/)" in menu_app.DASHBOARD_JS
+
+
+def fake_packages(url):
+    if url == menu_app.CHART_JS_PACKAGE:
+        yield 'dist/chart.umd.js', b'window.Chart = {};'
+        yield 'package.json', b'{}'
+    else:
+        yield 'css/all.min.css', b'.fa{src:url(../webfonts/fa-solid-900.woff2)}'
+        yield 'webfonts/fa-solid-900.woff2', b'font'
+        yield 'js/all.js', b''
+
+
+def test_missing_assets_fail_without_cdn_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_app, 'VENDOR_DIR', str(tmp_path))
+    monkeypatch.setattr(menu_app, 'DASHBOARD_CDN_FALLBACK', False)
+    with pytest.raises(FileNotFoundError):
+        menu_app.build_dashboard()
+    
+    monkeypatch.setattr(menu_app, 'DASHBOARD_CDN_FALLBACK', True)
+    html = menu_app.build_dashboard().variants['identity'].decode()
+    assert menu_app.CHART_JS_CDN in html and menu_app.FONT_AWESOME_CDN in html
+
+
+def test_installed_assets_are_self_hosted(tmp_path, monkeypatch, client):
+    monkeypatch.setattr(menu_app, 'VENDOR_DIR', str(tmp_path))
+    monkeypatch.setattr(menu_app, 'DASHBOARD_CDN_FALLBACK', False)
+    written = menu_app.install_vendor_assets(fake_packages)
+    assert sorted(os.path.relpath(path, tmp_path) for path in written) == [
+        'chart.umd.min.js', 'fontawesome/css/all.min.css', 'fontawesome/webfonts/fa-solid-900.woff2']
+    
+    html = menu_app.build_dashboard().variants['identity'].decode()
+    assert 'cdn' not in html
+    css_url = re.search(r'href="(/assets/all\.min\.[^"]+)"', html).group(1)
+    font_url = re.search(r'url\((/assets/[^)]+)\)', client.get(css_url).get_data(as_text=True)).group(1)
+    assert client.get(font_url).data == b'font'
+
+
+def test_dashboard_without_assets_is_503(client, monkeypatch):
+    monkeypatch.setattr(menu_app, 'dashboard_page', None)
+    monkeypatch.setattr(menu_app, 'dashboard_error', 'Missing dashboard asset chart.umd.min.js')
+    response = client.get('/harbor-grill/')
+    assert response.status_code == 503
+    assert 'chart.umd.min.js' in response.get_data(as_text=True)
@@ -0,0 +1,15 @@
+def catalog(client):
+    return {entry['name']: entry for entry in client.get('/api/ingredients/catalog').get_json()['ingredients']}
+
+
+def test_price_update_keeps_unit(client):
+    client.post('/api/ingredients/catalog', json={"name": "salmon", "unitCost": 30.0, "unit": "kg"})
+    response = client.post('/api/ingredients/catalog', json={"name": "salmon", "unitCost": 32.5})
+    assert response.status_code == 200
+    salmon = catalog(client)['salmon']
+    assert (salmon['unit'], salmon['unitCost']) == ('kg', 32.5)
+
+
+def test_new_ingredient_gets_default_unit(client):
+    client.post('/api/ingredients/catalog', json={"ingredients": [{"name": "lemon", "unitCost": 0.4}]})
+    assert catalog(client)['lemon']['unit'] == 'unit'
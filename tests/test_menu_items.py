@@ -0,0 +1,127 @@
+import pytest
+
+import app as menu_app
+
+
+@pytest.mark.parametrize('restaurant', ['bad!', 'api'])
+def test_add_to_invalid_restaurant_is_404(client, item, restaurant):
+    response = client.post(f'/api/{restaurant}/menu-item', json=item)
+    assert response.status_code == 404
+    assert 'error' in response.get_json()
+
+
+def test_add_menu_item(client, item):
+    response = client.post('/api/harbor-grill/menu-item', json=item)
+    assert response.status_code == 200
+    assert response.get_json()['menuItem']['name'] == 'Grilled Salmon'
+
+
+@pytest.mark.parametrize('field', ['sellingPrice', 'foodCost', 'prepTime', 'monthlySales'])
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', float('nan'), float('inf')])
+def test_non_finite_numbers_are_rejected(client, item, field, value):
+    response = client.post('/api/menu-item', json=dict(item, **{field: value}))
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert client.get('/api/menu-items').get_json()['total'] == 0
+
+
+def test_non_finite_change_is_rejected(client, item):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    response = client.patch(f'/api/menu-item/{item_id}', json={"sellingPrice": "inf"})
+    assert response.status_code == 400
+    assert client.get('/api/menu-items').get_json()['items'][0]['sellingPrice'] == 24.0
+
+
+def test_menu_page_carries_whole_menu_stats(client, item):
+    for sales in (10, 50, 30):
+        client.post('/api/menu-item', json=dict(item, monthlySales=sales, name=f"Item {sales}"))
+    page = client.get('/api/menu-items?limit=1').get_json()
+    assert len(page['items']) == 1 and page['nextCursor'] is not None
+    assert page['stats']['itemCount'] == 3
+    assert page['stats']['bestseller'] == 'Item 50'
+
+
+def test_pages_follow_the_cursor(client, item):
+    for n in range(5):
+        client.post('/api/menu-item', json=dict(item, name=f"Item {n}"))
+    names, cursor = [], 0
+    while cursor is not None:
+        page = client.get(f'/api/menu-items?limit=2&cursor={cursor}').get_json()
+        assert page['total'] == 5
+        names += [menu_item['name'] for menu_item in page['items']]
+        cursor = page['nextCursor']
+    assert names == [f"Item {n}" for n in range(5)]
+
+
+def test_cursor_returns_only_newer_items(client, item):
+    first = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    client.post('/api/menu-item', json=dict(item, name='Fish Tacos'))
+    page = client.get(f'/api/menu-items?cursor={first}').get_json()
+    assert [menu_item['name'] for menu_item in page['items']] == ['Fish Tacos']
+    assert page['nextCursor'] is None
+
+
+def test_fields_limit_each_item(client, item):
+    client.post('/api/menu-item', json=item)
+    page = client.get('/api/menu-items?fields=name,profitMargin').get_json()
+    assert page['items'] == [{"name": "Grilled Salmon", "profitMargin": pytest.approx(64.58, abs=0.01)}]
+    
+    response = client.get('/api/menu-items?fields=name,secret')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('query', ['cursor=abc', 'limit=ten'])
+def test_bad_page_parameters_are_400(client, query):
+    assert client.get(f'/api/menu-items?{query}').status_code == 400
+
+
+def test_unchanged_menu_revalidates_with_304(client, item):
+    client.post('/api/menu-item', json=item)
+    response = client.get('/api/menu-items')
+    etag = response.headers['ETag']
+    assert etag == f'"menu-{response.get_json()["version"]}"'
+    
+    cached = client.get('/api/menu-items', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.data == b''
+    
+    client.post('/api/menu-item', json=dict(item, name='Fish Tacos'))
+    fresh = client.get('/api/menu-items', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+    assert fresh.get_json()['total'] == 2
+
+
+def test_patch_recomputes_profit_fields(client, item):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    response = client.patch(f'/api/menu-item/{item_id}', json={"sellingPrice": 34.0, "monthlySales": 100})
+    menu_item = response.get_json()['menuItem']
+    assert (menu_item['name'], menu_item['profitMargin'], menu_item['monthlyProfit']) == ('Grilled Salmon', 75.0, 2550.0)
+    assert client.get('/api/menu-items').get_json()['stats']['totalRevenue'] == 3400.0
+
+
+def test_deleted_item_leaves_the_menu(client, item):
+    kept = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    gone = client.post('/api/menu-item', json=dict(item, name='Fish Tacos')).get_json()['menuItem']['id']
+    response = client.delete(f'/api/menu-item/{gone}')
+    assert response.get_json()['deleted'] == gone
+    
+    page = client.get('/api/menu-items').get_json()
+    assert [menu_item['id'] for menu_item in page['items']] == [kept]
+    assert page['stats']['itemCount'] == 1
+    assert client.get('/api/ingredients/lemon/items').get_json()['uses'] == 1
+    assert client.delete(f'/api/menu-item/{gone}').status_code == 404
+    assert client.patch(f'/api/menu-item/{gone}', json={"sellingPrice": 30.0}).status_code == 404
+    
+    # Ids are never reused
+    assert client.post('/api/menu-item', json=item).get_json()['menuItem']['id'] == gone + 1
+
+
+def test_compaction_keeps_ids_and_pages(client, item):
+    ids = [client.post('/api/menu-item', json=dict(item, name=f"Item {n}")).get_json()['menuItem']['id']
+           for n in range(4)]
+    client.delete(f'/api/menu-item/{ids[1]}')
+    store = menu_app.tenants.get(menu_app.DEFAULT_RESTAURANT).open()
+    before = client.get('/api/menu-items').get_json()['items']
+    store.compact()
+    assert client.get('/api/menu-items').get_json()['items'] == before
+    assert client.get(f'/api/menu-items?cursor={ids[0]}&limit=1').get_json()['items'][0]['id'] == ids[2]
@@ -0,0 +1,16 @@
+import app as menu_app
+
+
+def test_streamed_export_is_profiled(client, item, monkeypatch):
+    monkeypatch.setattr(menu_app, 'PROFILE_TOKEN', 'secret')
+    headers = {'X-Profile-Token': 'secret'}
+    client.post('/api/menu-item', json=dict(item, monthlySales=10))
+    response = client.get('/api/analysis/pricing?format=ndjson', headers=headers)
+    assert response.get_data(as_text=True).count('\n') == 1
+    response.close()
+    
+    profile = client.get('/api/profiles', headers=headers).get_json()['profiles'][0]
+    assert profile['path'] == '/api/analysis/pricing?format=ndjson'
+    report = client.get(f"/api/profiles/{profile['id']}", headers=headers).get_data(as_text=True)
+    assert 'pricing_optimization' in report
+    assert not menu_app.profiles.active.locked()
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+import app as menu_app
+
+
+def true_rank(values, value):
+    return sum(1 for v in values if v < value)
+
+
+def test_small_sketch_is_exact():
+    sketch = menu_app.QuantileSketch()
+    values = list(range(100))
+    random.Random(1).shuffle(values)
+    for value in values:
+        sketch.update(value)
+    assert len(sketch) == 100
+    assert [sketch.rank(value) for value in (0, 25, 50, 99)] == [0, 25, 50, 99]
+    assert (sketch.quantile(0.5), sketch.quantile(1.0)) == (49, 99)
+
+
+def test_large_sketch_ranks_within_one_percent():
+    generator = random.Random(2)
+    values = [generator.gauss(0, 1) for _ in range(50000)]
+    sketch = menu_app.QuantileSketch()
+    for value in values:
+        sketch.update(value)
+    assert sketch.size < 1000
+    ordered = sorted(values)
+    for fraction in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        probe = ordered[int(fraction * len(values))]
+        assert abs(sketch.rank(probe) - true_rank(ordered, probe)) <= 0.01 * len(values)
+
+
+def test_removed_values_leave_the_ranks():
+    sketch = menu_app.QuantileSketch()
+    for value in range(5000):
+        sketch.update(value)
+    for value in range(0, 5000, 2):
+        sketch.remove(value)
+    assert len(sketch) == 2500
+    assert sketch.rank(2500) == pytest.approx(1250, abs=50)
+    assert sketch.quantile(0.5) == pytest.approx(2500, abs=100)
+
+
+def test_merged_sketches_match_one_sketch():
+    low, high = menu_app.QuantileSketch(seed=1), menu_app.QuantileSketch(seed=2)
+    for value in range(3000):
+        low.update(value)
+        high.update(value + 3000)
+    low.merge(high)
+    assert len(low) == 6000
+    assert low.rank(3000) == pytest.approx(3000, abs=60)
+    assert low.quantile(0.9) == pytest.approx(5400, abs=60)
+
+
+def test_store_sketches_follow_edits_and_deletes():
+    store = menu_app.MenuStore()
+    ids = [store.add(f"Item {n}", 'Mains', 100.0, 50.0 - n, 10, 10 * n, [])['id'] for n in range(20)]
+    store.update(ids[0], {'food_cost': 1.0})
+    store.delete(ids[1])
+    sketch = store.snapshot().sketches['profitMargin']
+    margins = sorted(store.snapshot().column('profit_margin'))
+    assert len(sketch) == 19
+    assert [sketch.rank(margin) for margin in margins] == list(range(19))
+
+
+def add_margins(client, item, margins):
+    for margin in margins:
+        client.post('/api/menu-item', json=dict(item, name=f"Margin {margin}", sellingPrice=100.0,
+                                                foodCost=100.0 - margin, monthlySales=80))
+
+
+def test_relative_thresholds_flag_the_menus_own_outliers(client, item):
+    add_margins(client, item, range(50, 100, 5))
+    
+    def flagged(mode):
+        response = client.get(f'/api/analysis/pricing?thresholds={mode}').get_json()
+        return [rec['title'] for rec in response['recommendations'] if rec['title'].startswith('Price Increase')]
+    
+    assert flagged('fixed') == []
+    assert flagged('relative') == ["Price Increase Needed: Margin 50"]
+
+
+def test_threshold_modes_are_cached_apart(client, item):
+    add_margins(client, item, (20, 60, 90))
+    assert client.get('/api/analysis/profit').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/analysis/profit?thresholds=relative').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/analysis/profit?thresholds=fixed').headers['X-Cache'] == 'HIT'
+
+
+def test_unknown_threshold_mode_is_400(client):
+    assert client.get('/api/analysis/pricing?thresholds=median').status_code == 400
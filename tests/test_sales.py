@@ -0,0 +1,39 @@
+import pytest
+
+import app as menu_app
+
+
+def test_sales_for_unknown_item_are_rejected(client, item):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    response = client.post('/api/sales', json={"sales": [{"itemId": item_id, "quantity": 2},
+                                                         {"itemId": item_id + 1, "quantity": 1}]})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f"Record 2: unknown item {item_id + 1}"
+
+
+def test_sales_for_deleted_item_are_not_stored():
+    store = menu_app.MenuStore()
+    item_id = store.add('Soup', 'Soups', 8.0, 2.0, 10, 40, [])['id']
+    version = store.delete(item_id)
+    with pytest.raises(KeyError):
+        store.record_sales([(item_id, 738000, 3)])
+    assert store.version == version
+
+
+@pytest.mark.parametrize('sale_date', ['0001-01-02', '2000-01-01'])
+def test_sales_dated_too_long_ago_are_rejected(client, item, sale_date):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    response = client.post('/api/sales', json={"itemId": item_id, "quantity": 1, "date": sale_date})
+    assert response.status_code == 400
+    assert 'years ago' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('bucket', ['day', 'week', 'month'])
+def test_sales_history_starts_no_earlier_than_year_one(client, item, bucket):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    menu_app.tenants.get(menu_app.DEFAULT_RESTAURANT).open().record_sales([(item_id, 3, 5)])
+    response = client.get(f'/api/sales/{item_id}?bucket={bucket}')
+    assert response.status_code == 200
+    series = response.get_json()['series']
+    assert series[0]['start'] == '0001-01-01'
+    assert sum(period['units'] for period in series) == 5
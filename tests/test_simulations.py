@@ -0,0 +1,88 @@
+import pytest
+
+
+MENU = [
+    ("Grilled Salmon", "Main Courses", 24.0, 8.5, 120),
+    ("Fish Tacos", "Main Courses", 14.0, 9.0, 300),
+    ("Tomato Soup", "Soups", 8.0, 2.0, 40),
+    ("Cheesecake", "Desserts", 9.0, 6.5, 80)
+]
+
+
+@pytest.fixture
+def menu(client, item):
+    ids = {}
+    for name, category, price, cost, sales in MENU:
+        created = client.post('/api/menu-item', json=dict(item, name=name, category=category, sellingPrice=price,
+                                                          foodCost=cost, monthlySales=sales))
+        ids[name] = created.get_json()['menuItem']['id']
+    return ids
+
+
+def best_multiplier(price, cost, sales, elasticity, multipliers):
+    profits = [(m * price - cost) * sales * m ** elasticity for m in multipliers]
+    return multipliers[profits.index(max(profits))], max(profits)
+
+
+def test_simulation_finds_the_best_grid_price(client, menu):
+    body = {"elasticity": -2.0, "minChange": -0.3, "maxChange": 0.3, "steps": 7}
+    result = client.post('/api/simulations/pricing', json=body).get_json()
+    assert result['total'] == len(MENU) and result['pricePoints'] == 7
+    
+    multipliers = [1.0, 0.7, 0.8, 0.9, 1.1, 1.2, 1.3]
+    by_name = {simulated['name']: simulated for simulated in result['items']}
+    for name, category, price, cost, sales in MENU:
+        multiplier, profit = best_multiplier(price, cost, sales, -2.0, multipliers)
+        assert by_name[name]['recommendedPrice'] == round(price * multiplier, 2)
+        assert by_name[name]['projectedProfit'] == pytest.approx(profit, abs=0.01)
+    
+    deltas = [simulated['profitDelta'] for simulated in result['items']]
+    assert deltas == sorted(deltas, reverse=True)
+    assert result['totals']['profitDelta'] == pytest.approx(sum(deltas), abs=0.05)
+
+
+def test_inelastic_items_take_the_highest_price(client, menu):
+    body = {"elasticity": -3.0, "categories": {"Soups": 0}, "items": {str(menu['Cheesecake']): -0.5}}
+    result = client.post('/api/simulations/pricing', json=body).get_json()
+    by_name = {simulated['name']: simulated for simulated in result['items']}
+    assert by_name['Tomato Soup']['elasticity'] == 0
+    assert by_name['Tomato Soup']['priceChangePercent'] == 30.0
+    assert by_name['Tomato Soup']['salesDelta'] == 0
+    assert by_name['Cheesecake']['elasticity'] == -0.5
+    assert by_name['Grilled Salmon']['elasticity'] == -3.0
+
+
+def test_current_price_wins_ties(client, menu):
+    # An item that does not sell earns nothing at any price
+    client.post('/api/menu-item', json={"name": "Water", "category": "Drinks", "sellingPrice": 2.0, "foodCost": 0.5,
+                                        "prepTime": 1, "monthlySales": 0, "ingredients": []})
+    result = client.post('/api/simulations/pricing', json={}).get_json()
+    water = next(simulated for simulated in result['items'] if simulated['name'] == 'Water')
+    assert (water['recommendedPrice'], water['priceChangePercent']) == (2.0, 0.0)
+
+
+def test_simulation_pages_and_caches(client, menu):
+    first = client.post('/api/simulations/pricing?limit=3', json={})
+    assert first.headers['X-Cache'] == 'MISS'
+    page = first.get_json()
+    assert len(page['items']) == 3 and page['nextOffset'] == 3
+    
+    rest = client.post('/api/simulations/pricing?offset=3', json={})
+    assert rest.headers['X-Cache'] == 'HIT'
+    assert len(rest.get_json()['items']) == 1 and rest.get_json()['nextOffset'] is None
+    assert client.post('/api/simulations/pricing', json={"elasticity": -1.0}).headers['X-Cache'] == 'MISS'
+
+
+@pytest.mark.parametrize('body', [
+    {"elasticity": 0.5},
+    {"elasticity": "steep"},
+    {"categories": ["Soups"]},
+    {"items": {"soup": -1.0}},
+    {"minChange": 0.5, "maxChange": 0.1},
+    {"steps": 1},
+    [1, 2]
+])
+def test_bad_simulation_request_is_400(client, menu, body):
+    response = client.post('/api/simulations/pricing', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,84 @@
+import app as menu_app
+
+
+def fill(store):
+    salmon = store.add('Grilled Salmon', 'Main Courses', 24.0, 8.5, 20, 120, ['salmon', 'lemon'])['id']
+    soup = store.add('Soup', 'Soups', 8.0, 2.0, 10, 40, ['tomato'])['id']
+    store.add('Crab', 'Main Courses', 25.0, 10.0, 20, 80, ['crab', 'lemon'])
+    store.record_sales([(salmon, 100, 5), (soup, 101, 3)])
+    store.set_ingredient_costs({'tomato': ('kg', 2.0)})
+    store.set_recipe(soup, {'tomato': 0.5})
+    store.delete(store.ids[-1])
+    return salmon, soup
+
+
+def assert_same_menu(restored, store):
+    assert restored.version == store.version
+    assert restored.snapshot().items() == store.snapshot().items()
+    assert restored.aggregates.state() == store.aggregates.state()
+    assert restored.ingredient_index.usage() == store.ingredient_index.usage()
+    assert restored.recipes.recipes == store.recipes.recipes
+    for field, sketch in store.sketches.items():
+        assert restored.sketches[field].cdf() == sketch.cdf()
+
+
+def test_memory_store_restores_from_its_snapshot(tmp_path):
+    path = str(tmp_path / 'menu.menusnap')
+    store = menu_app.MenuStore()
+    salmon, soup = fill(store)
+    version, count, size = store.dump(path)
+    assert (version, count) == (store.version, 2) and size > 0
+    
+    restored = menu_app.MenuStore(menu_app.MemoryMenuBackend(), path)
+    assert isinstance(restored.selling_price, memoryview)
+    assert_same_menu(restored, store)
+    assert restored.sales.window_units(salmon, 7) == store.sales.window_units(salmon, 7)
+    
+    # The first write swaps the mapped columns for arrays; ids carry on past the deleted one
+    added = restored.add('Fish Tacos', 'Main Courses', 14.0, 9.0, 15, 300, ['cod'])
+    assert added['id'] == store.add('Fish Tacos', 'Main Courses', 14.0, 9.0, 15, 300, ['cod'])['id']
+    restored.update(soup, {'name': 'Tomato Soup'})
+    store.update(soup, {'name': 'Tomato Soup'})
+    assert not isinstance(restored.selling_price, memoryview)
+    assert [item['name'] for item in restored.snapshot().items()] == ['Grilled Salmon', 'Tomato Soup', 'Fish Tacos']
+    assert restored.aggregates.state() == store.aggregates.state()
+
+
+def test_sqlite_store_resumes_and_syncs_newer_rows(tmp_path):
+    path, db = str(tmp_path / 'menu.menusnap'), str(tmp_path / 'menu.db')
+    store = menu_app.MenuStore(menu_app.SQLiteMenuBackend(db))
+    fill(store)
+    store.dump(path)
+    store.add('Fish Tacos', 'Main Courses', 14.0, 9.0, 15, 300, ['cod'])
+    store.delete(store.ids[0])
+    
+    restored = menu_app.MenuStore(menu_app.SQLiteMenuBackend(db), path)
+    assert_same_menu(restored, store)
+
+
+def test_snapshot_of_another_database_is_ignored(tmp_path):
+    path = str(tmp_path / 'menu.menusnap')
+    other = menu_app.MenuStore(menu_app.SQLiteMenuBackend(str(tmp_path / 'other.db')))
+    fill(other)
+    other.dump(path)
+    
+    store = menu_app.MenuStore(menu_app.SQLiteMenuBackend(str(tmp_path / 'menu.db')), path)
+    assert len(store) == 0 and store.version == 0
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / 'menu.menusnap'
+    path.write_bytes(b'not a snapshot')
+    store = menu_app.MenuStore(menu_app.MemoryMenuBackend(), str(path))
+    assert len(store) == 0
+
+
+def test_snapshot_endpoint(client, item, tmp_path, monkeypatch):
+    assert client.post('/api/snapshot').status_code == 404
+    
+    monkeypatch.setattr(menu_app, 'SNAPSHOT_DIR', str(tmp_path))
+    client.post('/api/menu-item', json=item)
+    first = client.post('/api/snapshot').get_json()
+    assert (first['written'], first['items']) == (True, 1)
+    assert (tmp_path / f'{menu_app.DEFAULT_RESTAURANT}.menusnap').exists()
+    assert client.post('/api/snapshot').get_json()['written'] is False
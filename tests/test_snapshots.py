@@ -0,0 +1,61 @@
+import app as menu_app
+
+
+def make_store():
+    store = menu_app.MenuStore()
+    store.add('Lobster', 'Main Courses', 30.0, 12.0, 20, 120, ['lobster', 'butter'])
+    store.add('Soup', 'Soups', 8.0, 2.0, 10, 40, ['tomato'])
+    return store
+
+
+def test_snapshot_is_reused_until_the_next_write():
+    store = make_store()
+    assert store.snapshot() is store.snapshot()
+    old = store.snapshot()
+    store.add('Crab', 'Main Courses', 25.0, 10.0, 20, 80, [])
+    assert store.snapshot() is not old
+    assert store.snapshot().version == old.version + 1
+
+
+def test_snapshot_does_not_see_later_writes():
+    store = make_store()
+    lobster, soup = store.ids
+    old = store.snapshot()
+    items = old.items()
+    stats = menu_app.menu_stats(old)
+    
+    store.add('Crab', 'Main Courses', 25.0, 10.0, 20, 500, ['crab', 'butter'])
+    store.update(lobster, {'selling_price': 45.0})
+    store.delete(soup)
+    store.record_sales([(lobster, 100, 7)])
+    
+    assert old.items() == items
+    assert menu_app.menu_stats(old) == stats
+    assert old.ingredient_index.uses('butter') == 1
+    assert old.sales.window_units(lobster, 7) == 0
+    assert [old.names[old.slot(item_id)] for item_id in old.ranking('monthlySales').top(3)] == ['Lobster', 'Soup']
+
+
+def test_snapshot_rankings_stay_at_their_version():
+    store = make_store()
+    lobster, soup = store.ids
+    old = store.snapshot()
+    old.ranking('profitMargin')
+    store.update(soup, {'food_cost': 7.5})
+    store.add('Crab', 'Main Courses', 25.0, 1.0, 20, 80, [])
+    
+    assert [old.names[old.slot(item_id)] for item_id in old.ranking('profitMargin').top(3)] == ['Soup', 'Lobster']
+    new = store.snapshot()
+    assert [new.names[new.slot(item_id)] for item_id in new.ranking('profitMargin').top(3)] == ['Crab', 'Lobster', 'Soup']
+
+
+def test_snapshot_survives_compaction():
+    store = make_store()
+    lobster, soup = store.ids
+    old = store.snapshot()
+    store.delete(lobster)
+    store.compact()
+    store.update(soup, {'name': 'Tomato Soup'})
+    
+    assert [item['name'] for item in old.items()] == ['Lobster', 'Soup']
+    assert [item['name'] for item in store.snapshot().items()] == ['Tomato Soup']
@@ -0,0 +1,107 @@
+import pytest
+
+import app as menu_app
+
+
+def open_worker(path):
+    return menu_app.MenuStore(menu_app.SQLiteMenuBackend(str(path)))
+
+
+def test_update_keeps_another_workers_edit(tmp_path):
+    path = tmp_path / 'menu.db'
+    first, second = open_worker(path), open_worker(path)
+    item_id = first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, [])['id']
+    second.sync()
+    
+    first.update(item_id, {'name': 'Tomato Soup'})
+    item = second.update(item_id, {'selling_price': 9.5})
+    assert (item['name'], item['sellingPrice']) == ('Tomato Soup', 9.5)
+    first.sync()
+    assert first.item(first.slot(item_id)) == item
+
+
+def test_reprice_keeps_another_workers_edit(tmp_path):
+    path = tmp_path / 'menu.db'
+    first, second = open_worker(path), open_worker(path)
+    first.set_ingredient_costs({'tomato': ('kg', 2.0)})
+    item_id = first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, [])['id']
+    first.set_recipe(item_id, {'tomato': 0.5})
+    second.sync()
+    
+    first.update(item_id, {'name': 'Tomato Soup'})
+    version, repriced = second.set_ingredient_costs({'tomato': (None, 4.0)})
+    assert repriced == [item_id]
+    item = open_worker(path).snapshot().item(0)
+    assert (item['name'], item['foodCost']) == ('Tomato Soup', 2.0)
+
+
+def test_update_of_item_deleted_by_another_worker_fails(tmp_path):
+    path = tmp_path / 'menu.db'
+    first, second = open_worker(path), open_worker(path)
+    item_id = first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, [])['id']
+    second.sync()
+    first.delete(item_id)
+    with pytest.raises(KeyError):
+        second.update(item_id, {'name': 'Tomato Soup'})
+
+
+def test_other_worker_sees_new_items_after_sync(tmp_path):
+    path = tmp_path / 'menu.db'
+    first, second = open_worker(path), open_worker(path)
+    first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, ['tomato'])
+    first.add('Steak', 'Main Courses', 30.0, 12.0, 25, 60, ['beef'])
+    assert len(second) == 0
+    
+    second.sync()
+    assert second.version == first.version
+    assert second.items() == first.items()
+    assert menu_app.menu_stats(second) == menu_app.menu_stats(first)
+    assert second.ingredient_index.uses('beef') == 1
+
+
+def test_other_worker_sees_sales_and_recipes(tmp_path):
+    path = tmp_path / 'menu.db'
+    first, second = open_worker(path), open_worker(path)
+    item_id = first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, [])['id']
+    second.sync()
+    
+    first.record_sales([(item_id, 100, 5), (item_id, 101, 3)])
+    first.set_ingredient_costs({'tomato': ('kg', 2.0)})
+    first.set_recipe(item_id, {'tomato': 0.5})
+    second.sync()
+    assert second.sales.window_units(item_id, 7) == first.sales.window_units(item_id, 7)
+    assert second.recipes.recipes[item_id] == {'tomato': 0.5}
+    assert second.item(second.slot(item_id))['foodCost'] == 1.0
+
+
+def test_restart_loads_totals_from_the_database(tmp_path):
+    path = tmp_path / 'menu.db'
+    first = open_worker(path)
+    first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, [])
+    item_id = first.add('Steak', 'Main Courses', 30.0, 12.0, 25, 60, [])['id']
+    first.update(item_id, {'selling_price': 32.0})
+    
+    restarted = open_worker(path)
+    assert restarted.version == first.version
+    assert restarted.items() == first.items()
+    assert restarted.aggregates.state() == first.aggregates.state()
+
+
+def test_other_worker_sees_deletes_through_tombstones(tmp_path):
+    path = tmp_path / 'menu.db'
+    first, second = open_worker(path), open_worker(path)
+    kept = first.add('Soup', 'Soups', 8.0, 2.0, 10, 40, ['tomato'])['id']
+    gone = first.add('Steak', 'Main Courses', 30.0, 12.0, 25, 60, ['beef'])['id']
+    second.sync()
+    
+    first.delete(gone)
+    second.sync()
+    assert [item['id'] for item in second.snapshot().items()] == [kept]
+    assert second.aggregates.state() == first.aggregates.state()
+    assert second.ingredient_index.uses('beef') == 0
+    with pytest.raises(KeyError):
+        second.slot(gone)
+    
+    # The tombstone keeps the id from being handed out again
+    assert second.add('Steak', 'Main Courses', 30.0, 12.0, 25, 60, [])['id'] == gone + 1
+    assert [item['id'] for item in open_worker(path).snapshot().items()] == [kept, gone + 1]
@@ -0,0 +1,67 @@
+import json
+
+import app as menu_app
+
+
+def read_event(events):
+    """The next non-keepalive SSE message as (event, data)"""
+    while True:
+        chunk = next(events).decode()
+        fields = dict(line.split(': ', 1) for line in chunk.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            return fields['event'], json.loads(fields['data'])
+
+
+def test_stream_sends_stats_then_menu_changes(client, item):
+    item_id = client.post('/api/menu-item', json=item).get_json()['menuItem']['id']
+    response = client.get('/api/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    events = iter(response.response)
+    try:
+        event, data = read_event(events)
+        assert event == 'stats'
+        assert data['stats']['itemCount'] == 1
+        
+        client.post('/api/menu-item', json=dict(item, name='Fish Tacos'))
+        event, data = read_event(events)
+        assert event == 'menu'
+        assert data['previousVersion'] == data['version'] - 1
+        assert [added['name'] for added in data['items']] == ['Fish Tacos']
+        assert data['stats']['itemCount'] == 2
+        
+        client.patch(f'/api/menu-item/{item_id}', json={"sellingPrice": 30.0})
+        event, data = read_event(events)
+        assert data['items'] == []
+        assert [(updated['id'], updated['sellingPrice']) for updated in data['updated']] == [(item_id, 30.0)]
+        
+        client.delete(f'/api/menu-item/{item_id}')
+        event, data = read_event(events)
+        assert (data['deleted'], data['stats']['itemCount']) == ([item_id], 1)
+    finally:
+        response.close()
+    assert len(menu_app.tenants.get(menu_app.DEFAULT_RESTAURANT).events) == 0
+
+
+def test_streams_are_per_restaurant(client, item):
+    response = client.get('/api/harbor-grill/stream', buffered=False)
+    events = iter(response.response)
+    try:
+        read_event(events)
+        client.post('/api/menu-item', json=item)
+        client.post('/api/harbor-grill/menu-item', json=dict(item, name='Fish Tacos'))
+        event, data = read_event(events)
+        assert [added['name'] for added in data['items']] == ['Fish Tacos']
+    finally:
+        response.close()
+
+
+def test_slow_subscriber_is_dropped():
+    broker = menu_app.MenuEventBroker(2)
+    slow, fast = broker.subscribe(), broker.subscribe()
+    for n in range(3):
+        broker.publish(f"message {n}")
+        fast.get_nowait()
+    
+    assert len(broker) == 1 and broker.dropped == 1
+    assert slow.get_nowait() is None
+    assert slow.empty()
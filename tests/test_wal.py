@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+import app as menu_app
+
+
+def open_store(path, snapshot_path=None, commit_window=0.0):
+    return menu_app.MenuStore(menu_app.LoggedMenuBackend(str(path), commit_window), snapshot_path)
+
+
+def fill(store):
+    salmon = store.add('Grilled Salmon', 'Main Courses', 24.0, 8.5, 20, 120, ['salmon', 'lemon'])['id']
+    soup = store.add('Soup', 'Soups', 8.0, 2.0, 10, 40, ['tomato'])['id']
+    crab = store.add('Crab', 'Main Courses', 25.0, 10.0, 20, 80, ['crab'])['id']
+    store.record_sales([(salmon, 100, 5), (soup, 101, 3)])
+    store.set_ingredient_costs({'tomato': ('kg', 2.0)})
+    store.set_recipe(soup, {'tomato': 0.5})
+    store.update(salmon, {'selling_price': 26.0})
+    store.delete(crab)
+
+
+def assert_same_menu(restored, store):
+    assert restored.version == store.version
+    assert restored.snapshot().items() == store.snapshot().items()
+    assert restored.aggregates.state() == store.aggregates.state()
+    assert restored.recipes.recipes == store.recipes.recipes
+    assert restored.sales.window_units(1, 7) == store.sales.window_units(1, 7)
+
+
+def test_restart_replays_the_log(tmp_path):
+    path = tmp_path / 'menu.wal'
+    store = open_store(path)
+    fill(store)
+    store.backend.log.close()
+    
+    restored = open_store(path)
+    assert_same_menu(restored, store)
+    assert restored.add('Fish Tacos', 'Main Courses', 14.0, 9.0, 15, 300, [])['id'] == 4
+
+
+def test_log_is_locked_by_one_process(tmp_path):
+    path = tmp_path / 'menu.wal'
+    store = open_store(path)
+    with pytest.raises(RuntimeError):
+        open_store(path)
+    store.backend.log.close()
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = tmp_path / 'menu.wal'
+    store = open_store(path)
+    fill(store)
+    store.backend.log.close()
+    size = path.stat().st_size
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00 half a record')
+    
+    restored = open_store(path)
+    assert path.stat().st_size == size
+    assert_same_menu(restored, store)
+
+
+def test_snapshot_truncates_the_log(tmp_path):
+    path, snapshot_path = tmp_path / 'menu.wal', str(tmp_path / 'menu.menusnap')
+    store = open_store(path, snapshot_path)
+    fill(store)
+    size = path.stat().st_size
+    store.dump()
+    assert path.stat().st_size < size
+    store.add('Fish Tacos', 'Main Courses', 14.0, 9.0, 15, 300, ['cod'])
+    store.backend.log.close()
+    
+    restored = open_store(path, snapshot_path)
+    assert_same_menu(restored, store)
+    restored.backend.log.close()
+    
+    # The records the snapshot covered are gone, so the log alone cannot rebuild the menu
+    (tmp_path / 'menu.menusnap').unlink()
+    with pytest.raises(RuntimeError):
+        open_store(path, snapshot_path)
+
+
+def test_concurrent_writers_share_syncs(tmp_path):
+    path = tmp_path / 'menu.wal'
+    store = open_store(path, commit_window=0.01)
+    writers, writes = 8, 5
+    
+    def write(n):
+        for i in range(writes):
+            store.add(f"Item {n}-{i}", 'Mains', 10.0, 4.0, 10, 20, [])
+    
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log = store.backend.log
+    assert log.syncs < writers * writes
+    assert log._synced == store.version == writers * writes
+    log.close()
+    
+    assert len(open_store(path)) == writers * writes